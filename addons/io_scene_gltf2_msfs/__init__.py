@@ -14,12 +14,11 @@
 
 import importlib
 import inspect
-import pkgutil
-from pathlib import Path
 
 import bpy
 import os
-import tomllib
+
+from . import registration_manifest
 
 bl_info = {
     "name": "Microsoft Flight Simulator glTF Extension",
@@ -33,17 +32,26 @@ bl_info = {
     "tracker_url": "https://github.com/ronh991/glTF-Blender-IO-MSFS"
 }
 
+# read once, the manifest doesn't change while Blender runs
+version_string = None
+
 def get_version_string():
+    global version_string
+    if version_string is not None:
+        return version_string
+
+    import tomllib
+
     SCRIPT_DIR = os.path.dirname(__file__)
     manifest_file = os.path.join(SCRIPT_DIR, "blender_manifest.toml")
     try:
         with open(manifest_file, "rb") as f:
-            bl_info = tomllib.load(f)
-        #bl_info=tomllib.load(manifest_file)
-        #print("get_version_string", bl_info)
-        return bl_info["version"]
+            manifest = tomllib.load(f)
+        #print("get_version_string", manifest)
+        version_string = manifest["version"]
     except:
-        return str(bl_info['version'][0]) + '.' + str(bl_info['version'][1]) + '.' + str(bl_info['version'][2])
+        version_string = str(bl_info['version'][0]) + '.' + str(bl_info['version'][1]) + '.' + str(bl_info['version'][2])
+    return version_string
 
 #get the folder path for the .py file containing this function
 def get_path():
@@ -214,20 +222,11 @@ class MSFS_ExporterProperties(bpy.types.PropertyGroup):
         # if props.enable_msfs_extension:
             # layout.prop(props, 'use_unique_id', text="Enable ASOBO Unique ID extension")
 
-def recursive_module_search(path, root=""):
-    for _, name, ispkg in pkgutil.iter_modules([str(path)]):
-        if ispkg:
-            yield from recursive_module_search(path / name, f"{root}.{name}")
-        else:
-            yield root, name
-
-
-def modules():
-    for root, name in recursive_module_search(Path(__file__).parent):
-        if name in locals():
-            yield importlib.reload(locals()[name])
-        else:
-            yield importlib.import_module(f".{name}", package=f"{__package__}{root}")
+# The modules, classes and register() hooks come from registration_manifest.py instead of walking the package.
+# Run generate_manifest.py after adding a module, a bpy class, a register() hook or a bpy.types property.
+def modules(names=registration_manifest.MODULES):
+    for name in names:
+        yield importlib.import_module(name, package=__package__)
 
 
 classes = []
@@ -239,12 +238,14 @@ def update_class_list():
 
     classes = []
 
+    # some modules only add properties to the bpy types when they are imported
     for module in modules():
-        for obj in module.__dict__.values():
-            if inspect.isclass(obj) \
-                    and module.__name__ in str(obj) \
-                    and "bpy" in str(inspect.getmro(obj)[1]):
-                classes.append(obj)
+        pass
+
+    for name, class_names in registration_manifest.CLASSES:
+        module = importlib.import_module(name, package=__package__)
+        for class_name in class_names:
+            classes.append(getattr(module, class_name))
 
 
 def register():
@@ -260,7 +261,7 @@ def register():
                 print("ERROR in register classes", cls)
             pass
 
-    for module in modules():
+    for module in modules(registration_manifest.HOOKS):
         if hasattr(module, "register"):
             module.register()
 
@@ -282,7 +283,7 @@ def unregister():
         except RuntimeError:
             pass
 
-    for module in modules():
+    for module in modules(registration_manifest.HOOKS):
         if hasattr(module, "unregister"):
             module.unregister()
 
@@ -305,25 +306,47 @@ def draw(self, layout):
     header.label(text="Microsoft Flight Simulator Extensions")
 
 ##################################################################################
-from .io.msfs_import import Import
+# The user extensions import the Khronos internals, they are only built when the glTF importer or exporter looks them up
 
+def get_import_user_extension():
+    from .io.msfs_import import Import
 
-class glTF2ImportUserExtension(Import):
-    def __init__(self):
-        self.properties = bpy.context.scene.msfs_importer_properties
+    class glTF2ImportUserExtension(Import):
+        def __init__(self):
+            self.properties = bpy.context.scene.msfs_importer_properties
 
+    return glTF2ImportUserExtension
 
-##################################################################################
-from .io.msfs_export import Export
-
-
-class glTF2ExportUserExtension(Export):
-    def __init__(self):
-        # We need to wait until we create the gltf2UserExtension to import the gltf2 modules
-        # Otherwise, it may fail because the gltf2 may not be loaded yet
-        from io_scene_gltf2.io.com.gltf2_io_extensions import Extension
-        #print("glTF2ExportUserExtension - __init__ start")
-        self.Extension = Extension
-        #print("glTF2ExportUserExtension - __init__ extension", Extension)
-        self.properties = bpy.context.scene.MSFS_ExporterProperties
-        #print("glTF2ExportUserExtension - __init__ properties", bpy.context.scene.msfs_exporter_properties)
+
+def get_export_user_extension():
+    from .io.msfs_export import Export
+
+    class glTF2ExportUserExtension(Export):
+        def __init__(self):
+            # We need to wait until we create the gltf2UserExtension to import the gltf2 modules
+            # Otherwise, it may fail because the gltf2 may not be loaded yet
+            from io_scene_gltf2.io.com.gltf2_io_extensions import Extension
+            #print("glTF2ExportUserExtension - __init__ start")
+            self.Extension = Extension
+            #print("glTF2ExportUserExtension - __init__ extension", Extension)
+            self.properties = bpy.context.scene.MSFS_ExporterProperties
+            # the node trees have to be up to date before Khronos reads them
+            from .blender.msfs_material_relink import MSFS_MaterialRelink
+            MSFS_MaterialRelink.flush()
+            #print("glTF2ExportUserExtension - __init__ properties", bpy.context.scene.msfs_exporter_properties)
+
+    return glTF2ExportUserExtension
+
+
+user_extensions = {
+    "glTF2ImportUserExtension": get_import_user_extension,
+    "glTF2ExportUserExtension": get_export_user_extension,
+}
+
+
+def __getattr__(name):
+    if name in user_extensions:
+        # built once, then found in the module globals
+        globals()[name] = user_extensions[name]()
+        return globals()[name]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -12,25 +12,123 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from math import radians
-
 #import bgl   bgl is depricated in Blender 4.0 use gpu
-import bmesh
+# gpu, NumPy and the shape modules are imported on first use, to keep the add-on start up light
 import bpy
-import gpu
-import numpy as np
-from gpu_extras.batch import batch_for_shader
+from bpy.app.handlers import persistent
 from mathutils import Matrix
 
+GIZMO_NAMES = {
+    "sphere": "Sphere Collision",
+    "box": "Box Collision",
+    "cylinder": "Cylinder Collision",
+}
+
+
+class MSFSGizmoEmpties:
+    """Collision gizmo empties of the file, kept up to date from the depsgraph updates"""
+
+    # object pointer -> object name, the objects are looked up again on every use since they can be freed at any time
+    empties = {}
+    # False until the registry is built for the current file
+    valid = False
+    # changes on every addition, removal or rename, the gizmo groups only refresh when it differs from the one they saw
+    version = 0
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def is_gizmo_empty(obj):
+        return obj.type == "EMPTY" and obj.msfs_gizmo_type != "NONE"
+
+    @staticmethod
+    def clear():
+        MSFSGizmoEmpties.empties.clear()
+        MSFSGizmoEmpties.valid = False
+        MSFSGizmoEmpties.version += 1
+
+    @staticmethod
+    def update_object(obj):
+        """Add, rename or remove obj, depending on its type and gizmo type"""
+        if not MSFSGizmoEmpties.valid:
+            return
+        pointer = obj.as_pointer()
+        if MSFSGizmoEmpties.is_gizmo_empty(obj):
+            if MSFSGizmoEmpties.empties.get(pointer) != obj.name:
+                MSFSGizmoEmpties.empties[pointer] = obj.name
+                MSFSGizmoEmpties.version += 1
+        elif MSFSGizmoEmpties.empties.pop(pointer, None) is not None:
+            MSFSGizmoEmpties.version += 1
+
+    @staticmethod
+    def build():
+        MSFSGizmoEmpties.empties.clear()
+        MSFSGizmoEmpties.valid = True
+        for obj in bpy.data.objects:
+            MSFSGizmoEmpties.update_object(obj)
+        MSFSGizmoEmpties.version += 1
+
+    @staticmethod
+    def update(depsgraph):
+        for update in depsgraph.updates:
+            data = update.id.original
+            if isinstance(data, bpy.types.Object):
+                MSFSGizmoEmpties.update_object(data)
+
+        if depsgraph.id_type_updated("SCENE") or depsgraph.id_type_updated("COLLECTION"):
+            # objects were removed, or linked to or unlinked from the view layers
+            MSFSGizmoEmpties.remove_invalid()
+            MSFSGizmoEmpties.version += 1
+
+    @staticmethod
+    def resolve(objects, pointer, name):
+        """The gizmo empty named name in objects if it is still the one at pointer, None otherwise"""
+        obj = objects.get(name)
+        if obj is None or obj.as_pointer() != pointer or not MSFSGizmoEmpties.is_gizmo_empty(obj):
+            return None
+        return obj
+
+    @staticmethod
+    def remove_invalid():
+        """Drop the deleted empties, they get no depsgraph update of their own"""
+        objects = bpy.data.objects
+        for pointer, name in list(MSFSGizmoEmpties.empties.items()):
+            if MSFSGizmoEmpties.resolve(objects, pointer, name) is None:
+                del MSFSGizmoEmpties.empties[pointer]
+                MSFSGizmoEmpties.version += 1
+
+    @staticmethod
+    def get_empties(view_layer):
+        """{object pointer: object} for the gizmo empties of view_layer"""
+        if not MSFSGizmoEmpties.valid:
+            MSFSGizmoEmpties.build()
+        objects = view_layer.objects
+        found_empties = {}
+        for pointer, name in MSFSGizmoEmpties.empties.items():
+            obj = MSFSGizmoEmpties.resolve(objects, pointer, name)
+            if obj is not None:
+                found_empties[pointer] = obj
+        return found_empties
+
+    @staticmethod
+    def present(view_layer):
+        if not MSFSGizmoEmpties.valid:
+            MSFSGizmoEmpties.build()
+        objects = view_layer.objects
+        for pointer, name in MSFSGizmoEmpties.empties.items():
+            if MSFSGizmoEmpties.resolve(objects, pointer, name) is not None:
+                return True
+        return False
+
 
 class MSFSGizmoProperties():
     def msfs_gizmo_type_update(self, context):
-        empties = MSFSCollisionGizmoGroup.empties
-        object = context.object
-        if object in empties.keys():
-            if object.msfs_gizmo_type != empties[object].msfs_gizmo_type:
-                empties[object].msfs_gizmo_type = object.msfs_gizmo_type
-                empties[object].create_custom_shape()
+        MSFSGizmoEmpties.update_object(self)
+        gizmo = MSFSCollisionGizmoGroup.empties.get(self.as_pointer())
+        if gizmo is not None and self.msfs_gizmo_type != gizmo.msfs_gizmo_type:
+            gizmo.msfs_gizmo_type = self.msfs_gizmo_type
+            gizmo.create_custom_shape()
 
     bpy.types.Object.msfs_gizmo_type = bpy.props.EnumProperty(
         name = "Type",
@@ -54,12 +152,8 @@ class AddGizmo(bpy.types.Operator):
         def add_gizmo(parent):
             bpy.ops.object.empty_add()
             gizmo = context.object
-            if self.msfs_gizmo_type == "sphere":
-                gizmo.name = "Sphere Collision"
-            elif self.msfs_gizmo_type == "box":
-                gizmo.name = "Box Collision"
-            elif self.msfs_gizmo_type == "cylinder":
-                gizmo.name = "Cylinder Collision"
+            if self.msfs_gizmo_type in GIZMO_NAMES:
+                gizmo.name = GIZMO_NAMES[self.msfs_gizmo_type]
 
             gizmo.msfs_gizmo_type = self.msfs_gizmo_type
             if parent:
@@ -76,16 +170,80 @@ class AddGizmo(bpy.types.Operator):
 
         return {"FINISHED"}
 
+class FitGizmos(bpy.types.Operator):
+    """Add a collision gizmo fitted around each selected mesh"""
+
+    bl_idname = "msfs_collision_gizmo.fit_gizmos"
+    bl_label = "Fit MSFS Collision Gizmos"
+    bl_options = {"REGISTER", "UNDO"}
+
+    msfs_gizmo_type: bpy.props.EnumProperty(
+        name = "Type",
+        description = "Type of collision gizmo to fit",
+        items = (("AUTO", "Automatic", "Cheapest primitive within the volume tolerance of the tightest one"),
+                ("sphere", "Sphere Collision Gizmo", ""),
+                ("box", "Box Collision Gizmo", ""),
+                ("cylinder", "Cylinder Collision Gizmo", "")
+        ),
+        default = "AUTO"
+    )
+
+    volume_tolerance: bpy.props.FloatProperty(
+        name = "Volume Tolerance",
+        description = "How much larger than the tightest primitive a cheaper one can be, for the automatic type",
+        default = 0.1,
+        min = 0.0,
+        soft_max = 1.0,
+        subtype = "FACTOR"
+    )
+
+    def execute(self, context):
+        meshes = [obj for obj in context.selected_objects if obj.type == "MESH"]
+        if not meshes:
+            self.report({"WARNING"}, "No mesh selected.")
+            return {"CANCELLED"}
+
+        import numpy as np
+
+        from .gizmo_fit import MSFSGizmoFit
+
+        # fit in the local space of each mesh, the gizmo TRS is exported relative to its parent
+        depsgraph = context.evaluated_depsgraph_get()
+        fits = []
+        for obj in meshes:
+            mesh = obj.evaluated_get(depsgraph).data
+            if len(mesh.vertices) == 0:
+                continue
+            points = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("co", points)
+            fits.append((obj, MSFSGizmoFit.fit(points, self.msfs_gizmo_type, self.volume_tolerance)))
+
+        for obj, fit in fits:
+            gizmo = bpy.data.objects.new(GIZMO_NAMES[fit["type"]], None)
+            collection = obj.users_collection[0] if obj.users_collection else context.collection
+            collection.objects.link(gizmo)
+            gizmo.parent = obj
+            gizmo.location = fit["center"].tolist()
+            gizmo.rotation_euler = Matrix(fit["rotation"].tolist()).to_euler()
+            gizmo.scale = MSFSGizmoFit.get_scale(fit).tolist()
+            gizmo.msfs_gizmo_type = fit["type"]
+
+        self.report({"INFO"}, "Added " + str(len(fits)) + " collision gizmos.")
+        return {"FINISHED"}
+
 class MSFSCollisionGizmo(bpy.types.Gizmo):
     bl_idname = "VIEW3D_GT_msfs_collision_gizmo"
     bl_label = "MSFS Collision Gizmo"
     bl_options = {"UNDO"}
 
     __slots__ = (
-        "empty",
+        "empty_name",
+        "empty_pointer",
         "msfs_gizmo_type",
         "custom_shape",
         "custom_shape_edges",
+        "batch",
+        "batch_key",
     )
 
     def _update_offset_matrix(self):
@@ -94,61 +252,74 @@ class MSFSCollisionGizmo(bpy.types.Gizmo):
     def setup(self):
         if not hasattr(self, "custom_shape"):
             self.custom_shape = None
+        self.batch = None
+        self.batch_key = None
+
+    def draw_line_3d(self, color, width, region):
+        import gpu
 
-    def draw_line_3d(self, color, width, region, pos):
         #shader = gpu.shader.from_builtin('3D_POLYLINE_UNIFORM_COLOR')
         shader = gpu.shader.from_builtin('POLYLINE_UNIFORM_COLOR')
-        batch = batch_for_shader(shader, 'LINES', {"pos": pos})
         shader.bind()
         shader.uniform_float("color", color)
         shader.uniform_float("lineWidth", width)
         shader.uniform_float("viewportSize", (region.width, region.height))
-        batch.draw(shader)
+        self.batch.draw(shader)
 
     def create_custom_shape(self):
-        mesh = bpy.data.meshes.new("Gizmo Mesh")
-        bm = bmesh.new()
-        if self.msfs_gizmo_type == "sphere":
-            bmesh.ops.create_circle(bm, segments=32, radius=1)
-            bm.to_mesh(mesh)
-            bmesh.ops.create_circle(bm, segments=32, radius=1, matrix=Matrix.Rotation(radians(90), 4, 'X'))
-            bm.to_mesh(mesh)
-            bmesh.ops.create_circle(bm, segments=32, radius=1, matrix=Matrix.Rotation(radians(90), 4, 'Y'))
-            bm.to_mesh(mesh)
-        elif self.msfs_gizmo_type == "box":
-            bmesh.ops.create_cube(bm, size=2)
-        elif self.msfs_gizmo_type == "cylinder":
-            bmesh.ops.create_cone(bm, cap_ends=True, segments=32, radius1=1, radius2=1, depth=2) # Create cone with both ends having the same diameter - this creates a cylinder
-
-        bm.to_mesh(mesh)
-        bm.free()
-
-        edges = []
-        for edge in mesh.edges:
-            edge_verts = []
-            for vert in edge.vertices:
-                edge_verts.append(mesh.vertices[vert])
-            edges.append(edge_verts)
-
-        self.custom_shape_edges = edges
-
-    def get_matrix(self):
+        from .gizmo_shapes import MSFSGizmoShapes
+
+        # the unit shapes are shared by all the gizmos of a type, see MSFSGizmoShapes
+        self.custom_shape_edges = MSFSGizmoShapes.get_shape(self.msfs_gizmo_type)
+        self.batch = None
+        self.batch_key = None
+
+    def get_empty(self):
+        # looked up on every draw, a kept reference would outlive the deletion of the empty
+        return MSFSGizmoEmpties.resolve(bpy.data.objects, self.empty_pointer, self.empty_name)
+
+    def get_matrix(self, empty):
         # Re-calculate matrix without rotation
-        if self.empty.msfs_gizmo_type == "sphere":
-            scale = self.empty.scale[0] * self.empty.scale[1] * self.empty.scale[2]
+        if empty.msfs_gizmo_type == "sphere":
+            scale = empty.scale[0] * empty.scale[1] * empty.scale[2]
             scale_matrix = Matrix.Scale(scale, 3, (1, 0, 0)) @ Matrix.Scale(scale, 3, (0, 1, 0)) @ Matrix.Scale(scale, 3, (0, 0, 1))
-        elif self.empty.msfs_gizmo_type == "cylinder":
-            scale_xy = self.empty.scale[0] * self.empty.scale[1]
-            scale_matrix = Matrix.Scale(scale_xy, 3, (1, 0, 0)) @ Matrix.Scale(scale_xy, 3, (0, 1, 0)) @ Matrix.Scale(self.empty.scale[2], 3, (0, 0, 1))
+        elif empty.msfs_gizmo_type == "cylinder":
+            scale_xy = empty.scale[0] * empty.scale[1]
+            scale_matrix = Matrix.Scale(scale_xy, 3, (1, 0, 0)) @ Matrix.Scale(scale_xy, 3, (0, 1, 0)) @ Matrix.Scale(empty.scale[2], 3, (0, 0, 1))
         else:
-            scale_matrix = Matrix.Scale(self.empty.scale[0], 3, (1, 0, 0)) @ Matrix.Scale(self.empty.scale[1], 3, (0, 1, 0)) @ Matrix.Scale(self.empty.scale[2], 3, (0, 0, 1))
+            scale_matrix = Matrix.Scale(empty.scale[0], 3, (1, 0, 0)) @ Matrix.Scale(empty.scale[1], 3, (0, 1, 0)) @ Matrix.Scale(empty.scale[2], 3, (0, 0, 1))
 
-        matrix = Matrix.LocRotScale(self.empty.matrix_world.to_translation(), self.empty.matrix_world.to_quaternion(), scale_matrix.to_scale())
+        matrix = Matrix.LocRotScale(empty.matrix_world.to_translation(), empty.matrix_world.to_quaternion(), scale_matrix.to_scale())
         return matrix
 
+    def update_batch(self, empty):
+        """Transform the unit shape again only when the empty moved or changed type"""
+        import gpu
+        from gpu_extras.batch import batch_for_shader
+
+        from .gizmo_shapes import MSFSGizmoShapes
+
+        matrix = self.get_matrix(empty)
+        key = MSFSGizmoShapes.get_key(self.msfs_gizmo_type, matrix)
+        if self.batch is None or key != self.batch_key:
+            shader = gpu.shader.from_builtin('POLYLINE_UNIFORM_COLOR')
+            vertex_pos = MSFSGizmoShapes.transform(self.custom_shape_edges, matrix)
+            self.batch = batch_for_shader(shader, 'LINES', {"pos": vertex_pos})
+            self.batch_key = key
+
     def draw(self, context):
-        if self.custom_shape_edges and not self.empty.hide_get():
-            matrix = self.get_matrix()
+        empty = self.get_empty()
+        if empty is None:
+            # deleted or renamed, the group drops or renames the gizmo on its next refresh
+            return
+
+        if empty.msfs_gizmo_type != self.msfs_gizmo_type:
+            # changed without the update callback, e.g. by undo
+            self.msfs_gizmo_type = empty.msfs_gizmo_type
+            self.create_custom_shape()
+
+        if self.custom_shape_edges is not None and not empty.hide_get():
+            self.update_batch(empty)
 
             # bgl is depricated in Blender 4.0
             # bgl.glEnable(bgl.GL_BLEND)
@@ -157,19 +328,12 @@ class MSFSCollisionGizmo(bpy.types.Gizmo):
 
             # Use Blender theme colors to keep everything consistent
             draw_color = list(context.preferences.themes[0].view_3d.empty)
-            if self.empty.select_get():
+            if empty.select_get():
                 draw_color = list(context.preferences.themes[0].view_3d.object_active)
 
             draw_color.append(1) # Add alpha (there isn't any functions in the Color class to add an alpha, so we have to convert to a list)
 
-            vertex_pos = []
-            for edge in self.custom_shape_edges:
-                line_start = self.apply_vert_transforms(edge[0], matrix=matrix)
-                line_end = self.apply_vert_transforms(edge[1], matrix=matrix)
-
-                vertex_pos.extend([line_start, line_end])
-
-            self.draw_line_3d(draw_color, 1, context.region, vertex_pos)
+            self.draw_line_3d(draw_color, 1, context.region)
 
             # Restore OpenGL defaults
             # bgl is depricated in Blender 4.0
@@ -177,12 +341,6 @@ class MSFSCollisionGizmo(bpy.types.Gizmo):
             # bgl.glDisable(bgl.GL_BLEND)
             # bgl.glDisable(bgl.GL_LINE_SMOOTH)
 
-    def apply_vert_transforms(self, vert, matrix):
-        vert = list(vert.co)
-        vert.append(1)
-        multiplied_matrix = np.array(matrix).dot(np.array(vert))
-        return multiplied_matrix[:-1].tolist()
-
 class MSFSCollisionGizmoGroup(bpy.types.GizmoGroup):
     bl_idname = "VIEW3D_GT_msfs_collision_gizmo_group"
     bl_label = "MSFS Collision Gizmo Group"
@@ -190,45 +348,50 @@ class MSFSCollisionGizmoGroup(bpy.types.GizmoGroup):
     bl_region_type = "WINDOW"
     bl_options = {'3D', 'PERSISTENT', 'SHOW_MODAL_ALL', 'SELECT'}
 
+    # object pointer -> gizmo
     empties = {}
+    # (MSFSGizmoEmpties.version, view layer pointer) the gizmos were last refreshed for
+    refreshed = None
 
     @classmethod
     def poll(cls, context):
-        for object in context.view_layer.objects:
-            if object.type == 'EMPTY' and object.msfs_gizmo_type != "NONE":
-                return True
-        return False
+        return MSFSGizmoEmpties.present(context.view_layer)
 
     def setup(self, context):
-        for object in context.view_layer.objects:
-            if object.type == 'EMPTY' and object.msfs_gizmo_type != "NONE" and object not in self.__class__.empties.keys():
+        # a new group has no gizmos yet, the ones of a previous group are gone with it
+        self.__class__.empties.clear()
+        self.__class__.refreshed = None
+        self.refresh(context)
+
+    def refresh(self, context):
+        view_layer = context.view_layer
+        key = (MSFSGizmoEmpties.version, view_layer.as_pointer())
+        if key == self.__class__.refreshed:
+            return
+        found_empties = MSFSGizmoEmpties.get_empties(view_layer)
+
+        # the removed empties are only known by pointer, they can't be read anymore
+        for pointer, gizmo in list(self.__class__.empties.items()):
+            if pointer not in found_empties:
+                del self.__class__.empties[pointer]
+                if gizmo:
+                    self.gizmos.remove(gizmo)
+
+        for pointer, object in found_empties.items():
+            gz = self.__class__.empties.get(pointer)
+            if gz is None:
                 gz = self.gizmos.new(MSFSCollisionGizmo.bl_idname)
 
                 gz.msfs_gizmo_type = object.msfs_gizmo_type
-                gz.empty = object
+                gz.empty_pointer = pointer
 
                 gz.create_custom_shape()
 
-                self.__class__.empties[object] = gz
+                self.__class__.empties[pointer] = gz
+            # the gizmos find their empty by name
+            gz.empty_name = object.name
 
-    def refresh(self, context):
-        # We have to get a list of gizmo empties in the scene first in order to avoid a crash due to referencing a removed object
-        found_empties = []
-        for object in context.view_layer.objects:
-            if object.type == 'EMPTY' and object.msfs_gizmo_type != "NONE":
-                found_empties.append(object)
-
-        for _, (empty, gizmo) in enumerate(self.__class__.empties.copy().items()):
-            if empty not in found_empties:
-                del self.__class__.empties[empty]
-                if gizmo:
-                    self.gizmos.remove(gizmo)
-
-        # Check if there are any new gizmo empties, and if so create new gizmo. We can't do this in the above loop due to the crash mentioned above
-        for object in context.view_layer.objects:
-            if object.type == 'EMPTY' and object.msfs_gizmo_type != "NONE":
-                if object not in self.__class__.empties.keys():
-                    self.setup(context)
+        self.__class__.refreshed = (MSFSGizmoEmpties.version, view_layer.as_pointer())
 
 
 class MSFSCollisionAddMenu(bpy.types.Menu):
@@ -239,12 +402,34 @@ class MSFSCollisionAddMenu(bpy.types.Menu):
         self.layout.operator(AddGizmo.bl_idname, text="Sphere Collision", icon="MESH_UVSPHERE").msfs_gizmo_type = "sphere"
         self.layout.operator(AddGizmo.bl_idname, text="Box Collision", icon="MESH_CUBE").msfs_gizmo_type = "box"
         self.layout.operator(AddGizmo.bl_idname, text="Cylinder Collision", icon="MESH_CYLINDER").msfs_gizmo_type = "cylinder"
+        self.layout.separator()
+        self.layout.operator(FitGizmos.bl_idname, text="Fit Collision to Selected Meshes", icon="SHADING_BBOX")
 
 def draw_menu(self, context):
     self.layout.menu(menu=MSFSCollisionAddMenu.bl_idname, icon="SHADING_BBOX")
 
+@persistent
+def gizmo_empties_depsgraph_update(scene, depsgraph):
+    if MSFSGizmoEmpties.valid:
+        MSFSGizmoEmpties.update(depsgraph)
+
+@persistent
+def gizmo_empties_reset(*args):
+    # object pointers change on load, undo and redo
+    MSFSGizmoEmpties.clear()
+
 def register():
     bpy.types.VIEW3D_MT_add.append(draw_menu)
+    bpy.app.handlers.depsgraph_update_post.append(gizmo_empties_depsgraph_update)
+    bpy.app.handlers.load_post.append(gizmo_empties_reset)
+    bpy.app.handlers.undo_post.append(gizmo_empties_reset)
+    bpy.app.handlers.redo_post.append(gizmo_empties_reset)
 
 def unregister():
     bpy.types.VIEW3D_MT_add.remove(draw_menu)
+    if gizmo_empties_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(gizmo_empties_depsgraph_update)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if gizmo_empties_reset in handlers:
+            handlers.remove(gizmo_empties_reset)
+    MSFSGizmoEmpties.clear()
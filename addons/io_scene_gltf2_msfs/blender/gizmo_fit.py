@@ -0,0 +1,138 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Collision primitives fitted around vertex positions. Only uses NumPy so it can run without Blender.
+
+import numpy as np
+
+# gizmo types from the cheapest to the most expensive collision test, for the automatic choice
+SHAPE_COSTS = ("sphere", "box", "cylinder")
+
+# smallest size of a fitted primitive, flat meshes would get a zero scale
+MIN_EXTENT = 1e-4
+
+# refinement steps of the enclosing sphere and circle
+BALL_ITERATIONS = 32
+
+
+class MSFSGizmoFit:
+    """Bounding sphere, oriented box and cylinder of a point set, and the gizmo scale MSFSGizmo.export reads back"""
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def fit_ball(points):
+        """(center, radius) of a small ball enclosing points, in any dimension (Badoiu-Clarkson)"""
+        center = (points.min(axis=0) + points.max(axis=0)) / 2
+        best_center = center
+        best_radius = np.inf
+        for i in range(1, BALL_ITERATIONS + 1):
+            distances = ((points - center) ** 2).sum(axis=1)
+            farthest = int(np.argmax(distances))
+            radius = np.sqrt(distances[farthest])
+            if radius < best_radius:
+                best_center, best_radius = center, radius
+            center = center + (points[farthest] - center) / (i + 1)
+        return best_center, max(best_radius, MIN_EXTENT)
+
+    @staticmethod
+    def get_axes(points):
+        """Principal axes of points as the columns of a rotation matrix"""
+        if len(points) < 3:
+            return np.eye(3)
+        _, axes = np.linalg.eigh(np.cov(points, rowvar=False))
+        # largest spread first, and no reflection
+        axes = axes[:, ::-1].copy()
+        if np.linalg.det(axes) < 0:
+            axes[:, 2] = -axes[:, 2]
+        return axes
+
+    @staticmethod
+    def fit_box_on_axes(points, axes):
+        local = points @ axes
+        low = local.min(axis=0)
+        high = local.max(axis=0)
+        half_extents = np.maximum((high - low) / 2, MIN_EXTENT)
+        return axes @ ((high + low) / 2), axes, half_extents
+
+    @staticmethod
+    def fit_sphere(points):
+        center, radius = MSFSGizmoFit.fit_ball(points)
+        return {"type": "sphere", "center": center, "rotation": np.eye(3), "radius": radius, "volume": 4 / 3 * np.pi * radius ** 3}
+
+    @staticmethod
+    def fit_box(points):
+        """Smallest of the box on the principal axes and the axis aligned one"""
+        best = None
+        for axes in (MSFSGizmoFit.get_axes(points), np.eye(3)):
+            center, rotation, half_extents = MSFSGizmoFit.fit_box_on_axes(points, axes)
+            volume = 8 * np.prod(half_extents)
+            if best is None or volume < best["volume"]:
+                best = {"type": "box", "center": center, "rotation": rotation, "half_extents": half_extents, "volume": volume}
+        return best
+
+    @staticmethod
+    def fit_cylinder(points, axes):
+        """Smallest cylinder around one of axes"""
+        best = None
+        for k in range(3):
+            # cyclic order keeps the rotation right handed, the cylinder axis is local Z
+            rotation = axes[:, [(k + 1) % 3, (k + 2) % 3, k]]
+            local = points @ rotation
+            low = local[:, 2].min()
+            high = local[:, 2].max()
+            center_xy, radius = MSFSGizmoFit.fit_ball(local[:, :2])
+            height = max(high - low, MIN_EXTENT)
+            volume = np.pi * radius ** 2 * height
+            if best is None or volume < best["volume"]:
+                center = rotation @ np.array((center_xy[0], center_xy[1], (high + low) / 2))
+                best = {"type": "cylinder", "center": center, "rotation": rotation, "radius": radius, "height": height, "volume": volume}
+        return best
+
+    @staticmethod
+    def fit(points, gizmo_type="AUTO", tolerance=0.1):
+        """
+        Fit gizmo_type around the (N, 3) points. AUTO picks the cheapest primitive
+        whose volume is at most tolerance larger than the tightest one
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if gizmo_type == "sphere":
+            return MSFSGizmoFit.fit_sphere(points)
+
+        box = MSFSGizmoFit.fit_box(points)
+        if gizmo_type == "box":
+            return box
+        cylinder = MSFSGizmoFit.fit_cylinder(points, box["rotation"])
+        if gizmo_type == "cylinder":
+            return cylinder
+
+        fits = {"sphere": MSFSGizmoFit.fit_sphere(points), "box": box, "cylinder": cylinder}
+        limit = min(fit["volume"] for fit in fits.values()) * (1 + tolerance)
+        for shape in SHAPE_COSTS:
+            if fits[shape]["volume"] <= limit:
+                return fits[shape]
+
+    @staticmethod
+    def get_scale(fit):
+        """Empty scale of a fit, with the conventions of MSFSGizmo.export"""
+        if fit["type"] == "sphere":
+            # radius = sx * sy * sz
+            return np.full(3, fit["radius"] ** (1 / 3))
+        if fit["type"] == "cylinder":
+            # radius = sx * sy, height = sz
+            radius_scale = fit["radius"] ** (1 / 2)
+            return np.array((radius_scale, radius_scale, fit["height"]))
+        # length, width and height = 2 * scale
+        return fit["half_extents"]
@@ -0,0 +1,95 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Line geometry of the collision gizmos. Only uses NumPy so it can run without Blender.
+
+import numpy as np
+
+SEGMENTS = 32
+
+
+def get_circle(segments, axes, offset=0.0):
+    """Line vertices of a unit circle in the plane of axes, moved by offset on the third axis"""
+    angles = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)
+    points = np.zeros((segments, 3))
+    points[:, axes[0]] = np.cos(angles)
+    points[:, axes[1]] = np.sin(angles)
+    points[:, 3 - axes[0] - axes[1]] = offset
+    # each point to the next one, the last one back to the first
+    return np.stack((points, np.roll(points, -1, axis=0)), axis=1).reshape(-1, 3)
+
+
+def get_sphere():
+    return np.concatenate((get_circle(SEGMENTS, (0, 1)), get_circle(SEGMENTS, (0, 2)), get_circle(SEGMENTS, (1, 2))))
+
+
+def get_box():
+    # size 2 cube, the 12 edges join the corners that differ on one axis
+    corners = np.array([(x, y, z) for x in (-1.0, 1.0) for y in (-1.0, 1.0) for z in (-1.0, 1.0)])
+    edges = [(a, b) for a in range(8) for b in range(a + 1, 8) if bin(a ^ b).count("1") == 1]
+    return corners[np.array(edges)].reshape(-1, 3)
+
+
+def get_cylinder():
+    # radius 1, depth 2, both caps and the sides
+    angles = np.linspace(0.0, 2.0 * np.pi, SEGMENTS, endpoint=False)
+    sides = np.zeros((SEGMENTS, 2, 3))
+    sides[:, :, 0] = np.cos(angles)[:, None]
+    sides[:, :, 1] = np.sin(angles)[:, None]
+    sides[:, 0, 2] = -1.0
+    sides[:, 1, 2] = 1.0
+    return np.concatenate((get_circle(SEGMENTS, (0, 1), -1.0), get_circle(SEGMENTS, (0, 1), 1.0), sides.reshape(-1, 3)))
+
+
+SHAPE_BUILDERS = {
+    "sphere": get_sphere,
+    "box": get_box,
+    "cylinder": get_cylinder,
+}
+
+
+class MSFSGizmoShapes:
+    """Unit line shapes of the gizmo types, built once and transformed per empty"""
+
+    # gizmo type -> (N, 4) homogeneous line vertices, two per edge
+    shapes = {}
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def get_shape(gizmo_type):
+        """Line vertices of the unit shape of gizmo_type, None for unknown types"""
+        shape = MSFSGizmoShapes.shapes.get(gizmo_type)
+        if shape is None:
+            builder = SHAPE_BUILDERS.get(gizmo_type)
+            if builder is None:
+                return None
+            points = builder()
+            shape = np.ones((len(points), 4), dtype=np.float32)
+            shape[:, :3] = points
+            shape.flags.writeable = False
+            MSFSGizmoShapes.shapes[gizmo_type] = shape
+        return shape
+
+    @staticmethod
+    def get_key(gizmo_type, matrix):
+        """Hashable state the transformed shape depends on"""
+        return (gizmo_type, tuple(np.asarray(matrix, dtype=np.float64).ravel()))
+
+    @staticmethod
+    def transform(shape, matrix):
+        """(N, 3) line vertices of shape transformed by the 4x4 matrix"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        return np.ascontiguousarray((shape @ matrix.T)[:, :3])
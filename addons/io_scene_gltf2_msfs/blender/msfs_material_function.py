@@ -23,6 +23,9 @@ from .material.utils.msfs_material_enum import (MSFS_AnisotropicNodes,
                                                 MSFS_MixNodeOutputs,
                                                 MSFS_BSDFNodeInputs,
                                                 MSFS_GroupNodes)
+from .msfs_material_relink import MSFS_MaterialRelink
+from .msfs_material_users import MSFS_MaterialUsers
+from .msfs_node_group_library import MSFS_NodeGroupLibrary
 from .. import get_prefs
 
 
@@ -71,29 +74,30 @@ class MSFS_Material:
     def force_update_properties(self):
         from .msfs_material_prop_update import MSFS_Material_Property_Update
 
-        MSFS_Material_Property_Update.update_base_color_texture(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_comp_texture(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_normal_texture(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_emissive_texture(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_detail_color_texture(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_detail_comp_texture(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_detail_normal_texture(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_blend_mask_texture(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_extra_slot1_texture(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_dirt_texture(self.material, bpy.context)
-        # MSFS_Material_Property_Update.update_wiper_mask(self.material, bpy.context) -- Does not work in game for now
-        MSFS_Material_Property_Update.update_alpha_mode(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_emissive_scale(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_normal_scale(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_color_sss(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_double_sided(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_alpha_cutoff(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_detail_uv(self.material, bpy.context)
-        # Trigger setters
-        MSFS_Material_Property_Update.update_base_color(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_emissive_color(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_metallic_scale(self.material, bpy.context)
-        MSFS_Material_Property_Update.update_roughness_scale(self.material, bpy.context)
+        with MSFS_MaterialRelink.batch():
+            MSFS_Material_Property_Update.update_base_color_texture(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_comp_texture(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_normal_texture(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_emissive_texture(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_detail_color_texture(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_detail_comp_texture(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_detail_normal_texture(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_blend_mask_texture(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_extra_slot1_texture(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_dirt_texture(self.material, bpy.context)
+            # MSFS_Material_Property_Update.update_wiper_mask(self.material, bpy.context) -- Does not work in game for now
+            MSFS_Material_Property_Update.update_alpha_mode(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_emissive_scale(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_normal_scale(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_color_sss(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_double_sided(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_alpha_cutoff(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_detail_uv(self.material, bpy.context)
+            # Trigger setters
+            MSFS_Material_Property_Update.update_base_color(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_emissive_color(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_metallic_scale(self.material, bpy.context)
+            MSFS_Material_Property_Update.update_roughness_scale(self.material, bpy.context)
 
     def cleanNodeTree(self):
         nodes = self.material.node_tree.nodes
@@ -161,11 +165,7 @@ class MSFS_Material:
         node_math.inputs[1].default_value = value
         return node_math
 
-    def createcombineNodeTree(self, name, groupname, location, frame):
-
-        # Combine 
-        combineNodeTree = bpy.data.node_groups.new(name, MSFS_ShaderNodesTypes.shaderNodeTree.value)
-
+    def buildCombineNodeTree(self, combineNodeTree):
         combineNodeTree_inputs = combineNodeTree.nodes.new("NodeGroupInput")
         combineNodeTree_inputs.location = (-900, 0)
 
@@ -194,16 +194,6 @@ class MSFS_Material:
         combineNodeTree_socket = combineNodeTree.interface.new_socket(name="out_result", description="", in_out='OUTPUT', socket_type="NodeSocketFloat")
         combineNodeTree_socket.default_value = 1.000
 
-        nodecombineBColorDBColor = self.addNode(
-            name = groupname,
-            typeNode = MSFS_ShaderNodesTypes.shaderNodeGroup.value,
-            location = location,
-            frame = frame
-        )
-
-        # set the dropdown in the group node
-        nodecombineBColorDBColor.node_tree = combineNodeTree
-
         splitcombineDetailBColorNode = combineNodeTree.nodes.new(MSFS_ShaderNodesTypes.shaderNodeSeparateColor.value)
         splitcombineDetailBColorNode.location = (-700, -200)
 
@@ -234,14 +224,23 @@ class MSFS_Material:
         #link output
         combineNodeTree.links.new(combcombineDetailBColorNode.outputs[0], combineNodeTreegroup_outputs.inputs['out_result'])
 
-        return nodecombineBColorDBColor
+    def createcombineNodeTree(self, name, groupname, location, frame):
+        # the group is shared by all materials, it is only built when there is no unchanged copy of it
+        combineNodeTree = MSFS_NodeGroupLibrary.get(name, self.buildCombineNodeTree)
 
-    def createbiasNodeTree(self, name, groupname, location, frame):
-        # group node drop down name
+        nodecombineBColorDBColor = self.addNode(
+            name = groupname,
+            typeNode = MSFS_ShaderNodesTypes.shaderNodeGroup.value,
+            location = location,
+            frame = frame
+        )
 
-        # Bias 
-        biasNodeTree = bpy.data.node_groups.new(name, MSFS_ShaderNodesTypes.shaderNodeTree.value)
+        # set the dropdown in the group node
+        nodecombineBColorDBColor.node_tree = combineNodeTree
 
+        return nodecombineBColorDBColor
+
+    def buildBiasNodeTree(self, biasNodeTree):
         # can I use add node for this group_inputs?
         # these are the nodes inside the group node
         # create group input node
@@ -263,17 +262,6 @@ class MSFS_Material:
         group_outputs_socket = biasNodeTree.interface.new_socket(name="out_result", description="", in_out='OUTPUT', socket_type="NodeSocketFloat")
         group_outputs_socket.default_value = 1.000   # may not be needed
 
-        # # create bias R group node
-        nodebiasDBColor = self.addNode(
-            name = groupname,
-            typeNode = MSFS_ShaderNodesTypes.shaderNodeGroup.value,
-            location = location,
-            frame = frame
-        )
-
-        # set the dropdown in the group node
-        nodebiasDBColor.node_tree = biasNodeTree
-
         # make all the math nodes
 
         node_add_001 = self.createMathNode(biasNodeTree, op = 'ADD', location = (-700,200), label = 'add bias', value = 0.001)
@@ -313,6 +301,21 @@ class MSFS_Material:
         #link output
         biasNodeTree.links.new(node_combadd_bias_l.outputs[0], group_outputs.inputs['out_result'])
 
+    def createbiasNodeTree(self, name, groupname, location, frame):
+        # the group is shared by all materials, it is only built when there is no unchanged copy of it
+        biasNodeTree = MSFS_NodeGroupLibrary.get(name, self.buildBiasNodeTree)
+
+        # # create bias R group node
+        nodebiasDBColor = self.addNode(
+            name = groupname,
+            typeNode = MSFS_ShaderNodesTypes.shaderNodeGroup.value,
+            location = location,
+            frame = frame
+        )
+
+        # set the dropdown in the group node
+        nodebiasDBColor.node_tree = biasNodeTree
+
         return nodebiasDBColor
 
 
@@ -1080,62 +1083,62 @@ class MSFS_Material:
             nodeBaseColorRGB.outputs[0].default_value[2] = color[2]
             nodeBaseColorRGB.outputs[0].default_value[3] = color[3] # added for Blender 4.0+
             nodeBaseColorA.outputs[0].default_value = color[3]
-            self.updateColorLinks()
+            self.relink("updateColorLinks")
 
     def setBaseColorTex(self, tex):
         nodeBaseColorTex = self.getNodeByName(MSFS_ShaderNodes.baseColorTex.value)
         nodeBaseColorTex.image = tex
-        self.updateColorLinks()
+        self.relink("updateColorLinks")
 
     def setDetailColorTex(self, tex):
         nodeDetailColor = self.getNodeByName(MSFS_ShaderNodes.detailColorTex.value)
         nodeDetailColor.image = tex
-        self.updateColorLinks()
+        self.relink("updateColorLinks")
 
     def setCompTex(self, tex):
         nodeCompTex = self.getNodeByName(MSFS_ShaderNodes.compTex.value)
         nodeCompTex.image = tex
         if tex is not None:
             nodeCompTex.image.colorspace_settings.name = "Non-Color"
-        self.updateCompLinks()
+        self.relink("updateCompLinks")
 
     def setDetailCompTex(self, tex):
         nodeDetailCompTex = self.getNodeByName(MSFS_ShaderNodes.detailCompTex.value)
         nodeDetailCompTex.image = tex
         if tex is not None:
             nodeDetailCompTex.image.colorspace_settings.name = "Non-Color"
-        self.updateCompLinks()
+        self.relink("updateCompLinks")
 
     def setRoughnessScale(self, scale):
         nodeRoughnessScale = self.getNodeByName(MSFS_ShaderNodes.roughnessScale.value)
         if nodeRoughnessScale is not None:
             nodeRoughnessScale.outputs[0].default_value = scale
-            self.updateCompLinks()
+            self.relink("updateCompLinks")
 
     def setMetallicScale(self, scale):
         nodeMetallicScale = self.getNodeByName(MSFS_ShaderNodes.metallicScale.value)
         if nodeMetallicScale is not None:
             nodeMetallicScale.outputs[0].default_value = scale
-            self.updateCompLinks()
+            self.relink("updateCompLinks")
 
     def setEmissiveTexture(self, tex):
         nodeEmissiveTex = self.getNodeByName(MSFS_ShaderNodes.emissiveTex.value)
         nodeEmissiveTex.image = tex
         if tex is not None:
             nodeEmissiveTex.image.colorspace_settings.name = "Non-Color"
-        self.updateEmissiveLinks()
+        self.relink("updateEmissiveLinks")
 
     def setEmissiveScale(self, scale):
         nodeEmissiveScale = self.getNodeByName(MSFS_ShaderNodes.emissiveScale.value)
         if nodeEmissiveScale is not None:
             nodeEmissiveScale.outputs[0].default_value = scale
-            self.updateEmissiveLinks()
+            self.relink("updateEmissiveLinks")
 
     def setVertexColorScale(self, scale):
         nodeVertexColorScale = self.getNodeByName(MSFS_ShaderNodes.vertexcolorScale.value)
         if nodeVertexColorScale is not None:
             nodeVertexColorScale.outputs[0].default_value = scale
-            self.updateColorLinks()
+            self.relink("updateColorLinks")
 
     def setEmissiveColor(self, color):
         nodeEmissiveColor = self.getNodeByName(MSFS_ShaderNodes.emissiveColor.value)
@@ -1145,26 +1148,26 @@ class MSFS_Material:
             emissiveValue[1] = color[1]
             emissiveValue[2] = color[2]
             nodeEmissiveColor.outputs[0].default_value = emissiveValue
-            self.updateEmissiveLinks()
+            self.relink("updateEmissiveLinks")
 
     def setNormalScale(self, scale):
         nodeNormalScale = self.getNodeByName(MSFS_ShaderNodes.normalScale.value)
         nodeNormalScale.outputs[0].default_value = scale
-        self.updateNormalLinks()
+        self.relink("updateNormalLinks")
 
     def setDetailNormalTex(self, tex):
         nodeDetailNormalTex = self.getNodeByName(MSFS_ShaderNodes.detailNormalTex.value)
         nodeDetailNormalTex.image = tex
         if tex is not None:
             nodeDetailNormalTex.image.colorspace_settings.name = "Non-Color"
-        self.updateNormalLinks()
+        self.relink("updateNormalLinks")
 
     def setNormalTex(self, tex):
         nodeNormalTex = self.getNodeByName(MSFS_ShaderNodes.normalTex.value)
         nodeNormalTex.image = tex
         if tex is not None:
             nodeNormalTex.image.colorspace_settings.name = "Non-Color"
-        self.updateNormalLinks()
+        self.relink("updateNormalLinks")
 
     def setBlendMaskTex(self, tex):
         nodeBlendMaskTex = self.getNodeByName(MSFS_ShaderNodes.blendMaskTex.value)
@@ -1186,6 +1189,10 @@ class MSFS_Material:
             nodeDetailUvOffsetU.outputs[0].default_value = offset_u
             nodeDetailUvOffsetV.outputs[0].default_value = offset_v
     
+    def relink(self, group):
+        # link updates are batched, see MSFS_MaterialRelink
+        MSFS_MaterialRelink.request(self, group)
+
     ##############################################
     def updateColorLinks(self):
         settings = get_prefs()
@@ -1426,9 +1433,7 @@ class MSFS_Material:
         return None
     
     def getNodeByName(self, nodename):
-        if self.node_tree.nodes.find(nodename) > -1:
-            return self.node_tree.nodes[nodename]
-        return None
+        return self.node_tree.nodes.get(nodename)
 
     def getNodesByClassName(self, className):
         res = []
@@ -1446,27 +1451,18 @@ class MSFS_Material:
 
     def set_vertex_color_white(self, mat, tex):
         # now adding a base color triggers vertex color links - they make object black in blender - show texture by making mesh color attribute white
-        # add color attribute to mesh for mesh with this material
-        # has to be an easier efficient way to get mesh object from material
-        if tex is not None:
-            for obj in bpy.context.scene.objects:
-                if obj.type == 'MESH':
-                    for mat_slot in obj.material_slots:
-                        if mat_slot.material is not None and mat_slot.material.name == mat.name:
-                            if len(obj.data.color_attributes) > 0:
-                            #for ca in obj.data.color_attributes:
-                                #if ca.name == 'Vertex_Color_White':
-                                print("update_base_color_texture - found color attribute - no update")
-                                return
-                            # None found - make new Vertex_Color_white and assing to mesh
-                            # Create a new color attribute - seems to be white already ????
-                            print("update_base_color_texture - found mesh object with material base color texture - update", obj, mat.name, mat.msfs_base_color_texture, mat.msfs_detail_color_texture)
-                            color_attribute = obj.data.color_attributes.new(
-                                                  name='Col',
-                                                  #type='BYTE_COLOR',
-                                                  type='FLOAT_COLOR',
-                                                  domain='CORNER',
-                                              )
+        # add color attribute to the meshes of the objects using this material
+        if tex is None:
+            return
+        meshes = {}
+        for obj in MSFS_MaterialUsers.get_objects(mat):
+            meshes[obj.data.as_pointer()] = obj.data
+        for mesh in meshes.values():
+            if len(mesh.color_attributes) > 0:
+                continue
+            # None found - make new white color attribute and assign to mesh
+            print("update_base_color_texture - found mesh with material base color texture - update", mesh.name, mat.name, mat.msfs_base_color_texture, mat.msfs_detail_color_texture)
+            MSFS_MaterialUsers.add_white_color_attribute(mesh)
 
     def free(self):
         if self.node_tree.users == 1:
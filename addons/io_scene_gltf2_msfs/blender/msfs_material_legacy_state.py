@@ -0,0 +1,166 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bpy
+from bpy.app.handlers import persistent
+
+
+def uses_gltf_settings_with_dot(material):
+    if not material.use_nodes or material.node_tree is None:
+        return False
+    for node in material.node_tree.nodes:
+        if node.type == 'GROUP' and node.node_tree and 'glTF Settings.' in node.node_tree.name:
+            return True
+    return False
+
+
+def is_fbw_material(material):
+    # the METALLIC ROUGHNESS node is in the blend files imported from FBW
+    if material.node_tree is None:
+        return False
+    for node in material.node_tree.nodes:
+        if node.label == "METALLIC ROUGHNESS":
+            return True
+    return False
+
+
+class MSFS_MaterialLegacyState:
+    """Results of the legacy data checks of the material panel, kept until the data they read changes"""
+
+    # material name -> {check name: result}, dropped when the material is updated
+    materials = {}
+    # material count when the names of materials were last pruned
+    material_count = 0
+    # (material name, object name) -> result
+    objects = {}
+    # check name -> (key, result), for the checks of the whole file
+    file = {}
+    # names of the materials using a numbered glTF Settings group. None until scanned
+    gltf_settings_with_dot = None
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def get(mat, name, check):
+        """check(mat), computed once until mat changes"""
+        state = MSFS_MaterialLegacyState.materials.setdefault(mat.name, {})
+        result = state.get(name)
+        if result is None:
+            result = state[name] = bool(check(mat))
+        return result
+
+    @staticmethod
+    def get_object(mat, obj, check):
+        """check(mat, obj), computed once until mat or obj changes"""
+        key = (mat.name, obj.name)
+        result = MSFS_MaterialLegacyState.objects.get(key)
+        if result is None:
+            result = MSFS_MaterialLegacyState.objects[key] = bool(check(mat, obj))
+        return result
+
+    @staticmethod
+    def get_file(name, check, key):
+        """check(), computed once until key changes, like the count of the data it scans, or an operator invalidates it"""
+        cached = MSFS_MaterialLegacyState.file.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        result = bool(check())
+        MSFS_MaterialLegacyState.file[name] = (key, result)
+        return result
+
+    @staticmethod
+    def gltf_settings_with_dot_present():
+        if MSFS_MaterialLegacyState.gltf_settings_with_dot is None:
+            MSFS_MaterialLegacyState.gltf_settings_with_dot = {
+                material.name for material in bpy.data.materials if uses_gltf_settings_with_dot(material)
+            }
+
+        names = MSFS_MaterialLegacyState.gltf_settings_with_dot
+        # removed or renamed since the scan
+        names.intersection_update(bpy.data.materials.keys())
+        return len(names) > 0
+
+    @staticmethod
+    def update_material(material):
+        MSFS_MaterialLegacyState.materials.pop(material.name, None)
+        names = MSFS_MaterialLegacyState.gltf_settings_with_dot
+        if names is not None:
+            if uses_gltf_settings_with_dot(material):
+                names.add(material.name)
+            else:
+                names.discard(material.name)
+
+    @staticmethod
+    def invalidate(mat=None):
+        """Forget the results of mat, or of everything. For changes that don't reach the depsgraph, like custom properties"""
+        if mat is None:
+            MSFS_MaterialLegacyState.materials.clear()
+            MSFS_MaterialLegacyState.file.clear()
+            MSFS_MaterialLegacyState.gltf_settings_with_dot = None
+        else:
+            MSFS_MaterialLegacyState.update_material(mat)
+        MSFS_MaterialLegacyState.objects.clear()
+
+    @staticmethod
+    def prune_materials():
+        """Drop the results of removed materials, when materials were added or removed"""
+        if len(bpy.data.materials) != MSFS_MaterialLegacyState.material_count:
+            MSFS_MaterialLegacyState.material_count = len(bpy.data.materials)
+            materials = MSFS_MaterialLegacyState.materials
+            for name in materials.keys() - bpy.data.materials.keys():
+                del materials[name]
+
+    @staticmethod
+    def update(depsgraph):
+        if depsgraph.id_type_updated("OBJECT") or depsgraph.id_type_updated("MESH") or depsgraph.id_type_updated("MATERIAL"):
+            MSFS_MaterialLegacyState.objects.clear()
+        if depsgraph.id_type_updated("MATERIAL"):
+            MSFS_MaterialLegacyState.prune_materials()
+
+        for update in depsgraph.updates:
+            data = update.id.original
+            if isinstance(data, bpy.types.Material):
+                MSFS_MaterialLegacyState.update_material(data)
+            elif isinstance(data, bpy.types.NodeTree) and not data.is_embedded_data:
+                # a node group changed, it can be used by any material. The file checks follow the node group and material counts
+                MSFS_MaterialLegacyState.materials.clear()
+                MSFS_MaterialLegacyState.gltf_settings_with_dot = None
+                return
+
+
+@persistent
+def material_legacy_state_depsgraph_update(scene, depsgraph):
+    MSFS_MaterialLegacyState.update(depsgraph)
+
+
+@persistent
+def material_legacy_state_reset(*args):
+    MSFS_MaterialLegacyState.invalidate()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(material_legacy_state_depsgraph_update)
+    bpy.app.handlers.load_post.append(material_legacy_state_reset)
+    bpy.app.handlers.undo_post.append(material_legacy_state_reset)
+    bpy.app.handlers.redo_post.append(material_legacy_state_reset)
+
+
+def unregister():
+    if material_legacy_state_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(material_legacy_state_depsgraph_update)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if material_legacy_state_reset in handlers:
+            handlers.remove(material_legacy_state_reset)
+    MSFS_MaterialLegacyState.invalidate()
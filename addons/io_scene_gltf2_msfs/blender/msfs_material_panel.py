@@ -16,6 +16,10 @@ import bpy
 
 from .msfs_material_prop_update import MSFS_Material_Property_Update
 from .msfs_material_function import MSFS_Material
+from .msfs_material_legacy_state import MSFS_MaterialLegacyState, is_fbw_material
+from .msfs_material_relink import MSFS_MaterialRelink
+from .msfs_material_users import MSFS_MaterialUsers
+from .msfs_node_group_library import MSFS_NodeGroupLibrary, MSFS_OT_CollapseNodeGroupDuplicates
 
 from .material.utils.msfs_material_enum import (MSFS_MixNodeInputs,
                                                 MSFS_MixNodeOutputs,
@@ -36,17 +40,8 @@ def equality_check(arr1, arr2, size1, size2):
 def Is_it_FBW_Material(mat):
     # ToDo: FBW msfs_material_type mapping
     Is_FBW_material = False
-    n1_IsThere = False
-    n2_IsThere = False
     try:
-        for n in mat.node_tree.nodes:
-            #print("get_material_types - Nodes", n, n.name, n.label)
-            if n.label == "METALLIC ROUGHNESS":
-                n1_IsThere = True
-            if n.label == "OCCLUSION":
-                n2_IsThere = True
-        if n1_IsThere and n1_IsThere:
-            Is_FBW_material = True
+        Is_FBW_material = MSFS_MaterialLegacyState.get(mat, "fbw_material", is_fbw_material)
     except:
         print("*** MSFS Warning *** FBW Material error")
     # need other ways to check if FBW for glass
@@ -64,13 +59,8 @@ def set_vertex_color_white(mat, obj):
                     if len(obj.data.color_attributes) > 0:
                         return
                 # None found - make new Vertex_Color_white and assing to mesh
-                # Create a new color attribute - seems to be white already ????
-                color_attribute = obj.data.color_attributes.new(
-                                      name='Col',
-                                      #type='BYTE_COLOR',
-                                      type='FLOAT_COLOR',
-                                      domain='CORNER',
-                                  )
+                MSFS_MaterialUsers.add_white_color_attribute(obj.data)
+                return
 
 
 # def reset_base_color_links(mat, obj):
@@ -189,6 +179,7 @@ class MSFS_OT_vertex_color_white_Data(bpy.types.Operator):
                         #reset_base_color_links(mat, obj)
         except:
             print("*** MSFS Warning *** vertex color white attribute error")
+        MSFS_MaterialLegacyState.invalidate()
         return {"FINISHED"}
 
 
@@ -221,6 +212,7 @@ class MSFS_OT_glTfSettingsMaterialData(bpy.types.Operator):
                         proper_occlusion_node_tree = bpy.data.node_groups.get("glTF Settings")
                         node.node_tree = proper_occlusion_node_tree
                         print(f"Reassigned 'glTF Settings.xxx' to 'glTF Settings' in material  '{material.name}'",  node.node_tree.name)
+        MSFS_MaterialLegacyState.invalidate()
         return {"FINISHED"}
 
 
@@ -437,7 +429,8 @@ class MSFS_OT_MigrateColorFixData(bpy.types.Operator): # TODO: Remove eventually
         return found_diff
 
 
-    def execute(self, context):
+    @staticmethod
+    def migrate(mat):
         index1 = 1
         index_B4 = 1 # index for Blender v4
         if(bpy.app.version < (3, 4, 0)):
@@ -455,7 +448,6 @@ class MSFS_OT_MigrateColorFixData(bpy.types.Operator): # TODO: Remove eventually
         bsdfinputs21 = MSFS_BSDFNodeInputs.inputs[index_B4][3]
         bsdfinputs19 = MSFS_BSDFNodeInputs.inputs[index_B4][4]
 
-        mat = context.active_object.active_material
         if Is_it_FBW_Material(mat):
             #mat.msfs_material_mode = mat.msfs_material_type
             print("msfs_material_mode - type", mat.get("msfs_material_mode"), mat.get("msfs_material_type"))
@@ -627,6 +619,10 @@ class MSFS_OT_MigrateColorFixData(bpy.types.Operator): # TODO: Remove eventually
                 mat.msfs_emissive_scale = principled.inputs[bsdfinputs20].default_value
                 print("7- emissive_scale",mat.msfs_emissive_scale)
             print("8")
+
+    def execute(self, context):
+        MSFS_OT_MigrateColorFixData.migrate(context.active_object.active_material)
+        MSFS_MaterialLegacyState.invalidate()
         return {"FINISHED"}
 
 
@@ -692,8 +688,8 @@ class MSFS_OT_MigrateMaterialData(bpy.types.Operator): # TODO: Remove eventually
                     return True
         return False
 
-    def execute(self, context):
-        mat = context.active_object.active_material
+    @staticmethod
+    def migrate(mat, context, rebuild=True):
         # ToDo: FBW msfs_material_type mapping
         Is_thereFBW_material = Is_it_FBW_Material(mat)
         base_color = [1.0, 1.0, 1.0, 1.0]
@@ -909,9 +905,96 @@ class MSFS_OT_MigrateMaterialData(bpy.types.Operator): # TODO: Remove eventually
             mat.msfs_emissive_factor = emissive_color[0:3]
             # mat.msfs_emissive_factor[1] = emissive_color[1]
             # mat.msfs_emissive_factor[2] = emissive_color[2]
-        MSFS_Material_Property_Update.update_msfs_material_type(mat, context)
+        if rebuild:
+            MSFS_Material_Property_Update.update_msfs_material_type(mat, context)
 
         print("Migrate material - Done")
+
+    def execute(self, context):
+        MSFS_OT_MigrateMaterialData.migrate(context.active_object.active_material, context)
+        MSFS_MaterialLegacyState.invalidate()
+        return {"FINISHED"}
+
+
+class MSFS_OT_MigrateAllMaterialData(bpy.types.Operator): # TODO: Remove eventually
+    """Pre-migrate and migrate the legacy data of all the materials of the file, then rebuild each of them once.\nWARNING: This removes all the old properties from the materials"""
+
+    bl_idname = "msfs.migrate_all_material_data"
+    bl_label = "Migrate All Legacy Materials"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @staticmethod
+    def get_legacy_materials():
+        """[(material, needs color fix, has old properties)] for the local materials with legacy data"""
+        legacy_materials = []
+        for mat in bpy.data.materials:
+            if mat.library is not None:
+                continue
+            color_fix = MSFS_OT_MigrateColorFixData.old_material_values_diff(mat)
+            old_properties = MSFS_OT_MigrateMaterialData.old_properties_present(mat)
+            if color_fix or old_properties:
+                legacy_materials.append((mat, color_fix, old_properties))
+        return legacy_materials
+
+    @staticmethod
+    def legacy_materials_present():
+        """Same test as get_legacy_materials, stops at the first legacy material"""
+        for mat in bpy.data.materials:
+            if mat.library is not None:
+                continue
+            if MSFS_OT_MigrateColorFixData.old_material_values_diff(mat) or MSFS_OT_MigrateMaterialData.old_properties_present(mat):
+                return True
+        return False
+
+    def execute(self, context):
+        legacy_materials = MSFS_OT_MigrateAllMaterialData.get_legacy_materials()
+        if not legacy_materials:
+            self.report({"INFO"}, "No legacy materials found.")
+            return {"FINISHED"}
+
+        window_manager = context.window_manager
+        # migrating and rebuilding count as one step each
+        window_manager.progress_begin(0, len(legacy_materials) * 2)
+        try:
+            # the property updates would rebuild the trees for every migrated value
+            with MSFS_Material_Property_Update.suspend():
+                for index, (mat, color_fix, old_properties) in enumerate(legacy_materials):
+                    if color_fix:
+                        MSFS_OT_MigrateColorFixData.migrate(mat)
+                    if old_properties:
+                        MSFS_OT_MigrateMaterialData.migrate(mat, context, rebuild=False)
+                    window_manager.progress_update(index + 1)
+
+            with MSFS_MaterialRelink.batch():
+                for index, (mat, color_fix, old_properties) in enumerate(legacy_materials):
+                    if old_properties:
+                        MSFS_Material_Property_Update.update_msfs_material_type(mat, context)
+                    else:
+                        msfs_material = MSFS_Material_Property_Update.getMaterial(mat)
+                        if msfs_material is not None:
+                            msfs_material.force_update_properties()
+                    window_manager.progress_update(len(legacy_materials) + index + 1)
+        finally:
+            window_manager.progress_end()
+            MSFS_MaterialLegacyState.invalidate()
+
+        color_fixed = 0
+        migrated = 0
+        for mat, color_fix, old_properties in legacy_materials:
+            changes = []
+            if color_fix:
+                changes.append("color fix")
+                color_fixed += 1
+            if old_properties:
+                changes.append("properties")
+                migrated += 1
+            print("Migrated material", mat.name, "-", ", ".join(changes), "- type", mat.msfs_material_type)
+
+        self.report(
+            {"INFO"},
+            "Migrated " + str(len(legacy_materials)) + " materials: "
+            + str(color_fixed) + " color fixes, " + str(migrated) + " property migrations.",
+        )
         return {"FINISHED"}
 
 
@@ -958,16 +1041,23 @@ class MSFS_PT_Material(bpy.types.Panel):
         addonpreferences = get_prefs()
         if mat:
             # test if project needs vertex colors
-            if addonpreferences.export_vertexcolor_project and MSFS_OT_vertex_color_white_Data.vertex_color_white_attribute_is_required(mat, obj):
+            # the legacy checks are cached, see MSFS_MaterialLegacyState
+            if addonpreferences.export_vertexcolor_project and MSFS_MaterialLegacyState.get_object(mat, obj, MSFS_OT_vertex_color_white_Data.vertex_color_white_attribute_is_required):
                 layout.operator(MSFS_OT_vertex_color_white_Data.bl_idname)
 
-            if MSFS_OT_glTfSettingsMaterialData.gltf_settings_with_dot_present():
+            if MSFS_MaterialLegacyState.gltf_settings_with_dot_present():
                 layout.operator(MSFS_OT_glTfSettingsMaterialData.bl_idname)
 
-            if MSFS_OT_MigrateColorFixData.old_material_values_diff(mat):
+            if MSFS_MaterialLegacyState.get_file("node_group_duplicates", MSFS_NodeGroupLibrary.duplicates_present, len(bpy.data.node_groups)):
+                layout.operator(MSFS_OT_CollapseNodeGroupDuplicates.bl_idname)
+
+            if MSFS_MaterialLegacyState.get_file("legacy_materials", MSFS_OT_MigrateAllMaterialData.legacy_materials_present, len(bpy.data.materials)):
+                layout.operator(MSFS_OT_MigrateAllMaterialData.bl_idname)
+
+            if MSFS_MaterialLegacyState.get(mat, "old_material_values_diff", MSFS_OT_MigrateColorFixData.old_material_values_diff):
                 layout.operator(MSFS_OT_MigrateColorFixData.bl_idname)
 
-            if MSFS_OT_MigrateMaterialData.old_properties_present(mat):
+            if MSFS_MaterialLegacyState.get(mat, "old_properties_present", MSFS_OT_MigrateMaterialData.old_properties_present):
                 layout.operator(MSFS_OT_MigrateMaterialData.bl_idname)
             self.draw_prop(layout, mat, "msfs_material_type", enabled=mat.msfs_material_fbw == "NONE")
 
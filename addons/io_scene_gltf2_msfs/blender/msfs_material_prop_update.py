@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+
 import bpy
+from bpy.app.handlers import persistent
 
 from .material.msfs_material_anisotropic import MSFS_Anisotropic
 from .material.msfs_material_clearcoat import MSFS_Clearcoat
@@ -34,45 +37,86 @@ from .material.msfs_material_windshield import MSFS_Windshield
 from .msfs_material_function import MSFS_Material
 from .. import get_prefs
 
+# msfs_material_type -> MSFS_Material class
+MATERIAL_CLASSES = {
+    "msfs_standard": MSFS_Standard,
+    "msfs_geo_decal": MSFS_Geo_Decal,
+    "msfs_geo_decal_frosted": MSFS_Geo_Decal_Frosted,
+    "msfs_windshield": MSFS_Windshield,
+    "msfs_porthole": MSFS_Porthole,
+    "msfs_glass": MSFS_Glass,
+    "msfs_clearcoat": MSFS_Clearcoat,
+    "msfs_parallax": MSFS_Parallax,
+    "msfs_anisotropic": MSFS_Anisotropic,
+    "msfs_hair": MSFS_Hair,
+    "msfs_sss": MSFS_SSS,
+    "msfs_invisible": MSFS_Invisible,
+    "msfs_fake_terrain": MSFS_Fake_Terrain,
+    "msfs_fresnel_fade": MSFS_Fresnel_Fade,
+    "msfs_environment_occluder": MSFS_Environment_Occluder,
+    "msfs_ghost": MSFS_Ghost,
+}
+
 
 class MSFS_Material_Property_Update:
 
+    # material pointer -> (material type, node tree pointer, material name, MSFS_Material)
+    materials = {}
+    # material count when the removed materials were last dropped
+    material_count = 0
+    # True while the updates must leave the node trees alone, see suspend()
+    suspended = False
+
+    @staticmethod
+    @contextlib.contextmanager
+    def suspend():
+        """Skip the node tree updates of the properties set in the scope, the trees are rebuilt after"""
+        suspended = MSFS_Material_Property_Update.suspended
+        MSFS_Material_Property_Update.suspended = True
+        try:
+            yield
+        finally:
+            MSFS_Material_Property_Update.suspended = suspended
+
     @staticmethod
     def getMaterial(mat):
-        if mat.msfs_material_type == "msfs_standard":
-            return MSFS_Standard(mat)
-        elif mat.msfs_material_type == "msfs_geo_decal":
-            return MSFS_Geo_Decal(mat)
-        elif mat.msfs_material_type == "msfs_geo_decal_frosted":
-            return MSFS_Geo_Decal_Frosted(mat)
-        elif mat.msfs_material_type == "msfs_windshield":
-            return MSFS_Windshield(mat)
-        elif mat.msfs_material_type == "msfs_porthole":
-            return MSFS_Porthole(mat)
-        elif mat.msfs_material_type == "msfs_glass":
-            return MSFS_Glass(mat)
-        elif mat.msfs_material_type == "msfs_clearcoat":
-            return MSFS_Clearcoat(mat)
-        elif mat.msfs_material_type == "msfs_parallax":
-            return MSFS_Parallax(mat)
-        elif mat.msfs_material_type == "msfs_anisotropic":
-            return MSFS_Anisotropic(mat)
-        elif mat.msfs_material_type == "msfs_hair":
-            return MSFS_Hair(mat)
-        elif mat.msfs_material_type == "msfs_sss":
-            return MSFS_SSS(mat)
-        elif mat.msfs_material_type == "msfs_invisible":
-            return MSFS_Invisible(mat)
-        elif mat.msfs_material_type == "msfs_fake_terrain":
-            return MSFS_Fake_Terrain(mat)
-        elif mat.msfs_material_type == "msfs_fresnel_fade":
-            return MSFS_Fresnel_Fade(mat)
-        elif mat.msfs_material_type == "msfs_environment_occluder":
-            return MSFS_Environment_Occluder(mat)
-        elif mat.msfs_material_type == "msfs_ghost":
-            return MSFS_Ghost(mat)
-        #print("Found Material to update - ", mat.msfs_material_type)
-        return None
+        """The MSFS_Material of mat, kept until its type or node tree changes"""
+        if MSFS_Material_Property_Update.suspended:
+            return None
+        material_type = mat.msfs_material_type
+        node_tree = mat.node_tree
+        node_tree_pointer = node_tree.as_pointer() if node_tree is not None else 0
+
+        cached = MSFS_Material_Property_Update.materials.get(mat.as_pointer())
+        # the name tells a new material at the address of a removed one apart
+        if cached is not None and cached[0] == material_type and cached[1] == node_tree_pointer and cached[2] == mat.name:
+            return cached[3]
+
+        material_class = MATERIAL_CLASSES.get(material_type)
+        if material_class is None:
+            #print("Found Material to update - ", mat.msfs_material_type)
+            return None
+        msfs = material_class(mat)
+        MSFS_Material_Property_Update.materials[mat.as_pointer()] = (material_type, msfs.node_tree.as_pointer(), mat.name, msfs)
+        return msfs
+
+    @staticmethod
+    def prune(depsgraph):
+        """Drop the MSFS_Material of removed materials, when materials were added or removed"""
+        if not depsgraph.id_type_updated("MATERIAL") or len(bpy.data.materials) == MSFS_Material_Property_Update.material_count:
+            return
+        MSFS_Material_Property_Update.material_count = len(bpy.data.materials)
+        materials = MSFS_Material_Property_Update.materials
+        if materials:
+            for pointer in materials.keys() - {mat.as_pointer() for mat in bpy.data.materials}:
+                del materials[pointer]
+
+    @staticmethod
+    def invalidate(mat=None):
+        if mat is None:
+            MSFS_Material_Property_Update.materials.clear()
+        else:
+            MSFS_Material_Property_Update.materials.pop(mat.as_pointer(), None)
 
     @staticmethod
     def update_FBW_material(self, context):
@@ -88,6 +132,10 @@ class MSFS_Material_Property_Update:
 
     @staticmethod
     def update_msfs_material_type(self, context):
+        if MSFS_Material_Property_Update.suspended:
+            return
+        # the tree is rebuilt, the nodes of the cached MSFS_Material go away
+        MSFS_Material_Property_Update.invalidate(self)
         from datetime import datetime
         now = datetime.now()
         current_time = now.strftime("%H:%M:%S")
@@ -381,3 +429,30 @@ class MSFS_Material_Property_Update:
         msfs = MSFS_Material_Property_Update.getMaterial(self)
         if msfs is not None:
             msfs.setUV(self.msfs_detail_uv_scale, self.msfs_detail_uv_offset_u, self.msfs_detail_uv_offset_v, self.msfs_detail_normal_scale)
+
+
+@persistent
+def material_cache_depsgraph_update(scene, depsgraph):
+    MSFS_Material_Property_Update.prune(depsgraph)
+
+
+@persistent
+def material_cache_reset(*args):
+    # the materials of the cached MSFS_Material objects are freed on load, undo and redo
+    MSFS_Material_Property_Update.invalidate()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(material_cache_depsgraph_update)
+    bpy.app.handlers.load_post.append(material_cache_reset)
+    bpy.app.handlers.undo_post.append(material_cache_reset)
+    bpy.app.handlers.redo_post.append(material_cache_reset)
+
+
+def unregister():
+    if material_cache_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(material_cache_depsgraph_update)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if material_cache_reset in handlers:
+            handlers.remove(material_cache_reset)
+    MSFS_Material_Property_Update.invalidate()
@@ -0,0 +1,111 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+
+import bpy
+from bpy.app.handlers import persistent
+
+# link updaters of MSFS_Material, in the order they run
+LINK_GROUPS = (
+    "updateColorLinks",
+    "updateNormalLinks",
+    "updateCompLinks",
+    "updateEmissiveLinks",
+)
+
+
+class MSFS_MaterialRelink:
+    """Collects the link updates asked by property changes and runs each of them once per material"""
+
+    # material pointer -> (material, set of LINK_GROUPS)
+    pending = {}
+    # depth of the nested batch() scopes
+    depth = 0
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def request(msfs_material, group):
+        """Run the link updater group of msfs_material now, or at the end of the batch or UI event"""
+        if MSFS_MaterialRelink.depth == 0 and bpy.app.background:
+            # no event loop to run the timer
+            getattr(msfs_material, group)()
+            return
+
+        material = msfs_material.material
+        entry = MSFS_MaterialRelink.pending.get(material.as_pointer())
+        if entry is None:
+            entry = (material, set())
+            MSFS_MaterialRelink.pending[material.as_pointer()] = entry
+        entry[1].add(group)
+
+        if MSFS_MaterialRelink.depth == 0 and not bpy.app.timers.is_registered(relink_timer):
+            bpy.app.timers.register(relink_timer, first_interval=0.0)
+
+    @staticmethod
+    def flush():
+        """Run the pending link updaters"""
+        from .msfs_material_prop_update import MSFS_Material_Property_Update
+
+        pending = MSFS_MaterialRelink.pending
+        MSFS_MaterialRelink.pending = {}
+        for material, groups in pending.values():
+            try:
+                msfs_material = MSFS_Material_Property_Update.getMaterial(material)
+            except ReferenceError:
+                # removed since the request
+                continue
+            if msfs_material is None:
+                continue
+            for group in LINK_GROUPS:
+                if group in groups:
+                    getattr(msfs_material, group)()
+
+    @staticmethod
+    @contextlib.contextmanager
+    def batch():
+        """Defer the link updates asked in the scope to its end"""
+        MSFS_MaterialRelink.depth += 1
+        try:
+            yield
+        finally:
+            MSFS_MaterialRelink.depth -= 1
+            if MSFS_MaterialRelink.depth == 0:
+                MSFS_MaterialRelink.flush()
+
+
+def relink_timer():
+    if MSFS_MaterialRelink.depth == 0:
+        MSFS_MaterialRelink.flush()
+    return None
+
+
+@persistent
+def material_relink_load_post(*args):
+    # the pending materials belong to the previous file
+    MSFS_MaterialRelink.pending.clear()
+
+
+def register():
+    bpy.app.handlers.load_post.append(material_relink_load_post)
+
+
+def unregister():
+    if material_relink_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(material_relink_load_post)
+    if bpy.app.timers.is_registered(relink_timer):
+        bpy.app.timers.unregister(relink_timer)
+    MSFS_MaterialRelink.pending.clear()
@@ -0,0 +1,153 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bpy
+from bpy.app.handlers import persistent
+
+
+class MSFS_MaterialUsers:
+    """Material -> mesh objects index of the scene, kept up to date from the depsgraph updates"""
+
+    # material pointer -> set of object names
+    material_objects = {}
+    # object name -> (mesh pointer, material pointers)
+    objects = {}
+    # mesh pointer -> set of object names
+    mesh_objects = {}
+    # name of the scene the index was built for, None until it is built
+    scene = None
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def clear():
+        MSFS_MaterialUsers.material_objects.clear()
+        MSFS_MaterialUsers.objects.clear()
+        MSFS_MaterialUsers.mesh_objects.clear()
+        MSFS_MaterialUsers.scene = None
+
+    @staticmethod
+    def remove_object(object_name):
+        entry = MSFS_MaterialUsers.objects.pop(object_name, None)
+        if entry is None:
+            return
+        mesh_pointer, material_pointers = entry
+        for material_pointer in material_pointers:
+            users = MSFS_MaterialUsers.material_objects.get(material_pointer)
+            if users is not None:
+                users.discard(object_name)
+        mesh_users = MSFS_MaterialUsers.mesh_objects.get(mesh_pointer)
+        if mesh_users is not None:
+            mesh_users.discard(object_name)
+
+    @staticmethod
+    def index_object(obj):
+        object_name = obj.name
+        MSFS_MaterialUsers.remove_object(object_name)
+        if obj.type != "MESH" or obj.data is None:
+            return
+
+        mesh_pointer = obj.data.as_pointer()
+        material_pointers = {slot.material.as_pointer() for slot in obj.material_slots if slot.material is not None}
+        MSFS_MaterialUsers.objects[object_name] = (mesh_pointer, material_pointers)
+        MSFS_MaterialUsers.mesh_objects.setdefault(mesh_pointer, set()).add(object_name)
+        for material_pointer in material_pointers:
+            MSFS_MaterialUsers.material_objects.setdefault(material_pointer, set()).add(object_name)
+
+    @staticmethod
+    def build(scene):
+        MSFS_MaterialUsers.clear()
+        for obj in scene.objects:
+            MSFS_MaterialUsers.index_object(obj)
+        MSFS_MaterialUsers.scene = scene.name
+
+    @staticmethod
+    def update(scene, depsgraph):
+        """Reindex the objects, and the objects of the meshes, changed in depsgraph"""
+        if scene.name != MSFS_MaterialUsers.scene or depsgraph.id_type_updated("SCENE") or depsgraph.id_type_updated("COLLECTION"):
+            # objects were deleted, or linked to or unlinked from the scene, they get no update of their own
+            MSFS_MaterialUsers.clear()
+            return
+
+        for update in depsgraph.updates:
+            data = update.id.original
+            if isinstance(data, bpy.types.Object):
+                MSFS_MaterialUsers.index_object(data)
+            elif isinstance(data, bpy.types.Mesh):
+                # material slots linked to the data
+                for object_name in list(MSFS_MaterialUsers.mesh_objects.get(data.as_pointer(), ())):
+                    obj = scene.objects.get(object_name)
+                    if obj is None:
+                        MSFS_MaterialUsers.remove_object(object_name)
+                    else:
+                        MSFS_MaterialUsers.index_object(obj)
+
+    @staticmethod
+    def get_objects(material):
+        """Mesh objects of the scene with material in one of their slots"""
+        scene = bpy.context.scene
+        if MSFS_MaterialUsers.scene != scene.name:
+            MSFS_MaterialUsers.build(scene)
+
+        objects = []
+        for object_name in list(MSFS_MaterialUsers.material_objects.get(material.as_pointer(), ())):
+            obj = scene.objects.get(object_name)
+            if obj is None:
+                # renamed or removed without a depsgraph update, index the scene again
+                MSFS_MaterialUsers.build(scene)
+                return MSFS_MaterialUsers.get_objects(material)
+            # slots can change without a depsgraph update, e.g. while an operator runs
+            if any(slot.material == material for slot in obj.material_slots):
+                objects.append(obj)
+            else:
+                MSFS_MaterialUsers.index_object(obj)
+        return objects
+
+    @staticmethod
+    def add_white_color_attribute(mesh):
+        """Give mesh a white FLOAT_COLOR corner attribute"""
+        import numpy as np
+
+        color_attribute = mesh.color_attributes.new(name="Col", type="FLOAT_COLOR", domain="CORNER")
+        color_attribute.data.foreach_set("color", np.ones(len(mesh.loops) * 4, dtype=np.float32))
+        return color_attribute
+
+
+@persistent
+def material_users_depsgraph_update(scene, depsgraph):
+    if MSFS_MaterialUsers.scene is not None:
+        MSFS_MaterialUsers.update(scene, depsgraph)
+
+
+@persistent
+def material_users_reset(*args):
+    # mesh and material pointers change on load, undo and redo
+    MSFS_MaterialUsers.clear()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(material_users_depsgraph_update)
+    bpy.app.handlers.load_post.append(material_users_reset)
+    bpy.app.handlers.undo_post.append(material_users_reset)
+    bpy.app.handlers.redo_post.append(material_users_reset)
+
+
+def unregister():
+    if material_users_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(material_users_depsgraph_update)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if material_users_reset in handlers:
+            handlers.remove(material_users_reset)
+    MSFS_MaterialUsers.clear()
@@ -0,0 +1,165 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+
+import bpy
+
+from .material.utils.msfs_material_enum import MSFS_ShaderNodes, MSFS_ShaderNodesTypes
+from .msfs_material_legacy_state import MSFS_MaterialLegacyState
+
+# ID property marking the node groups created by the library
+LIBRARY_KEY = "msfs_node_group_library"
+
+# helper node groups shared by all MSFS materials
+LIBRARY_GROUPS = (
+    MSFS_ShaderNodes.biasRDetailColor.value,
+    MSFS_ShaderNodes.biasGDetailColor.value,
+    MSFS_ShaderNodes.biasBDetailColor.value,
+    MSFS_ShaderNodes.DetailBColorCombine.value,
+)
+
+DUPLICATE_NAME = re.compile(r"^(.*)\.\d{3,}$")
+
+
+class MSFS_NodeGroupLibrary:
+    """Helper node groups built once per file and shared by every material using them"""
+
+    # group name -> signature of the group as build() makes it, the groups themselves are looked up in bpy.data on every use
+    signatures = {}
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def get_reference_signature(name, build):
+        signature = MSFS_NodeGroupLibrary.signatures.get(name)
+        if signature is None:
+            # build a scratch copy once to know what an unchanged group looks like
+            node_group = bpy.data.node_groups.new(name, MSFS_ShaderNodesTypes.shaderNodeTree.value)
+            try:
+                build(node_group)
+                signature = MSFS_NodeGroupLibrary.get_signature(node_group)
+            finally:
+                bpy.data.node_groups.remove(node_group)
+            MSFS_NodeGroupLibrary.signatures[name] = signature
+        return signature
+
+    @staticmethod
+    def is_library_group(node_group, name, build):
+        """True for a group made by the library and not edited since"""
+        if not node_group.get(LIBRARY_KEY):
+            return False
+        return MSFS_NodeGroupLibrary.get_signature(node_group) == MSFS_NodeGroupLibrary.get_reference_signature(name, build)
+
+    @staticmethod
+    def get(name, build):
+        """The library group called name, build(node_group) fills a new one when there is no unchanged copy"""
+        node_group = bpy.data.node_groups.get(name)
+        if node_group is not None:
+            if MSFS_NodeGroupLibrary.is_library_group(node_group, name, build):
+                return node_group
+
+            # the group with the name was edited or is not from the library, reuse a numbered copy that is
+            for candidate in bpy.data.node_groups:
+                match = DUPLICATE_NAME.match(candidate.name)
+                if match and match.group(1) == name and MSFS_NodeGroupLibrary.is_library_group(candidate, name, build):
+                    return candidate
+
+        node_group = bpy.data.node_groups.new(name, MSFS_ShaderNodesTypes.shaderNodeTree.value)
+        build(node_group)
+        node_group[LIBRARY_KEY] = True
+        MSFS_NodeGroupLibrary.signatures.setdefault(name, MSFS_NodeGroupLibrary.get_signature(node_group))
+        return node_group
+
+    @staticmethod
+    def get_signature(node_group):
+        """Nodes, sockets and links of a node group, equal for groups that compute the same thing"""
+        nodes = {}
+        for node in node_group.nodes:
+            inputs = tuple(
+                tuple(socket.default_value) if hasattr(socket.default_value, "__len__") else socket.default_value
+                for socket in node.inputs
+                if hasattr(socket, "default_value")
+            )
+            nodes[node.name] = (node.bl_idname, getattr(node, "operation", None), node.label, inputs)
+        links = sorted(
+            (nodes[link.from_node.name], link.from_socket.identifier, nodes[link.to_node.name], link.to_socket.identifier)
+            for link in node_group.links
+        )
+        interface = tuple(
+            (item.name, item.in_out, item.socket_type)
+            for item in node_group.interface.items_tree
+            if item.item_type == "SOCKET"
+        )
+        return (interface, tuple(sorted(nodes.values())), tuple(links))
+
+    @staticmethod
+    def get_duplicates():
+        """{name: [node groups]} for the library groups that have numbered copies"""
+        duplicates = {}
+        for node_group in bpy.data.node_groups:
+            if node_group.library is not None:
+                continue
+            match = DUPLICATE_NAME.match(node_group.name)
+            name = match.group(1) if match else node_group.name
+            if name in LIBRARY_GROUPS:
+                duplicates.setdefault(name, []).append(node_group)
+        return {name: node_groups for name, node_groups in duplicates.items() if len(node_groups) > 1 or node_groups[0].name != name}
+
+    @staticmethod
+    def duplicates_present():
+        for node_group in bpy.data.node_groups:
+            match = DUPLICATE_NAME.match(node_group.name)
+            if match and match.group(1) in LIBRARY_GROUPS and node_group.library is None:
+                return True
+        return False
+
+    @staticmethod
+    def collapse_duplicates():
+        """Make the materials use one copy of each library group and remove the others, returns the removed count"""
+        removed = 0
+        for name, node_groups in MSFS_NodeGroupLibrary.get_duplicates().items():
+            # keep the group with the exact name, or the lowest numbered copy
+            node_groups.sort(key=lambda node_group: (node_group.name != name, node_group.name))
+            kept = node_groups[0]
+            signature = MSFS_NodeGroupLibrary.get_signature(kept)
+
+            for node_group in node_groups[1:]:
+                if MSFS_NodeGroupLibrary.get_signature(node_group) != signature:
+                    print("*** MSFS WARNING *** node group", node_group.name, "was edited, it is not merged into", kept.name)
+                    continue
+                node_group.user_remap(kept)
+                bpy.data.node_groups.remove(node_group)
+                removed += 1
+
+            if kept.name != name and bpy.data.node_groups.get(name) is None:
+                kept.name = name
+            kept[LIBRARY_KEY] = True
+
+        return removed
+
+
+class MSFS_OT_CollapseNodeGroupDuplicates(bpy.types.Operator):
+    """Make all materials share one copy of the MSFS helper node groups and remove the numbered duplicates"""
+
+    bl_idname = "msfs.collapse_node_group_duplicates"
+    bl_label = "Remove Duplicate MSFS Node Groups"
+    bl_options = {"REGISTER", "UNDO"}
+
+    def execute(self, context):
+        removed = MSFS_NodeGroupLibrary.collapse_duplicates()
+        MSFS_MaterialLegacyState.invalidate()
+        self.report({"INFO"}, "Removed " + str(removed) + " duplicate node groups.")
+        return {"FINISHED"}
@@ -13,9 +13,29 @@
 # limitations under the License.
 
 import bpy
-from io_scene_gltf2.io.com.gltf2_io_extensions import Extension
 
 from ..blender.msfs_material_prop_update import MSFS_Material_Property_Update
+from .msfs_material_schema import Field, compile_extension
+
+MATERIAL_TYPE_ITEMS = (
+    ("NONE", "Disabled", ""),
+    ("msfs_standard", "Standard", ""),
+    ("msfs_geo_decal", "Decal", ""),
+    ("msfs_geo_decal_frosted", "Geo Decal Frosted", ""),
+    ("msfs_windshield", "Windshield", ""),
+    ("msfs_porthole", "Porthole", ""),
+    ("msfs_glass", "Glass", ""),
+    ("msfs_clearcoat", "Clearcoat", ""),
+    ("msfs_parallax", "Parallax", ""),
+    ("msfs_anisotropic", "Anisotropic", ""),
+    ("msfs_hair", "Hair", ""),
+    ("msfs_sss", "Sub-surface Scattering", ""),
+    ("msfs_invisible", "Invisible", ""),
+    ("msfs_fake_terrain", "Fake Terrain", ""),
+    ("msfs_fresnel_fade", "Fresnel Fade", ""),
+    ("msfs_environment_occluder", "Environment Occluder", ""),
+    ("msfs_ghost", "Ghost", ""),
+)
 
 #material_type_return = []  
 
@@ -114,25 +134,7 @@ class AsoboMaterialCommon:
 
     bpy.types.Material.msfs_material_type = bpy.props.EnumProperty(
         name="Type",
-        items=(
-            ("NONE", "Disabled", ""),
-            ("msfs_standard", "Standard", ""),
-            ("msfs_geo_decal", "Decal", ""),
-            ("msfs_geo_decal_frosted", "Geo Decal Frosted", ""),
-            ("msfs_windshield", "Windshield", ""),
-            ("msfs_porthole", "Porthole", ""),
-            ("msfs_glass", "Glass", ""),
-            ("msfs_clearcoat", "Clearcoat", ""),
-            ("msfs_parallax", "Parallax", ""),
-            ("msfs_anisotropic", "Anisotropic", ""),
-            ("msfs_hair", "Hair", ""),
-            ("msfs_sss", "Sub-surface Scattering", ""),
-            ("msfs_invisible", "Invisible", ""),
-            ("msfs_fake_terrain", "Fake Terrain", ""),
-            ("msfs_fresnel_fade", "Fresnel Fade", ""),
-            ("msfs_environment_occluder", "Environment Occluder", ""),
-            ("msfs_ghost", "Ghost", ""),
-        ),
+        items=MATERIAL_TYPE_ITEMS,
         default="NONE",
         update=MSFS_Material_Property_Update.update_msfs_material_type,
         options=set(),  # ANIMATABLE is a default item in options, so for properties that shouldn't be animatable, we have to overwrite this.
@@ -479,9 +481,11 @@ class AsoboMaterialCommon:
         pass
 
 
+@compile_extension
 class AsoboMaterialGeometryDecal:
 
     SerializedName = "ASOBO_material_blend_gbuffer"
+    MaterialTypes = ("msfs_geo_decal", "msfs_geo_decal_frosted")
 
     class Defaults:
         baseColorBlendFactor = 1.0
@@ -539,57 +543,23 @@ class AsoboMaterialGeometryDecal:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialGeometryDecal.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_material_type = "msfs_geo_decal"
-
-        if extension.get("baseColorBlendFactor"):
-            blender_material.msfs_base_color_blend_factor = extension.get("baseColorBlendFactor")
-        if extension.get("metallicBlendFactor"):
-            blender_material.msfs_metallic_blend_factor = extension.get("metallicBlendFactor")
-        if extension.get("roughnessBlendFactor"):
-            blender_material.msfs_roughness_blend_factor = extension.get("roughnessBlendFactor")
-        if extension.get("normalBlendFactor"):
-            blender_material.msfs_normal_blend_factor = extension.get("normalBlendFactor")
-        if extension.get("emissiveBlendFactor"):
-            blender_material.msfs_emissive_blend_factor = extension.get("emissiveBlendFactor")
-        if extension.get("occlusionBlendFactor"):
-            blender_material.msfs_occlusion_blend_factor = extension.get("occlusionBlendFactor")
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if (
-            blender_material.msfs_material_type == "msfs_geo_decal"
-            or blender_material.msfs_material_type == "msfs_geo_decal_frosted"
-        ):
-            result["enabled"] = True
-            result["baseColorBlendFactor"] = blender_material.msfs_base_color_blend_factor
-            result["metallicBlendFactor"] = blender_material.msfs_metallic_blend_factor
-            result["roughnessBlendFactor"] = blender_material.msfs_roughness_blend_factor
-            result["normalBlendFactor"] = blender_material.msfs_normal_blend_factor
-            result["emissiveBlendFactor"] = blender_material.msfs_emissive_blend_factor
-            result["occlusionBlendFactor"] = blender_material.msfs_occlusion_blend_factor
-
-            gltf2_material.extensions[AsoboMaterialGeometryDecal.SerializedName] = Extension(
-                name=AsoboMaterialGeometryDecal.SerializedName,
-                extension=result,
-                required=False,
-            )
+    ImportMaterialType = "msfs_geo_decal"
+    Constants = {"enabled": True}
+    Fields = (
+        Field("baseColorBlendFactor", "msfs_base_color_blend_factor", Defaults.baseColorBlendFactor),
+        Field("metallicBlendFactor", "msfs_metallic_blend_factor", Defaults.metallicBlendFactor),
+        Field("roughnessBlendFactor", "msfs_roughness_blend_factor", Defaults.roughnessBlendFactor),
+        Field("normalBlendFactor", "msfs_normal_blend_factor", Defaults.normalBlendFactor),
+        Field("emissiveBlendFactor", "msfs_emissive_blend_factor", Defaults.emissiveBlendFactor),
+        Field("occlusionBlendFactor", "msfs_occlusion_blend_factor", Defaults.occlusionBlendFactor),
+    )
 
 
+@compile_extension
 class AsoboMaterialGhostEffect:
 
     SerializedName = "ASOBO_material_ghost_effect"
+    MaterialTypes = ("msfs_ghost",)
 
     class Defaults:
         bias = 1.0
@@ -618,44 +588,18 @@ class AsoboMaterialGhostEffect:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(
-            AsoboMaterialGhostEffect.SerializedName
-        )
-        if extension is None:
-            return
-
-        if extension.get("bias"):
-            blender_material.msfs_ghost_bias = extension.get("bias")
-        if extension.get("scale"):
-            blender_material.msfs_ghost_scale = extension.get("scale")
-        if extension.get("power"):
-            blender_material.msfs_ghost_power = extension.get("power")
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if blender_material.msfs_material_type == "msfs_ghost":
-            result["bias"] = blender_material.msfs_ghost_bias
-            result["scale"] = blender_material.msfs_ghost_scale
-            result["power"] = blender_material.msfs_ghost_power
-
-            gltf2_material.extensions[AsoboMaterialGhostEffect.SerializedName] = Extension(
-                name=AsoboMaterialGhostEffect.SerializedName,
-                extension=result,
-                required=False,
-            )
+    Fields = (
+        Field("bias", "msfs_ghost_bias", Defaults.bias),
+        Field("scale", "msfs_ghost_scale", Defaults.scale),
+        Field("power", "msfs_ghost_power", Defaults.power),
+    )
 
 
+@compile_extension
 class AsoboMaterialDrawOrder:
 
     SerializedName = "ASOBO_material_draw_order"
+    ExcludedMaterialTypes = ("msfs_invisible", "msfs_environment_occluder")
 
     class Defaults:
         drawOrderOffset = 0
@@ -669,40 +613,17 @@ class AsoboMaterialDrawOrder:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialDrawOrder.SerializedName)
-        if extension is None:
-            return
-
-        if extension.get("drawOrderOffset"):
-            blender_material.msfs_draw_order_offset = extension.get("drawOrderOffset")
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if (
-            (blender_material.msfs_material_type != "msfs_invisible" 
-            and blender_material.msfs_material_type != "msfs_environment_occluder")
-            and blender_material.msfs_draw_order_offset
-        ):
-            result["drawOrderOffset"] = blender_material.msfs_draw_order_offset
-
-            gltf2_material.extensions[AsoboMaterialDrawOrder.SerializedName] = Extension(
-                name=AsoboMaterialDrawOrder.SerializedName,
-                extension=result,
-                required=False,
-            )
+    Elision = "EXTENSION"
+    Fields = (
+        Field("drawOrderOffset", "msfs_draw_order_offset", Defaults.drawOrderOffset),
+    )
 
 
+@compile_extension
 class AsoboDayNightCycle:
 
     SerializedName = "ASOBO_material_day_night_switch"
+    MaterialTypes = ("msfs_standard",)
 
     bpy.types.Material.msfs_day_night_cycle = bpy.props.BoolProperty(
         name="Day Night Cycle",
@@ -711,33 +632,15 @@ class AsoboDayNightCycle:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboDayNightCycle.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_day_night_cycle = True
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        if (
-            blender_material.msfs_material_type == "msfs_standard"
-            and blender_material.msfs_day_night_cycle
-        ):
-            gltf2_material.extensions[AsoboDayNightCycle.SerializedName] = Extension(
-                name=AsoboDayNightCycle.SerializedName, extension={'enabled': True} , required=False
-            )
+    Switch = {"msfs_day_night_cycle": True}
+    Constants = {"enabled": True}
 
 
+@compile_extension
 class AsoboDisableMotionBlur:
 
     SerializedName = "ASOBO_material_disable_motion_blur"
+    ExcludedMaterialTypes = ("msfs_invisible", "msfs_environment_occluder")
 
     bpy.types.Material.msfs_disable_motion_blur = bpy.props.BoolProperty(
         name="Disable Motion Blur",
@@ -746,39 +649,15 @@ class AsoboDisableMotionBlur:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboDisableMotionBlur.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_disable_motion_blur = True
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if (
-            (blender_material.msfs_material_type != "msfs_invisible" 
-            and blender_material.msfs_material_type != "msfs_environment_occluder")
-            and blender_material.msfs_disable_motion_blur
-        ):
-            result["enabled"] = True
-
-            gltf2_material.extensions[AsoboDisableMotionBlur.SerializedName] = Extension(
-                name=AsoboDisableMotionBlur.SerializedName,
-                extension=result,
-                required=False,
-            )
+    Switch = {"msfs_disable_motion_blur": True}
+    Constants = {"enabled": True}
 
 
+@compile_extension
 class AsoboPearlescent:
 
     SerializedName = "ASOBO_material_pearlescent"
+    MaterialTypes = ("msfs_standard",)
 
     class Defaults:
         pearlShift = 0.0
@@ -815,137 +694,48 @@ class AsoboPearlescent:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboPearlescent.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_use_pearl = True
-
-        if extension.get("pearlShift"):
-            blender_material.msfs_pearl_shift = extension.get("pearlShift")
-        if extension.get("pearlRange"):
-            blender_material.msfs_pearl_range = extension.get("pearlRange")
-        if extension.get("pearlBrightness"):
-            blender_material.msfs_pearl_brightness = extension.get("pearlBrightness")
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if (
-            blender_material.msfs_material_type == "msfs_standard"
-            and blender_material.msfs_use_pearl
-        ):
-            result["pearlShift"] = blender_material.msfs_pearl_shift
-            result["pearlRange"] = blender_material.msfs_pearl_range
-            result["pearlBrightness"] = blender_material.msfs_pearl_brightness
-
-            gltf2_material.extensions[AsoboPearlescent.SerializedName] = Extension(
-                name=AsoboPearlescent.SerializedName, extension=result, required=False
-            )
+    Switch = {"msfs_use_pearl": True}
+    Fields = (
+        Field("pearlShift", "msfs_pearl_shift", Defaults.pearlShift),
+        Field("pearlRange", "msfs_pearl_range", Defaults.pearlRange),
+        Field("pearlBrightness", "msfs_pearl_brightness", Defaults.pearlBrightness),
+    )
 
 
+@compile_extension
 class AsoboAlphaModeDither:
 
     SerializedName = "ASOBO_material_alphamode_dither"
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(
-            AsoboAlphaModeDither.SerializedName
-        )
-        if extension is None:
-            return
-
-        blender_material.msfs_alpha_mode = "DITHER"
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if blender_material.msfs_alpha_mode == "DITHER":
-            result["enabled"] = True
-
-            gltf2_material.extensions[AsoboAlphaModeDither.SerializedName] = Extension(
-                name=AsoboAlphaModeDither.SerializedName,
-                extension=result,
-                required=False,
-            )
+    Switch = {"msfs_alpha_mode": "DITHER"}
+    Constants = {"enabled": True}
 
 
+@compile_extension
 class AsoboMaterialInvisible:
 
     SerializedName = "ASOBO_material_invisible"
+    MaterialTypes = ("msfs_invisible",)
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialInvisible.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_material_type = "msfs_invisible"
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if blender_material.msfs_material_type == "msfs_invisible":
-            result["enabled"] = True
-
-            gltf2_material.extensions[AsoboMaterialInvisible.SerializedName] = Extension(
-                name=AsoboMaterialInvisible.SerializedName,
-                extension=result,
-                required=False,
-            )
+    ImportMaterialType = "msfs_invisible"
+    Constants = {"enabled": True}
 
 
+@compile_extension
 class AsoboMaterialEnvironmentOccluder:
 
     SerializedName = "ASOBO_material_environment_occluder"
+    MaterialTypes = ("msfs_environment_occluder",)
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialEnvironmentOccluder.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_material_type = "msfs_environment_occluder"
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if blender_material.msfs_material_type == "msfs_environment_occluder":
-            result["enabled"] = True
-
-            gltf2_material.extensions[AsoboMaterialEnvironmentOccluder.SerializedName] = Extension(
-                name=AsoboMaterialEnvironmentOccluder.SerializedName,
-                extension=result,
-                required=False,
-            )
+    ImportMaterialType = "msfs_environment_occluder"
+    Constants = {"enabled": True}
 
 
+@compile_extension
 class AsoboMaterialUVOptions:
 
     SerializedName = "ASOBO_material_UV_options"
+    ExcludedMaterialTypes = ("msfs_invisible", "msfs_environment_occluder")
 
     class Defaults:
         clampUVX = False
@@ -1009,67 +799,20 @@ class AsoboMaterialUVOptions:
         options={"ANIMATABLE"},
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialUVOptions.SerializedName)
-        if extension is None:
-            return
-
-        if extension.get("clampUVX"):
-            blender_material.msfs_clamp_uv_x = extension.get("clampUVX")
-        if extension.get("clampUVY"):
-            blender_material.msfs_clamp_uv_y = extension.get("clampUVY")
-        if extension.get("clampUVZ"): # Deprecated
-            blender_material.msfs_clamp_uv_z = extension.get("clampUVZ")
-        if extension.get("UVOffsetU"):
-            blender_material.msfs_uv_offset_u = extension.get("UVOffsetU")
-        if extension.get("UVOffsetV"):
-            blender_material.msfs_uv_offset_v = extension.get("UVOffsetV")
-        if extension.get("UVTilingU"):
-            blender_material.msfs_uv_tiling_u = extension.get("UVTilingU")
-        if extension.get("UVTilingV"):
-            blender_material.msfs_uv_tiling_v = extension.get("UVTilingV")
-        if extension.get("UVRotation"):
-            blender_material.msfs_uv_rotation = extension.get("UVRotation")
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if (
-            (blender_material.msfs_clamp_uv_x
-            or blender_material.msfs_clamp_uv_y
-            or (
-                blender_material.msfs_uv_offset_u != AsoboMaterialUVOptions.Defaults.UVOffsetU
-                or blender_material.msfs_uv_offset_v != AsoboMaterialUVOptions.Defaults.UVOffsetV
-            )
-            or (
-                blender_material.msfs_uv_tiling_u != AsoboMaterialUVOptions.Defaults.UVTilingU
-                or blender_material.msfs_uv_tiling_v != AsoboMaterialUVOptions.Defaults.UVTilingV
-            )
-            or blender_material.msfs_uv_rotation != AsoboMaterialUVOptions.Defaults.UVRotation)
-            and blender_material.msfs_material_type != "msfs_invisible" 
-            and blender_material.msfs_material_type != "msfs_environment_occluder"
-        ):
-            result["clampUVX"] = blender_material.msfs_clamp_uv_x
-            result["clampUVY"] = blender_material.msfs_clamp_uv_y
-            result["UVOffsetU"] = blender_material.msfs_uv_offset_u
-            result["UVOffsetV"] = blender_material.msfs_uv_offset_v
-            result["UVTilingU"] = blender_material.msfs_uv_tiling_u
-            result["UVTilingV"] = blender_material.msfs_uv_tiling_v
-            result["UVRotation"] = blender_material.msfs_uv_rotation
-
-            gltf2_material.extensions[AsoboMaterialUVOptions.SerializedName] = Extension(
-                name=AsoboMaterialUVOptions.SerializedName,
-                extension=result,
-                required=False,
-            )
+    Elision = "EXTENSION"
+    # the deprecated clampUVZ key is ignored on import, it was set to msfs_clamp_uv_z which doesn't exist
+    Fields = (
+        Field("clampUVX", "msfs_clamp_uv_x", Defaults.clampUVX),
+        Field("clampUVY", "msfs_clamp_uv_y", Defaults.clampUVY),
+        Field("UVOffsetU", "msfs_uv_offset_u", Defaults.UVOffsetU),
+        Field("UVOffsetV", "msfs_uv_offset_v", Defaults.UVOffsetV),
+        Field("UVTilingU", "msfs_uv_tiling_u", Defaults.UVTilingU),
+        Field("UVTilingV", "msfs_uv_tiling_v", Defaults.UVTilingV),
+        Field("UVRotation", "msfs_uv_rotation", Defaults.UVRotation),
+    )
 
 
+@compile_extension
 class AsoboMaterialShadowOptions:
 
     SerializedName = "ASOBO_material_shadow_options"
@@ -1083,33 +826,13 @@ class AsoboMaterialShadowOptions:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialShadowOptions.SerializedName)
-        if extension is None:
-            return
-
-        if extension.get("noCastShadow"):
-            blender_material.msfs_no_cast_shadow = extension.get("noCastShadow")
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if blender_material.msfs_no_cast_shadow:
-            result["noCastShadow"] = blender_material.msfs_no_cast_shadow
-
-            gltf2_material.extensions[AsoboMaterialShadowOptions.SerializedName] = Extension(
-                name=AsoboMaterialShadowOptions.SerializedName,
-                extension=result,
-                required=False,
-            )
+    Elision = "EXTENSION"
+    Fields = (
+        Field("noCastShadow", "msfs_no_cast_shadow", Defaults.noCastShadow),
+    )
 
 
+@compile_extension
 class AsoboMaterialResponsiveAAOptions:
 
     SerializedName = "ASOBO_material_antialiasing_options"
@@ -1123,36 +846,17 @@ class AsoboMaterialResponsiveAAOptions:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialResponsiveAAOptions.SerializedName)
-        if extension is None:
-            return
-
-        if extension.get("responsiveAA"):
-            blender_material.msfs_responsive_aa = extension.get("responsiveAA")
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if blender_material.msfs_responsive_aa:
-            result["responsiveAA"] = blender_material.msfs_responsive_aa
-
-            gltf2_material.extensions[AsoboMaterialResponsiveAAOptions.SerializedName] = Extension(
-                name=AsoboMaterialResponsiveAAOptions.SerializedName,
-                extension=result,
-                required=False,
-            )
+    Elision = "EXTENSION"
+    Fields = (
+        Field("responsiveAA", "msfs_responsive_aa", Defaults.responsiveAA),
+    )
 
 
+@compile_extension
 class AsoboMaterialDetail:
 
     SerializedName = "ASOBO_material_detail_map"
+    ExcludedMaterialTypes = ("NONE", "msfs_parallax", "msfs_invisible", "msfs_environment_occluder")
 
     class Defaults:
         UVScale = 1.0
@@ -1205,142 +909,34 @@ class AsoboMaterialDetail:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialDetail.SerializedName)
-        if extension is None:
-            return
-
-        if extension.get("UVScale"):
-            blender_material.msfs_detail_uv_scale = extension.get("UVScale")
-        if extension.get("UVOffset"):
-            blender_material.msfs_detail_uv_offset_u = extension.get("UVOffset")[0]
-            blender_material.msfs_detail_uv_offset_v = extension.get("UVOffset")[1]
-        if extension.get("blendThreshold"):
-            blender_material.msfs_detail_blend_threshold = extension.get("blendThreshold")
-        if extension.get("detailColorTexture"):
-            blender_material.msfs_detail_color_texture = MSFSMaterial.create_image(extension.get("detailColorTexture", {}).get("index"), import_settings)
-        if extension.get("detailNormalTexture"):
-            blender_material.msfs_detail_normal_texture = MSFSMaterial.create_image(extension.get("detailNormalTexture", {}).get("index"), import_settings)
-            if extension.get("detailNormalTexture").get("scale"): # TODO:  check that this works properly
-                blender_material.msfs_detail_normal_scale = extension.get("detailNormalTexture").get("scale")
-        if extension.get("detailMetalRoughAOTexture"):
-            blender_material.msfs_detail_occlusion_metallic_roughness_texture = MSFSMaterial.create_image(extension.get("detailMetalRoughAOTexture", {}).get("index"), import_settings)
-        if extension.get("blendMaskTexture"):
-            blender_material.msfs_blend_mask_texture = MSFSMaterial.create_image(extension.get("blendMaskTexture", {}).get("index"), import_settings)
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        from ..io.msfs_material import MSFSMaterial
-        hasTexture = False
-        result = {}
-        #print("AsoboMaterialDetail - to extension start")
-        if (blender_material.msfs_material_type != "NONE" 
-            and blender_material.msfs_material_type != "msfs_parallax" 
-            and blender_material.msfs_material_type != "msfs_invisible" 
-            and blender_material.msfs_material_type != "msfs_environment_occluder"):
-
-            #print("AsoboMaterialDetail - to extension mat type", blender_material.msfs_material_type)
-            if blender_material.msfs_detail_color_texture is not None:
-                print("AsoboMaterialDetail - to extension Detail Color", blender_material.msfs_detail_color_texture)
-                result["detailColorTexture"] = MSFSMaterial.export_image(
-                    blender_material,
-                    blender_material.msfs_detail_color_texture,
-                    "DEFAULT",
-                    export_settings,
-                )
-                hasTexture = True
-
-            if blender_material.msfs_detail_normal_texture is not None:
-                print("AsoboMaterialDetail - to extension Normal", blender_material.msfs_detail_normal_texture)
-                result["detailNormalTexture"] = MSFSMaterial.export_image(
-                    blender_material,
-                    blender_material.msfs_detail_normal_texture,
-                    "NORMAL",
-                    export_settings,
-                    normal_scale=blender_material.msfs_detail_normal_scale,
-                )
-                hasTexture = True
-
-            if blender_material.msfs_detail_occlusion_metallic_roughness_texture is not None:
-                print("AsoboMaterialDetail - to extension Occlusion", blender_material.msfs_detail_occlusion_metallic_roughness_texture)
-                result["detailMetalRoughAOTexture"] = MSFSMaterial.export_image(
-                    blender_material,
-                    blender_material.msfs_detail_occlusion_metallic_roughness_texture,
-                    "DEFAULT",
-                    export_settings,
-                )
-                hasTexture = True
-
-            if blender_material.msfs_blend_mask_texture is not None:
-                print("AsoboMaterialDetail - to extension blend mask", blender_material.msfs_blend_mask_texture)
-                result["blendMaskTexture"] = MSFSMaterial.export_image(
-                    blender_material,
-                    blender_material.msfs_blend_mask_texture,
-                    "DEFAULT",
-                    export_settings,
-                )
-                hasTexture = True
-            
-            if hasTexture:
-                #print("AsoboMaterialDetail - to extension has texture")
-                if (blender_material.msfs_detail_uv_scale != AsoboMaterialDetail.Defaults.UVScale):
-                    result["UVScale"] = blender_material.msfs_detail_uv_scale
-                if (blender_material.msfs_detail_blend_threshold != AsoboMaterialDetail.Defaults.blendThreshold):
-                    result["blendThreshold"] = blender_material.msfs_detail_blend_threshold
-                if (blender_material.msfs_detail_uv_offset_u != AsoboMaterialDetail.Defaults.UVOffset[0]
-                    or blender_material.msfs_detail_uv_offset_v != AsoboMaterialDetail.Defaults.UVOffset[1]):
-                    result["UVOffset"] = (blender_material.msfs_detail_uv_offset_u, blender_material.msfs_detail_uv_offset_v)
-            
-            if result:
-                #print("AsoboMaterialDetail - to extension  result", result)
-                gltf2_material.extensions[AsoboMaterialDetail.SerializedName] = Extension(
-                    name=AsoboMaterialDetail.SerializedName,
-                    extension=result,
-                    required=False,
-                )
+    Elision = "FIELD"
+    ValuesRequireTexture = True
+    Fields = (
+        Field("detailColorTexture", "msfs_detail_color_texture", texture=True),
+        Field("detailNormalTexture", "msfs_detail_normal_texture", texture=True, normal_scale_prop="msfs_detail_normal_scale"),
+        Field("detailMetalRoughAOTexture", "msfs_detail_occlusion_metallic_roughness_texture", texture=True),
+        Field("blendMaskTexture", "msfs_blend_mask_texture", texture=True),
+        Field("UVScale", "msfs_detail_uv_scale", Defaults.UVScale),
+        Field("blendThreshold", "msfs_detail_blend_threshold", Defaults.blendThreshold),
+        Field("UVOffset", ("msfs_detail_uv_offset_u", "msfs_detail_uv_offset_v"), Defaults.UVOffset),
+    )
 
 
+@compile_extension
 class AsoboMaterialFakeTerrain:
 
     SerializedName = "ASOBO_material_fake_terrain"
+    MaterialTypes = ("msfs_fake_terrain",)
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialFakeTerrain.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_material_type = "msfs_fake_terrain"
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if blender_material.msfs_material_type == "msfs_fake_terrain":
-            result["enabled"] = True
-
-            gltf2_material.extensions[AsoboMaterialFakeTerrain.SerializedName] = Extension(
-                name=AsoboMaterialFakeTerrain.SerializedName,
-                extension=result,
-                required=False,
-            )
+    ImportMaterialType = "msfs_fake_terrain"
+    Constants = {"enabled": True}
 
 
+@compile_extension
 class AsoboMaterialFresnelFade:
 
     SerializedName = "ASOBO_material_fresnel_fade"
+    MaterialTypes = ("msfs_fresnel_fade",)
 
     class Defaults:
         # LHC request
@@ -1363,41 +959,18 @@ class AsoboMaterialFresnelFade:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboMaterialFresnelFade.SerializedName)
-        if extension is None:
-            return
-        
-        blender_material.msfs_material_type = "msfs_fresnel_fade"
-
-        if extension.get("fresnelFactor"):
-            blender_material.msfs_fresnel_factor = extension.get("fresnelFactor")
-        if extension.get("fresnelOpacityOffset"):
-            blender_material.msfs_fresnel_opacity_offset = extension.get("fresnelOpacityOffset")
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if blender_material.msfs_material_type == "msfs_fresnel_fade":
-            result["fresnelFactor"] = blender_material.msfs_fresnel_factor
-            result["fresnelOpacityOffset"] = blender_material.msfs_fresnel_opacity_offset
-
-            gltf2_material.extensions[AsoboMaterialFresnelFade.SerializedName] = Extension(
-                name=AsoboMaterialFresnelFade.SerializedName,
-                extension=result,
-                required=False,
-            )
+    ImportMaterialType = "msfs_fresnel_fade"
+    Fields = (
+        Field("fresnelFactor", "msfs_fresnel_factor", Defaults.fresnelFactor),
+        Field("fresnelOpacityOffset", "msfs_fresnel_opacity_offset", Defaults.fresnelOpacityOffset),
+    )
 
 
+@compile_extension
 class AsoboSSS:
 
     SerializedName = "ASOBO_material_SSS"  # This entire extension is disabled for the time being. Keeping just in case
+    MaterialTypes = ("msfs_sss", "msfs_hair")
 
     class Defaults:
         SSSColor = [1.0, 1.0, 1.0, 1.0]
@@ -1414,62 +987,25 @@ class AsoboSSS:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboSSS.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_material_type = "msfs_sss"
-
-        if extension.get("SSSColor"):
-            blender_material.msfs_sss_color = extension.get("SSSColor")
-        if extension.get("opacityTexture"):
-            blender_material.msfs_opacity_texture = MSFSMaterial.create_image(
-                extension.get("opacityTexture", {}).get("index"), import_settings
-            )
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        result = {}
-        if (
-            blender_material.msfs_material_type == "msfs_sss"
-            or blender_material.msfs_material_type == "msfs_hair"
-        ):
-            if blender_material.msfs_sss_color:
-                result["SSSColor"] = list(blender_material.msfs_sss_color)
-
-            if blender_material.msfs_opacity_texture is not None:
-                result["opacityTexture"] = MSFSMaterial.export_image(
-                    blender_material,
-                    blender_material.msfs_opacity_texture,
-                    "DEFAULT",
-                    export_settings,
-                )
-
-            if result:
-                gltf2_material.extensions[AsoboSSS.SerializedName] = Extension(
-                    name=AsoboSSS.SerializedName, extension=result, required=False
-                )
+    ImportMaterialType = "msfs_sss"
+    Fields = (
+        Field("SSSColor", "msfs_sss_color", Defaults.SSSColor, convert=list),
+        Field("opacityTexture", "msfs_opacity_texture", texture=True),
+    )
 
 
+@compile_extension
 class AsoboAnisotropic:
 
     SerializedName = "ASOBO_material_anisotropic"
+    MaterialTypes = ("msfs_anisotropic", "msfs_hair")
+
+    Fields = (
+        Field("anisotropicTexture", "msfs_extra_slot1_texture", texture=True, required=True),
+    )
 
     @staticmethod
     def from_dict(blender_material, gltf2_material, import_settings):
-        from ..io.msfs_material import MSFSMaterial
-
         extensions = gltf2_material.extensions
         if extensions is None:
             return
@@ -1484,35 +1020,14 @@ class AsoboAnisotropic:
             blender_material.msfs_material_type = "msfs_hair"  # SSS and hair share identical properties, except for this. If present, switch from SSS to hair
         else:
             blender_material.msfs_material_type = "msfs_anisotropic"
-        if extension.get("anisotropicTexture"):
-            blender_material.msfs_extra_slot1_texture = MSFSMaterial.create_image(
-                extension.get("anisotropicTexture", {}).get("index"), import_settings
-            )
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        result = {}
-        if (blender_material.msfs_material_type == "msfs_anisotropic" 
-            or blender_material.msfs_material_type == "msfs_hair"):
-
-            if blender_material.msfs_extra_slot1_texture is not None:
-                result["anisotropicTexture"] = MSFSMaterial.export_image(
-                    blender_material,
-                    blender_material.msfs_extra_slot1_texture,
-                    "DEFAULT",
-                    export_settings,
-                )
-
-                gltf2_material.extensions[AsoboAnisotropic.SerializedName] = Extension(
-                    name=AsoboAnisotropic.SerializedName, extension=result, required=False
-                )
+        AsoboAnisotropic.import_fields(blender_material, extension, import_settings)
 
 
+@compile_extension
 class AsoboWindshield:
 
     SerializedName = "ASOBO_material_windshield"
+    MaterialTypes = ("msfs_windshield",)
 
     class Defaults:
         rainDropScale = 1.0
@@ -1561,108 +1076,34 @@ class AsoboWindshield:
         options={"ANIMATABLE"},
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboWindshield.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_material_type = "msfs_windshield"
-
-        if extension.get("rainDropScale"):
-            blender_material.msfs_rain_drop_scale = extension.get("rainDropScale")
-        if extension.get("wiper1State"):
-            blender_material.msfs_wiper_1_state = extension.get("wiper1State")
-        if extension.get("wiper2State"):
-            blender_material.msfs_wiper_2_state = extension.get("wiper2State")
-        if extension.get("wiper3State"):
-            blender_material.msfs_wiper_3_state = extension.get("wiper3State")
-        if extension.get("wiper4State"):
-            blender_material.msfs_wiper_4_state = extension.get("wiper4State")
-        if extension.get("wiperMaskTexture"):
-            blender_material.msfs_extra_slot1_texture = MSFSMaterial.create_image(
-                extension.get("wiperMaskTexture", {}).get("index"), import_settings
-            )
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        result = {}
-        if blender_material.msfs_material_type == "msfs_windshield":
-            result["rainDropScale"] = blender_material.msfs_rain_drop_scale
-            result["wiper1State"] = blender_material.msfs_wiper_1_state
-            result["wiper2State"] = blender_material.msfs_wiper_2_state
-            result["wiper3State"] = blender_material.msfs_wiper_3_state
-            result["wiper4State"] = blender_material.msfs_wiper_4_state
-            if blender_material.msfs_extra_slot1_texture is not None:
-                result["wiperMaskTexture"] = MSFSMaterial.export_image(
-                    blender_material,
-                    blender_material.msfs_extra_slot1_texture,
-                    "DEFAULT",
-                    export_settings,
-                )
-
-            gltf2_material.extensions[AsoboWindshield.SerializedName] = Extension(
-                name=AsoboWindshield.SerializedName, extension=result, required=False
-            )
+    ImportMaterialType = "msfs_windshield"
+    Fields = (
+        Field("rainDropScale", "msfs_rain_drop_scale", Defaults.rainDropScale),
+        Field("wiper1State", "msfs_wiper_1_state", Defaults.wiper1State),
+        Field("wiper2State", "msfs_wiper_2_state", Defaults.wiper2State),
+        Field("wiper3State", "msfs_wiper_3_state", Defaults.wiper3State),
+        Field("wiper4State", "msfs_wiper_4_state", Defaults.wiper4State),
+        Field("wiperMaskTexture", "msfs_extra_slot1_texture", texture=True),
+    )
 
 
+@compile_extension
 class AsoboClearCoat:
 
     SerializedName = "ASOBO_material_clear_coat"
+    MaterialTypes = ("msfs_clearcoat",)
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboClearCoat.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_material_type = "msfs_clearcoat"
-
-        if extension.get("dirtTexture"):
-            blender_material.msfs_dirt_texture = MSFSMaterial.create_image(
-                extension.get("dirtTexture", {}).get("index"), import_settings
-            )
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        result = {}
-        if (
-            blender_material.msfs_material_type == "msfs_clearcoat"
-            and blender_material.msfs_dirt_texture
-        ):
-            result["dirtTexture"] = MSFSMaterial.export_image(
-                blender_material,
-                blender_material.msfs_dirt_texture,
-                "DEFAULT",
-                export_settings,
-            )
-
-            gltf2_material.extensions[AsoboClearCoat.SerializedName] = Extension(
-                name=AsoboClearCoat.SerializedName, extension=result, required=False
-            )
+    ImportMaterialType = "msfs_clearcoat"
+    Fields = (
+        Field("dirtTexture", "msfs_dirt_texture", texture=True, required=True),
+    )
 
 
+@compile_extension
 class AsoboParallaxWindow:
 
     SerializedName = "ASOBO_material_parallax_window"
+    MaterialTypes = ("msfs_parallax",)
 
     class Defaults:
         parallaxScale = 0.0
@@ -1709,66 +1150,23 @@ class AsoboParallaxWindow:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboParallaxWindow.SerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_material_type = "msfs_parallax"
-        if extension.get("parallaxScale"):
-            blender_material.msfs_parallax_scale = extension.get("parallaxScale")
-        if extension.get("roomSizeXScale"):
-            blender_material.msfs_parallax_room_size_x = extension.get("roomSizeXScale")
-        if extension.get("roomSizeYScale"):
-            blender_material.msfs_parallax_room_size_y = extension.get("roomSizeYScale")
-        if extension.get("roomNumberXY"):
-            blender_material.msfs_parallax_room_number_xy = extension.get("roomNumberXY")
-        if extension.get("corridor"):
-            blender_material.msfs_parallax_corridor = extension.get("corridor")
-        if extension.get("behindWindowMapTexture"):
-            blender_material.msfs_detail_color_texture = MSFSMaterial.create_image(
-                extension.get("behindWindowMapTexture", {}).get("index"), import_settings
-            )
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        from ..io.msfs_material import MSFSMaterial
-
-        result = {}
-        if blender_material.msfs_material_type == "msfs_parallax":
-            result["parallaxScale"] = blender_material.msfs_parallax_scale
-            result["roomSizeXScale"] = blender_material.msfs_parallax_room_size_x
-            result["roomSizeYScale"] = blender_material.msfs_parallax_room_size_y
-            result["roomNumberXY"] = blender_material.msfs_parallax_room_number_xy
-            result["corridor"] = blender_material.msfs_parallax_corridor
-
-            if blender_material.msfs_detail_color_texture is not None:
-                result["behindWindowMapTexture"] = MSFSMaterial.export_image(
-                    blender_material,
-                    blender_material.msfs_detail_color_texture,
-                    "DEFAULT",
-                    export_settings,
-                )
-
-            gltf2_material.extensions[AsoboParallaxWindow.SerializedName] = Extension(
-                name=AsoboParallaxWindow.SerializedName,
-                extension=result,
-                required=False,
-            )
+    ImportMaterialType = "msfs_parallax"
+    Fields = (
+        Field("parallaxScale", "msfs_parallax_scale", Defaults.parallaxScale),
+        Field("roomSizeXScale", "msfs_parallax_room_size_x", Defaults.roomSizeXScale),
+        Field("roomSizeYScale", "msfs_parallax_room_size_y", Defaults.roomSizeYScale),
+        Field("roomNumberXY", "msfs_parallax_room_number_xy", Defaults.roomNumberXY),
+        Field("corridor", "msfs_parallax_corridor", Defaults.corridor),
+        Field("behindWindowMapTexture", "msfs_detail_color_texture", texture=True),
+    )
 
 
+@compile_extension
 class AsoboGlass:
 
     SerializedName = "ASOBO_material_glass"
     AlternateSerializedName = "ASOBO_material_kitty_glass"
+    MaterialTypes = ("msfs_glass",)
 
     class Defaults:
         glassReflectionMaskFactor = 0.0
@@ -1790,41 +1188,17 @@ class AsoboGlass:
         options=set(),
     )
 
-    @staticmethod
-    def from_dict(blender_material, gltf2_material, import_settings):
-        extensions = gltf2_material.extensions
-        if extensions is None:
-            return
-
-        assert isinstance(extensions, dict)
-        extension = extensions.get(AsoboGlass.SerializedName)
-        if not extension:
-            extension = extensions.get(AsoboGlass.AlternateSerializedName)
-        if extension is None:
-            return
-
-        blender_material.msfs_material_type = "msfs_glass"
-
-        if extension.get("glassReflectionMaskFactor"):
-            blender_material.msfs_glass_reflection_mask_factor = extension.get("glassReflectionMaskFactor")
-        if extension.get("glassDeformationFactor"):
-            blender_material.msfs_glass_deformation_factor = extension.get("glassDeformationFactor")
-
-    @staticmethod
-    def to_extension(blender_material, gltf2_material, export_settings):
-        result = {}
-        if blender_material.msfs_material_type == "msfs_glass":
-            result["glassReflectionMaskFactor"] = blender_material.msfs_glass_reflection_mask_factor
-            result["glassDeformationFactor"] = blender_material.msfs_glass_deformation_factor
-
-            gltf2_material.extensions[AsoboGlass.SerializedName] = Extension(
-                name=AsoboGlass.SerializedName, extension=result, required=False
-            )
+    ImportMaterialType = "msfs_glass"
+    Fields = (
+        Field("glassReflectionMaskFactor", "msfs_glass_reflection_mask_factor", Defaults.glassReflectionMaskFactor),
+        Field("glassDeformationFactor", "msfs_glass_deformation_factor", Defaults.glassDeformationFactor),
+    )
 
 
 class AsoboTags:
 
     SerializedName = "ASOBO_tags"
+    ExcludedMaterialTypes = ("msfs_environment_occluder",)
 
     class AsoboTag:
         Collision = "Collision"
@@ -1869,6 +1243,8 @@ class AsoboTags:
                 tags.append(AsoboTags.AsoboTag.Road)
 
             if len(tags) > 0:
+                from io_scene_gltf2.io.com.gltf2_io_extensions import Extension
+
                 result["tags"] = tags
                 gltf2_material.extensions[AsoboTags.SerializedName] = Extension(
                     name=AsoboTags.SerializedName, extension=result, required=False
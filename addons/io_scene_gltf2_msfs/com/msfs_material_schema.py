@@ -0,0 +1,199 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Material extensions are described by a schema on their class:
+#
+#   SerializedName          glTF extension name
+#   AlternateSerializedName other name accepted on import
+#   MaterialTypes           material types the extension is exported for (all when missing)
+#   ExcludedMaterialTypes   material types the extension is never exported for
+#   Fields                  Field list, in the order of the glTF keys
+#   Constants               keys always written, e.g. {"enabled": True}
+#   Switch                  {property: value} set on import, required to export
+#   ImportMaterialType      material type set on import
+#   Elision                 None       every field is written
+#                           EXTENSION  the extension is skipped when every field is at its default
+#                           FIELD      fields at their default are skipped, and so is an empty extension
+#   ValuesRequireTexture    non texture fields are only written when a texture is
+#
+# compile_extension builds from_dict and to_extension from it, unless the class defines its own.
+
+from operator import attrgetter
+
+
+
+class Field:
+    """A glTF key of an extension and the material property (or properties, for a vector) it is stored in"""
+
+    __slots__ = ("key", "props", "default", "texture", "required", "normal_scale_prop", "convert", "get")
+
+    def __init__(self, key, props, default=None, texture=False, required=False, normal_scale_prop=None, convert=None):
+        self.key = key
+        self.props = props if isinstance(props, tuple) else (props,)
+        self.default = tuple(default) if isinstance(default, list) and len(self.props) > 1 else default
+        self.texture = texture
+        self.required = required
+        self.normal_scale_prop = normal_scale_prop
+        self.convert = convert
+        # one property gives its value, several give a tuple
+        self.get = attrgetter(*self.props)
+
+
+def compile_import_fields(fields):
+    texture_fields = tuple(field for field in fields if field.texture)
+    value_fields = tuple((field.key, field.props) for field in fields if not field.texture)
+
+    def import_fields(blender_material, extension, import_settings):
+        for key, props in value_fields:
+            value = extension.get(key)
+            if value:
+                if len(props) == 1:
+                    setattr(blender_material, props[0], value)
+                else:
+                    for prop, component in zip(props, value):
+                        setattr(blender_material, prop, component)
+
+        if texture_fields:
+            from ..io.msfs_material import MSFSMaterial
+
+            for field in texture_fields:
+                texture = extension.get(field.key)
+                if texture:
+                    setattr(blender_material, field.props[0], MSFSMaterial.create_image(texture.get("index"), import_settings))
+                    if field.normal_scale_prop is not None and texture.get("scale"):
+                        setattr(blender_material, field.normal_scale_prop, texture.get("scale"))
+
+    return import_fields
+
+
+def compile_from_dict(extension_class, import_fields):
+    serialized_name = extension_class.SerializedName
+    alternate_name = getattr(extension_class, "AlternateSerializedName", None)
+    import_material_type = getattr(extension_class, "ImportMaterialType", None)
+    switch = tuple(getattr(extension_class, "Switch", {}).items())
+
+    def from_dict(blender_material, gltf2_material, import_settings):
+        extensions = gltf2_material.extensions
+        if extensions is None:
+            return
+
+        extension = extensions.get(serialized_name)
+        if not extension and alternate_name is not None:
+            extension = extensions.get(alternate_name)
+        if extension is None:
+            return
+
+        if import_material_type is not None:
+            blender_material.msfs_material_type = import_material_type
+        for prop, value in switch:
+            setattr(blender_material, prop, value)
+        import_fields(blender_material, extension, import_settings)
+
+    return from_dict
+
+
+def compile_to_extension(extension_class):
+    serialized_name = extension_class.SerializedName
+    material_types = getattr(extension_class, "MaterialTypes", None)
+    material_types = frozenset(material_types) if material_types is not None else None
+    excluded_material_types = frozenset(getattr(extension_class, "ExcludedMaterialTypes", ()))
+    switch = tuple(getattr(extension_class, "Switch", {}).items())
+    constants = tuple(getattr(extension_class, "Constants", {}).items())
+    elision = getattr(extension_class, "Elision", None)
+    values_require_texture = getattr(extension_class, "ValuesRequireTexture", False)
+
+    fields = tuple(extension_class.Fields)
+    value_fields = tuple(field for field in fields if not field.texture)
+    texture_fields = tuple(field for field in fields if field.texture)
+
+    def to_extension(blender_material, gltf2_material, export_settings):
+        material_type = blender_material.msfs_material_type
+        if material_types is not None and material_type not in material_types:
+            return
+        if material_type in excluded_material_types:
+            return
+        for prop, value in switch:
+            if getattr(blender_material, prop) != value:
+                return
+
+        values = {}
+        changed = False
+        for field in value_fields:
+            value = field.get(blender_material)
+            if elision is not None and value == field.default:
+                if elision == "FIELD":
+                    continue
+            else:
+                changed = True
+            values[field.key] = field.convert(value) if field.convert is not None else value
+        if elision == "EXTENSION" and not changed:
+            return
+
+        textures = {}
+        if texture_fields:
+            from ..io.msfs_material import MSFSMaterial
+
+            for field in texture_fields:
+                image = getattr(blender_material, field.props[0])
+                if image is None:
+                    if field.required:
+                        return
+                    continue
+                if field.normal_scale_prop is not None:
+                    textures[field.key] = MSFSMaterial.export_image(
+                        blender_material,
+                        image,
+                        "NORMAL",
+                        export_settings,
+                        normal_scale=getattr(blender_material, field.normal_scale_prop),
+                    )
+                else:
+                    textures[field.key] = MSFSMaterial.export_image(blender_material, image, "DEFAULT", export_settings)
+
+        if values_require_texture and not textures:
+            values = {}
+
+        result = dict(constants)
+        for field in fields:
+            if field.key in values:
+                result[field.key] = values[field.key]
+            elif field.key in textures:
+                result[field.key] = textures[field.key]
+
+        if elision == "FIELD" and not result:
+            return
+
+        # Khronos is only imported once something is exported
+        from io_scene_gltf2.io.com.gltf2_io_extensions import Extension
+
+        gltf2_material.extensions[serialized_name] = Extension(
+            name=serialized_name,
+            extension=result,
+            required=False,
+        )
+
+    return to_extension
+
+
+def compile_extension(extension_class):
+    """Class decorator, builds from_dict and to_extension from the schema of the extension"""
+    extension_class.Fields = getattr(extension_class, "Fields", ())
+    import_fields = compile_import_fields(extension_class.Fields)
+    extension_class.import_fields = staticmethod(import_fields)
+
+    if "from_dict" not in extension_class.__dict__:
+        extension_class.from_dict = staticmethod(compile_from_dict(extension_class, import_fields))
+    if "to_extension" not in extension_class.__dict__:
+        extension_class.to_extension = staticmethod(compile_to_extension(extension_class))
+    return extension_class
@@ -0,0 +1,138 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Writes registration_manifest.py from the sources, without Blender:
+#     python generate_manifest.py
+# Run it again after adding a module, a bpy class, a register() hook or a bpy.types property.
+
+import ast
+import os
+
+MANIFEST_FILE = "registration_manifest.py"
+
+HEADER = """# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Generated by generate_manifest.py, do not edit.
+"""
+
+
+def iter_modules(path, root=""):
+    """(module, file) in the order of the pkgutil walk the add-on used to do"""
+    for name in sorted(os.listdir(path)):
+        full_path = os.path.join(path, name)
+        if os.path.isdir(full_path):
+            if os.path.isfile(os.path.join(full_path, "__init__.py")):
+                yield from iter_modules(full_path, f"{root}.{name}")
+        elif name.endswith(".py") and name != "__init__.py" and root:
+            yield f"{root}.{name[:-3]}", full_path
+
+
+def get_bpy_names(tree):
+    """Names imported from bpy, bpy.types, bpy_extras..."""
+    names = {"bpy"}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.split(".")[0] in ("bpy", "bpy_extras"):
+            names.update(alias.asname or alias.name for alias in node.names)
+        elif isinstance(node, ast.Import):
+            names.update(alias.asname or alias.name for alias in node.names if alias.name.split(".")[0] in ("bpy", "bpy_extras"))
+    return names
+
+
+def get_root_name(node):
+    while isinstance(node, ast.Attribute):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def sets_bpy_property(node, bpy_names):
+    """True for an assignment like bpy.types.Object.prop = ... or Material.prop = ..."""
+    if not isinstance(node, ast.Assign):
+        return False
+    for target in node.targets:
+        if isinstance(target, ast.Attribute) and isinstance(target.value, (ast.Attribute, ast.Name)):
+            if get_root_name(target) in bpy_names:
+                return True
+    return False
+
+
+def read_module(file):
+    with open(file, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), file)
+    bpy_names = get_bpy_names(tree)
+
+    # registered like update_class_list did: classes of the module whose direct base comes from bpy
+    classes = []
+    hooks = False
+    side_effects = False
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            if node.bases and get_root_name(node.bases[0]) in bpy_names:
+                classes.append(node.name)
+            if any(sets_bpy_property(child, bpy_names) for child in node.body):
+                side_effects = True
+        elif isinstance(node, ast.FunctionDef) and node.name in ("register", "unregister"):
+            hooks = True
+        elif sets_bpy_property(node, bpy_names):
+            side_effects = True
+    return classes, hooks, side_effects
+
+
+def generate(path):
+    modules = []
+    classes = []
+    hooks = []
+    for module, file in iter_modules(path):
+        module_classes, module_hooks, side_effects = read_module(file)
+        if module_classes or module_hooks or side_effects:
+            modules.append(module)
+        if module_classes:
+            classes.append((module, tuple(module_classes)))
+        if module_hooks:
+            hooks.append(module)
+
+    lines = [HEADER]
+    lines.append("# modules imported on register, the others are imported on first use")
+    lines.append("MODULES = (")
+    lines.extend(f"    {module!r}," for module in modules)
+    lines.append(")\n")
+    lines.append("# (module, classes) in registration order")
+    lines.append("CLASSES = (")
+    for module, module_classes in classes:
+        lines.append(f"    ({module!r}, (")
+        lines.extend(f"        {name!r}," for name in module_classes)
+        lines.append("    )),")
+    lines.append(")\n")
+    lines.append("# modules with a register() or unregister() function")
+    lines.append("HOOKS = (")
+    lines.extend(f"    {module!r}," for module in hooks)
+    lines.append(")\n")
+
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+if __name__ == "__main__":
+    generate(os.path.dirname(os.path.abspath(__file__)))
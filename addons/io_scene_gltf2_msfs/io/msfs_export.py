@@ -22,6 +22,7 @@ from .msfs_gizmo import MSFSGizmo
 from .msfs_light import MSFSLight
 from .msfs_material import MSFSMaterial
 from .msfs_unique_id import MSFS_unique_id
+from .msfs_vertex_color import MSFSVertexColor
 from datetime import datetime
 
 current_time = {"time": datetime.now(), "timestr": "Zero", "blender_ob": None}
@@ -44,52 +45,46 @@ def global_time(blender_object):
 
 class Export:
 
-    def fix_neutral_bone(self, gltf2_node):
-        print("fix_neutral_bone START - ", gltf2_node.name)
-        neutral_bone = None
-        # base
-        if gltf2_node is None:
-            print("fix_neutral_bone - return None")
+    def fix_neutral_bone(self, gltf2_node, gizmo_objects, export_settings, fix=True):
+        """
+        Extract the gizmos of gltf2_node and its descendants, and rename and tag the neutral bones Khronos adds on the way.
+        The neutral bones are fixed like the recursive walk always did: skinned children are not entered and the walk
+        stops at the first neutral bone returned. Returns the node the scene hook tags with a unique id
+        """
+        MSFSGizmo.export_node(gltf2_node, gizmo_objects, export_settings)
+        if not fix:
+            for child in gltf2_node.children or ():
+                self.fix_neutral_bone(child, gizmo_objects, export_settings, fix=False)
             return None
+
+        neutral_bone = None
         if gltf2_node.children is None:
-            print("fix_neutral_bone - no children", gltf2_node.name)
             if "neutral_bone" in gltf2_node.name:
-                gltf2_node.name = "neutral_bone" + str(random.randrange(1, 100)) 
+                gltf2_node.name = "neutral_bone" + str(random.randrange(1, 100))
                 print("fix_neutral_bone - Neutral Bone no child fixed", gltf2_node.name)
-            #return None
         else:
             # node is orange armature, skin is green armature, joints is bones
-            for c in gltf2_node.children:
-                print("fix_neutral_bone - start c", c)
-                if c.mesh is not None and c.skin is not None:
-                    print("fix_neutral_bone - child c and skin not None", c.name, c.mesh.name, c.skin.name)
+            children = iter(gltf2_node.children)
+            for c in children:
                 if c.skin is None:
-                    print("fix_neutral_bone - child skin is none", c.name)
-                    neutral_bone = self.fix_neutral_bone(c)
-                    if neutral_bone is None:
-                        continue
-                    else:
-                        #pass
+                    neutral_bone = self.fix_neutral_bone(c, gizmo_objects, export_settings)
+                    if neutral_bone is not None:
+                        # the remaining children only have their gizmos extracted
+                        for child in children:
+                            self.fix_neutral_bone(child, gizmo_objects, export_settings, fix=False)
                         return neutral_bone
                 else:
-                    print("fix_neutral_bone - Skin name c", c.skin.name)
                     if c.skin.joints is not None:
                         for neutral_bone in c.skin.joints:
-                            print("fix_neutral_bone - Joints-bones found", neutral_bone.name)
                             if "neutral_bone" in neutral_bone.name:
                                 neutral_bone.name = c.skin.name + "_neutral_bone"
                                 print("fix_neutral_bone - Neutral Bone fixed", neutral_bone.name)
-                                #return neutral_bone
-                    else:
-                        continue
+                    self.fix_neutral_bone(c, gizmo_objects, export_settings, fix=False)
 
-        print("fix_neutral_bone - try extension", gltf2_node.name, neutral_bone, neutral_bone.extensions if neutral_bone is not None else None)
         if "neutral_bone" in gltf2_node.name:
             if gltf2_node.extensions is None:
-                print("fix_neutral_bone - no unique extension")
                 gltf2_node.extensions = {}
             if self.properties.use_unique_id:
-                print("fix_neutral_bone - add unique extension")
                 MSFS_unique_id.export_no_blender_object(gltf2_node)
 
         return neutral_bone
@@ -118,34 +113,23 @@ class Export:
         # with 1.3.3 and my 1.6.3.1 changes to FLOAT_COLOR - this  may not be needed
 
         #print("gather_asset_hook - Started with ", gltf2_asset)
-        selected_objects = bpy.context.selected_objects
-        #active_object = bpy.context.active_object
-        for o in selected_objects:
-        #for o in bpy.context.scene.objects:
-            #print("gather_asset_hook - Scene Object",o)
-            # only for meshes
-            if o.type == 'MESH':
-                obj = o
-                #print("gather_asset_hook - obj", obj, obj.data)
-                for ca in obj.data.color_attributes:
-                    #print("gather_asset_hook - ca",ca)
-                    if ca.data_type != 'FLOAT_COLOR':
-                        #print("gather_asset_hook - col before", obj, ca.domain, ca.data_type)
-                        bpy.context.view_layer.objects.active = obj
-                        #print("gather_asset_hook - col view_layer", obj, ca.domain, ca.data_type)
-                        try:
-                            bpy.ops.geometry.attribute_convert(mode='GENERIC', domain='CORNER', data_type='FLOAT_COLOR')
-                        except:
-                            print("*** MSFS WARNING *** - Error attribute convert to FLOAT COLOR", obj, obj.data, ca.domain, ca.data_type)
-                        for ca in obj.data.color_attributes:
-                            #print("gather_asset_hook - col after", obj, ca.data_type)
-                            pass
+        # convert in bulk with the data API, the original attributes are put back in gather_gltf_extensions_hook
+        meshes = {o.data for o in bpy.context.selected_objects if o.type == 'MESH'}
+        if MSFSVertexColor.convert_meshes(meshes):
+            # make the evaluated meshes used by the exporter pick up the new attributes
+            bpy.context.view_layer.update()
+            # the extensions hook is never reached if the export fails
+            MSFSVertexColor.restore_after_operator()
         #print("gather_asset_hook - Done")
 
     # def gather_gltf_encoded_hook(self, export_settings, gltf_format, sort_order):
         # print("gather_gltf_encoded_hook - started")
 
     def gather_gltf_extensions_hook(self, gltf2_plan, export_settings):
+        # the export is gathered, put back the color attributes converted in gather_asset_hook
+        MSFSVertexColor.restore()
+        MSFSMaterial.export_cleanup(export_settings)
+
         # print("gather_gltf_extensions_hook - export_settings", export_settings["gltf_user_extensions"])
         # for ex in export_settings["gltf_user_extensions"]:
             # print("ex", ex, ex.Extension, ex.properties, ex.properties.enabled, ex.properties.enable_msfs_extension, ex.properties.use_unique_id)
@@ -183,26 +167,20 @@ class Export:
                 MSFS_unique_id.export(gltf2_node, blender_bone)
 
     def gather_scene_hook(self, gltf2_scene, blender_scene, export_settings):
-        if self.properties.enable_msfs_extension and MSFSGizmo:
-            #print("gather_scene_hook - properties enabled", MSFSGizmo)
-            MSFSGizmo.export(gltf2_scene.nodes, blender_scene, export_settings)
+        if not self.properties.enable_msfs_extension:
+            return
 
-        if self.properties.enable_msfs_extension:
-            #print("Scene gltf2_scene_nodes", gltf2_scene.nodes, gltf2_scene.extras)
-            for gltf2_node in gltf2_scene.nodes: 
-                if gltf2_node is None:
-                    continue
-                #if gltf2_node.children is None:
-                #    continue
-                print("Scene node loop", gltf2_node.name)
-                gltf2_object = self.fix_neutral_bone(gltf2_node)
-                print("return Scene object", gltf2_node.name, gltf2_object, gltf2_object.name if gltf2_object is not None else None)
-                # there is no blender_object because of Khronos stupid neutral_bone thing
-
-                if gltf2_object is not None and gltf2_object.extensions is None:
-                    gltf2_object.extensions = {}
-                if self.properties.use_unique_id and gltf2_object is not None:
-                    MSFS_unique_id.export_no_blender_object(gltf2_object)
+        # one walk of the scene for the gizmos and the neutral bones
+        gizmo_objects = MSFSGizmo.get_object_index(blender_scene)
+        for gltf2_node in gltf2_scene.nodes:
+            if gltf2_node is None:
+                continue
+            gltf2_object = self.fix_neutral_bone(gltf2_node, gizmo_objects, export_settings)
+            # there is no blender_object because of Khronos stupid neutral_bone thing
+            if gltf2_object is not None and gltf2_object.extensions is None:
+                gltf2_object.extensions = {}
+            if self.properties.use_unique_id and gltf2_object is not None:
+                MSFS_unique_id.export_no_blender_object(gltf2_object)
 
     def gather_material_hook(self, gltf2_material, blender_material, export_settings):
         # blender 4.0 and now 3.6 issue with detail textures added twice once correct and once as a regular basecolor texture
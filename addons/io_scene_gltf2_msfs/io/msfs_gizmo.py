@@ -127,78 +127,99 @@ class MSFSGizmo:
         # The Khronos importer auto-calculates the empty display size, so we need to reset it to 1
         blender_object.empty_display_size = 1.0
 
+    @staticmethod
+    def get_object_index(blender_scene):
+        """
+        Name -> object for the collision gizmos of the scene parented to a mesh, the only ones exported as mesh extensions.
+        The glTF exporter will ALWAYS set the node name as the blender name
+        """
+        return {
+            blender_object.name: blender_object
+            for blender_object in blender_scene.objects
+            if blender_object.msfs_gizmo_type != "NONE" and blender_object.parent is not None and blender_object.parent.type == "MESH"
+        }
+
+    @staticmethod
+    def gather_collision(child, blender_object, export_settings):
+        result = {}
+        result["type"] = blender_object.msfs_gizmo_type
+        result["translation"] = child.translation
+        if child.rotation:
+            result["rotation"] = child.rotation
+
+        if child.scale is None: # If the scale is default, it will be exported as None which will raise an error here
+            child.scale = [1.0, 1.0, 1.0]
+
+        # Flip scale to match MSFS gizmo scale system
+        if export_settings["gltf_yup"]:
+            child.scale = [child.scale[2], child.scale[0], child.scale[1]]
+        else:
+            child.scale = [child.scale[1], child.scale[0], child.scale[2]]
+
+        # Calculate scale per gizmo type
+        scale = {}
+        if blender_object.msfs_gizmo_type == "sphere":
+            scale["radius"] = abs(child.scale[0] * child.scale[1] * child.scale[2])
+        elif blender_object.msfs_gizmo_type == "box":
+            scale["length"] = abs(child.scale[0]) * 2
+            scale["width"] = abs(child.scale[1]) * 2
+            scale["height"] = abs(child.scale[2]) * 2
+        elif blender_object.msfs_gizmo_type == "cylinder":
+            scale["radius"] = abs(child.scale[0] * child.scale[1])
+            scale["height"] = abs(child.scale[2])
+
+        result["params"] = scale
+
+        # Collision type
+        tags = ["Collision"]
+        if blender_object.msfs_collision_is_road_collider:
+            tags.append("Road")
+
+        result["extensions"] = {
+            "ASOBO_tags": Extension(
+                name="ASOBO_tags", extension={"tags": tags}, required=False
+            )
+        }
+        return result
+
+    @staticmethod
+    def export_node(node, gizmo_objects, export_settings):
+        """
+        Remove the gizmo children of node and set them as its mesh extension, in one pass over the children.
+        gizmo_objects is the index of get_object_index
+        """
+        if not node.children:
+            return
+
+        collisions = []
+        children = []
+        for child in node.children:
+            blender_object = gizmo_objects.get(child.name)
+            if blender_object is None: # Not a gizmo, or a fake node the exporter created that doesn't exist in the scene
+                children.append(child)
+                continue
+            collisions.append(MSFSGizmo.gather_collision(child, blender_object, export_settings))
+
+        if collisions:
+            node.children = children
+            if node.mesh.extensions is None:
+                node.mesh.extensions = {}
+            node.mesh.extensions[MSFSGizmo.extension_name] = Extension(
+                name=MSFSGizmo.extension_name,
+                extension={"gizmo_objects": collisions},
+                required=False,
+            )
+
     @staticmethod
     def export(nodes, blender_scene, export_settings):
         """
         Let the Khronos exporter gather the gizmo to calculate the proper TRS with the parent to make sure everything is correct,
         then remove the gizmo from the collected nodes and set the proper mesh extensions
         """
-        #print("gizmo nodes start", nodes)
-        for node in nodes:
-            collisions = []  # TODO: make sure node is mesh?
-            #print("gizmo node", node, node.children)
-            if node.children is not None:
-                # is there a list of things in node
-                for child in list(node.children):
-                    #print("gizmo child", child)
-                    blender_object = blender_scene.objects.get(child.name)  # The glTF exporter will ALWAYS set the node name as the blender name
-                    if blender_object is None: # However, there are cases where the exporter creates fake nodes that don't exist in the scene
-                        continue
-                    # We only need the collision gizmos that are parented to a mesh
-                    if (blender_object.parent is None or blender_object.parent.type != "MESH"):  
-                        continue
-
-                    if blender_object.msfs_gizmo_type != "NONE":
-                        #print("gizmo child type", child, blender_object.msfs_gizmo_type)
-                        result = {}
-                        result["type"] = blender_object.msfs_gizmo_type
-                        result["translation"] = child.translation
-                        if child.rotation:
-                            result["rotation"] = child.rotation
-
-                        if child.scale is None: # If the scale is default, it will be exported as None which will raise an error here
-                            child.scale = [1.0, 1.0, 1.0]
-
-                        # Flip scale to match MSFS gizmo scale system
-                        if export_settings["gltf_yup"]:
-                            child.scale = [child.scale[2], child.scale[0], child.scale[1]]
-                        else:
-                            child.scale = [child.scale[1], child.scale[0], child.scale[2]]
-
-                        # Calculate scale per gizmo type
-                        scale = {}
-                        if blender_object.msfs_gizmo_type == "sphere":
-                            scale["radius"] = abs(child.scale[0] * child.scale[1] * child.scale[2])
-                        elif blender_object.msfs_gizmo_type == "box":
-                            scale["length"] = abs(child.scale[0]) * 2
-                            scale["width"] = abs(child.scale[1]) * 2
-                            scale["height"] = abs(child.scale[2]) * 2
-                        elif blender_object.msfs_gizmo_type == "cylinder":
-                            scale["radius"] = abs(child.scale[0] * child.scale[1])
-                            scale["height"] = abs(child.scale[2])
-
-                        result["params"] = scale
-
-                        # Collision type
-                        tags = ["Collision"]
-                        if blender_object.msfs_collision_is_road_collider:
-                            tags.append("Road")
-
-                        result["extensions"] = {
-                            "ASOBO_tags": Extension(
-                                name="ASOBO_tags", extension={"tags": tags}, required=False
-                            )
-                        }
-
-                        collisions.append(result)
-                        node.children.remove(child)
-
-                if collisions:
-                    node.mesh.extensions[MSFSGizmo.extension_name] = Extension(
-                        name=MSFSGizmo.extension_name,
-                        extension={"gizmo_objects": collisions},
-                        required=False,
-                    )
-
-                MSFSGizmo.export(node.children, blender_scene, export_settings)
-        #print("gizmo nodes - FINISHED")
+        gizmo_objects = MSFSGizmo.get_object_index(blender_scene)
+        stack = [node for node in nodes if node is not None]
+        while stack:
+            node = stack.pop()
+            MSFSGizmo.export_node(node, gizmo_objects, export_settings)
+            if node.children:
+                stack.extend(node.children)
@@ -14,34 +14,62 @@
 
 import bpy
 
-# for Blender 4.5 - reanme Khronos files for import- ronh
-
-
-if bpy.app.version >= (4, 5, 0):
-    from io_scene_gltf2.blender.imp.image import BlenderImage
-    from io_scene_gltf2.blender.exp.material.search_node_tree import (
-        NodeSocket
-    )
-    from io_scene_gltf2.blender.exp.material.texture_info import (
-        gather_material_normal_texture_info_class,
-        gather_material_occlusion_texture_info_class,
-        gather_texture_info
-    )
-    from io_scene_gltf2.blender.com.material_helpers import get_gltf_old_group_node_name
-elif bpy.app.version >= (4, 2, 0):
-
-    if bpy.app.version < (4, 2, 99):
-        from io_scene_gltf2.blender.exp.material.gltf2_blender_search_node_tree import (
+# Khronos internals, imported on first use by load_khronos() to keep the add-on start up light
+khronos_loaded = False
+
+
+def load_khronos():
+    global khronos_loaded, BlenderImage, NodeSocket, gather_material_normal_texture_info_class, \
+        gather_material_occlusion_texture_info_class, gather_texture_info, get_gltf_old_group_node_name, \
+        get_texture_node_from_socket, from_socket, FilterByType, previous_node, get_const_from_socket, \
+        get_socket, get_texture_transform_from_mapping_node, check_if_is_linked_to_active_output
+    if khronos_loaded:
+        return
+
+    # for Blender 4.5 - reanme Khronos files for import- ronh
+    if bpy.app.version >= (4, 5, 0):
+        from io_scene_gltf2.blender.imp.image import BlenderImage
+        from io_scene_gltf2.blender.exp.material.search_node_tree import (
             NodeSocket
         )
-elif bpy.app.version >= (3, 6, 0):
+        from io_scene_gltf2.blender.exp.material.texture_info import (
+            gather_material_normal_texture_info_class,
+            gather_material_occlusion_texture_info_class,
+            gather_texture_info
+        )
+        from io_scene_gltf2.blender.com.material_helpers import get_gltf_old_group_node_name
+    elif bpy.app.version >= (4, 2, 0):
 
-    if bpy.app.version < (4, 2, 0):
+        if bpy.app.version < (4, 2, 99):
+            from io_scene_gltf2.blender.exp.material.gltf2_blender_search_node_tree import (
+                NodeSocket
+            )
+    elif bpy.app.version >= (3, 6, 0):
+
+        if bpy.app.version < (4, 2, 0):
+            from io_scene_gltf2.blender.com.gltf2_blender_material_helpers import get_gltf_old_group_node_name
+            from io_scene_gltf2.blender.imp.gltf2_blender_image import BlenderImage
+            from io_scene_gltf2.blender.exp.material.gltf2_blender_gather_texture_info import (
+                gather_material_normal_texture_info_class,
+            	gather_material_occlusion_texture_info_class,
+                gather_texture_info
+            )
+            from io_scene_gltf2.blender.exp.material.gltf2_blender_search_node_tree import \
+                get_texture_node_from_socket, \
+                from_socket, \
+                FilterByType, \
+                previous_node, \
+                get_const_from_socket, \
+                NodeSocket, \
+                get_socket, \
+                get_texture_transform_from_mapping_node, \
+                check_if_is_linked_to_active_output
+    else:
         from io_scene_gltf2.blender.com.gltf2_blender_material_helpers import get_gltf_old_group_node_name
         from io_scene_gltf2.blender.imp.gltf2_blender_image import BlenderImage
-        from io_scene_gltf2.blender.exp.material.gltf2_blender_gather_texture_info import (
+        from io_scene_gltf2.blender.exp.gltf2_blender_gather_texture_info import (
             gather_material_normal_texture_info_class,
-        	gather_material_occlusion_texture_info_class,
+            gather_material_occlusion_texture_info_class,
             gather_texture_info
         )
         from io_scene_gltf2.blender.exp.material.gltf2_blender_search_node_tree import \
@@ -54,25 +82,10 @@ elif bpy.app.version >= (3, 6, 0):
             get_socket, \
             get_texture_transform_from_mapping_node, \
             check_if_is_linked_to_active_output
-else:
-    from io_scene_gltf2.blender.com.gltf2_blender_material_helpers import get_gltf_old_group_node_name
-    from io_scene_gltf2.blender.imp.gltf2_blender_image import BlenderImage
-    from io_scene_gltf2.blender.exp.gltf2_blender_gather_texture_info import (
-        gather_material_normal_texture_info_class,
-        gather_material_occlusion_texture_info_class,
-        gather_texture_info
-    )
-    from io_scene_gltf2.blender.exp.material.gltf2_blender_search_node_tree import \
-        get_texture_node_from_socket, \
-        from_socket, \
-        FilterByType, \
-        previous_node, \
-        get_const_from_socket, \
-        NodeSocket, \
-        get_socket, \
-        get_texture_transform_from_mapping_node, \
-        check_if_is_linked_to_active_output
+    khronos_loaded = True
+
 
+from ..blender.msfs_material_relink import MSFS_MaterialRelink
 from ..com import msfs_material_props as MSFSMaterialExtensions
 import typing
 
@@ -84,6 +97,7 @@ def get_material_nodes_msfs(node_tree: bpy.types.NodeTree, group_path, type):
     """
     For a given tree, recursively return all nodes including node groups.
     """
+    load_khronos()
 
     # change to look for fake node
     nodes = []
@@ -125,6 +139,7 @@ def get_socket_msfs(blender_material_nodetree, use_nodes: bool, name: str, volum
     :param name: the name of the socket
     :return: a blender NodeSocket
     """
+    load_khronos()
     if blender_material_nodetree and use_nodes:
         #i = [input for input in blender_material.node_tree.inputs]
         #o = [output for output in blender_material.node_tree.outputs]
@@ -152,6 +167,9 @@ def get_socket_msfs(blender_material_nodetree, use_nodes: bool, name: str, volum
 
 # end from Khronos code Socket coe
 
+# scratch node group used to gather the texture infos of the MSFS extension textures
+TEXTURE_INFO_TREE_NAME = "MSFS_TextureInfo"
+
 class MSFSMaterial:
     bl_options = {"UNDO"}
 
@@ -182,11 +200,19 @@ class MSFSMaterial:
         MSFSMaterialExtensions.AsoboMaterialCode,
     ]
 
+    # msfs_material_type -> extensions to export, in the order of extensions
+    export_dispatch = {}
+    # glTF extension name -> index in extensions
+    import_dispatch = {}
+    # indices of the extensions that are always imported
+    import_always = []
+
     def __new__(cls, *args, **kwargs):
         raise RuntimeError("%s should not be instantiated" % cls)
 
     @staticmethod
     def create_image(index, import_settings):
+        load_khronos()
         pytexture = import_settings.data.textures[index]
         BlenderImage.create(import_settings, pytexture.source)
         pyimg = import_settings.data.images[pytexture.source]
@@ -196,174 +222,142 @@ class MSFSMaterial:
         if blender_image_name:
             return bpy.data.images[blender_image_name]
 
+    @staticmethod
+    def get_texture_info_tree(export_settings):
+        """Scratch node group holding the texture nodes gathered during this export"""
+        tree = export_settings.get("msfs_texture_info_tree")
+        if tree is None:
+            # left over from an export that failed
+            leftover = bpy.data.node_groups.get(TEXTURE_INFO_TREE_NAME)
+            if leftover is not None:
+                bpy.data.node_groups.remove(leftover)
+
+            tree = bpy.data.node_groups.new(TEXTURE_INFO_TREE_NAME, "ShaderNodeTree")
+            export_settings["msfs_texture_info_tree"] = tree
+        return tree
+
     @staticmethod
     def export_image(blender_material, blender_image, type, export_settings, normal_scale=None):
-        nodes = blender_material.node_tree.nodes
-        links = blender_material.node_tree.links
-        
-        # should all be in a try finally to remove Fake nodes
-        # Fake Fake Fake Fake Fake Fake Fake Fake Fake Fake 
-
-        # create a material output node so the check_if_is_linked_to_active_output works
-        #material_output_node = nodes.new("ShaderNodeOutputMaterial")
-        #material_output_node.name = "FakeMaterialOutputNode"
-
-        # the fake node have to emulate up to the Material output node. so save real MO ans BSDF
-        # then link fake tex to fake BSDF to real MO
-
-        # Real BSDF
-        #print("real start", nodes)
-        real_BSDF_nodes = [n for n in nodes if isinstance(n, bpy.types.ShaderNodeBsdfPrincipled)]
-        for principled in real_BSDF_nodes:
-            real_BSDF = principled
-        #print("real", real_BSDF_nodes, real_BSDF)
-
-        # real MO
-        real_material_output_nodes = [n for n in nodes if isinstance(n, bpy.types.ShaderNodeOutputMaterial)]
-        for material_output in real_material_output_nodes:
-            real_material_output_node = material_output
-        #print("real", real_material_output_nodes, real_material_output_node)
-
-        # now start the fake nodes
-
-        # Create a fake texture node temporarily (unfortunately this is the only solid way of doing this)
+        """Texture info of an image for an MSFS extension slot, the material node tree is left untouched"""
+        load_khronos()
+        if type != "NORMAL":
+            normal_scale = None
+
+        # same image in the same slot type gives the same texture info (and texture index) for every material and LOD
+        texture_info_cache = export_settings.setdefault("msfs_texture_info_cache", {})
+        key = (blender_image.name, type, normal_scale)
+        if key in texture_info_cache:
+            return texture_info_cache[key]
+
+        # The Khronos gather functions work from sockets, so plug the image in a scratch node group.
+        # Nodes are never removed during the export so the (cached) Khronos functions never see a reused socket.
+        tree = MSFSMaterial.get_texture_info_tree(export_settings)
+        nodes = tree.nodes
+        links = tree.links
+
         texture_node = nodes.new("ShaderNodeTexImage")
-        texture_node.name = "FakeTextureNode"
         texture_node.image = blender_image
-
-        # Create fake BSDF shader to plug texture into
         shader_node = nodes.new("ShaderNodeBsdfPrincipled")
-        shader_node.name = "FakeBSDFNode"
-        #print("MSFSMaterial - fake nodes", texture_node, shader_node, normal_node)
-        linkoutput = links.new(real_material_output_node.inputs["Surface"], shader_node.outputs["BSDF"])
-        #print("MSFSMaterial export_image - Start with export_image type", type)
-        # Gather texture info
-        if type == "DEFAULT":
-            link = links.new(shader_node.inputs["Base Color"], texture_node.outputs[0])
-            # from Khronos gltf core example pbr sockets gather_texture_info
-
-            #print("MSFSMaterial - export_image DEFAULT if", link)
-            base_color_socket = get_socket_msfs(blender_material.node_tree, blender_material.use_nodes, "Base Color")
-            #alpha_socket = get_socket_msfs(blender_material.node_tree, blender_material.use_nodes, "Alpha", "FakeBSDFNode")
+        group_path = [blender_material.node_tree]
 
-            # keep sockets that have some texture : color and/or alpha
-            #print("MSFSMaterial - socket", base_color_socket)
-            inputs = tuple(
-                socket for socket in [base_color_socket]
-            )
-            #print("MSFSMaterial - inputs", inputs)
-
-            # had to add in a default socket argument for compatability with 4.0  added (),
-            # had to remove the default socket argument for compatability with 4.1+  removed (),
-            #print("MSFSMaterial - export_image DEFAULT if - sockets", inputs[0], inputs)
-            # for inp in inputs:
-                # print("MSFSMaterial - DEFAULT inputs list", inp.socket, inp.group_path)
+        texture_info = None
+        if type == "DEFAULT":
+            links.new(shader_node.inputs["Base Color"], texture_node.outputs[0])
+            base_color_socket = NodeSocket(shader_node.inputs["Base Color"], group_path)
             try:
                 texture_info = gather_texture_info(
-                    inputs[0],
-                    inputs,
+                    base_color_socket,
+                    (base_color_socket,),
                     export_settings,
-                    #shader_node.inputs["Base Color"],
-                    #(shader_node.inputs["Base Color"],),
-                    #export_settings,
                 )
             except:
                 print("*** MSFS WARNING *** - MSFSMaterial - Base Color ERROR")
-                texture_info = None, {}, {}, None
-            finally:
-                pass
-            #print("MSFSMaterial - export_image DEFAULT if - return", texture_info)
         elif type == "NORMAL":
-            #print("MSFSMaterial - export_image NORMAL if")
-
             normal_node = nodes.new("ShaderNodeNormalMap")
             if normal_scale:
                 normal_node.inputs["Strength"].default_value = normal_scale
-            link = links.new(normal_node.inputs["Color"], texture_node.outputs[0])
-            normal_blend_link = links.new(
-                shader_node.inputs["Normal"], normal_node.outputs[0]
-            )
-
-           # from Khronos gltf core example pbr sockets geather_texture_info  - needed for 4.2
-            normal_socket = get_socket_msfs(blender_material.node_tree, blender_material.use_nodes, "Normal")
-
-            # keep sockets that have some texture : color and/or alpha
-            #print("MSFSMaterial - normal socket", normal_socket)
-            inputs = tuple(
-                socket for socket in [normal_socket]
-            )
-            #print("MSFSMaterial - inputs Normal", inputs)
-
-            # for inp in inputs:
-                # print("MSFSMaterial - NORMAL inputs list", inp.socket, inp.group_path)
+            links.new(normal_node.inputs["Color"], texture_node.outputs[0])
+            links.new(shader_node.inputs["Normal"], normal_node.outputs[0])
+            normal_socket = NodeSocket(shader_node.inputs["Normal"], group_path)
             try:
                 texture_info = gather_material_normal_texture_info_class(
-                    inputs[0],
-                    inputs,
+                    normal_socket,
+                    (normal_socket,),
                     export_settings,
-                    #shader_node.inputs["Normal"],
-                    #(shader_node.inputs["Normal"],),
-                    #export_settings,
                 )
             except:
                 print("*** MSFS WARNING *** - MSFSMaterial - Normal ERROR")
-                texture_info = None, {}, {}, None
-            finally:
-                pass
-
-            links.remove(normal_blend_link)
-            #print("MSFSMaterial - export_image NORMAL if - return", texture_info)
         elif type == "OCCLUSION":
-            #print("MSFSMaterial - export_image OCCLUSION if")
-            # TODO: handle this - may not be needed
-            # from Khronos gltf core example pbr sockets geather_texture_info
-            # needed for 4.2
-            occlusion_socket = get_socket_msfs(blender_material.node_tree, blender_material.use_nodes, "Occlusion")
-
-            # keep sockets that have some texture : color and/or alpha
-            #print("MSFSMaterial - socket", occlusion_socket)
-            inputs = tuple(
-                socket for socket in [occlusion_socket]
-            )
-            #print("MSFSMaterial - inputs OMR", inputs)
-
-            #for inp in inputs:
-            #    print("MSFSMaterial - OCCLUSION inputs list", inp.socket, inp.group_path)
-            try:
-                texture_info = gather_material_occlusion_texture_info_class(
-                    inputs[0],
-                    inputs,
-                    export_settings
-                    #shader_node.inputs[0], (shader_node.inputs[0],), export_settings
-                )
-            except:
-                print("*** MSFS WARNING *** - MSFSMaterial - Occlusion ERROR")
-                texture_info = None, {}, {}, None
-            finally:
-                pass
-        # Delete temp Fake nodes
-        links.remove(link)
-        nodes.remove(shader_node)
-        nodes.remove(texture_node)
-        # put real link back to material output
-        #links.remove(linkoutput)
-        linkoutput = links.new(real_material_output_node.inputs["Surface"], real_BSDF.outputs["BSDF"])
-
-        if type == "NORMAL":
-            nodes.remove(normal_node)
+            # TODO: handle this - may not be needed. The Principled BSDF has no Occlusion input
+            print("*** MSFS WARNING *** - MSFSMaterial - Occlusion ERROR")
 
         # Some versions of the Khronos exporter have gather_texture_info return a tuple
         if isinstance(texture_info, tuple):
             texture_info = texture_info[0]
 
+        texture_info_cache[key] = texture_info
         return texture_info
 
+    @staticmethod
+    def export_cleanup(export_settings):
+        """Remove the scratch node group of export_image, called once the glTF is gathered"""
+        tree = export_settings.pop("msfs_texture_info_tree", None)
+        export_settings.pop("msfs_texture_info_cache", None)
+        if tree is not None:
+            try:
+                bpy.data.node_groups.remove(tree)
+            except ReferenceError:
+                pass
+
+    @staticmethod
+    def build_dispatch():
+        """Precompute the extensions that can apply to each material type (export) and glTF extension name (import)"""
+        MSFSMaterial.export_dispatch.clear()
+        for material_type, _, _ in MSFSMaterialExtensions.MATERIAL_TYPE_ITEMS:
+            MSFSMaterial.export_dispatch[material_type] = [
+                extension
+                for extension in MSFSMaterial.extensions
+                if material_type in getattr(extension, "MaterialTypes", (material_type,))
+                and material_type not in getattr(extension, "ExcludedMaterialTypes", ())
+            ]
+
+        MSFSMaterial.import_dispatch.clear()
+        MSFSMaterial.import_always.clear()
+        for index, extension in enumerate(MSFSMaterial.extensions):
+            # AsoboMaterialCommon has no extension and AsoboMaterialCode is read from the extras
+            if not extension.SerializedName or extension is MSFSMaterialExtensions.AsoboMaterialCode:
+                MSFSMaterial.import_always.append(index)
+                continue
+            MSFSMaterial.import_dispatch[extension.SerializedName] = index
+            if hasattr(extension, "AlternateSerializedName"):
+                MSFSMaterial.import_dispatch[extension.AlternateSerializedName] = index
+
     @staticmethod
     def create(gltf2_material, blender_material, import_settings):
-        for extension in MSFSMaterial.extensions:
-            extension.from_dict(blender_material, gltf2_material, import_settings)
+        if not MSFSMaterial.import_always:
+            MSFSMaterial.build_dispatch()
+
+        # keep the order of MSFSMaterial.extensions, some of them change the material type set by the previous ones
+        indices = set(MSFSMaterial.import_always)
+        for name in gltf2_material.extensions or ():
+            index = MSFSMaterial.import_dispatch.get(name)
+            if index is not None:
+                indices.add(index)
+
+        # relink the node tree once, after all the extensions are read
+        with MSFS_MaterialRelink.batch():
+            for index in sorted(indices):
+                MSFSMaterial.extensions[index].from_dict(blender_material, gltf2_material, import_settings)
 
     @staticmethod
     def export(gltf2_material, blender_material, export_settings):
-        for extension in MSFSMaterial.extensions:
+        if not MSFSMaterial.export_dispatch:
+            MSFSMaterial.build_dispatch()
+
+        extensions = MSFSMaterial.export_dispatch.get(blender_material.msfs_material_type, MSFSMaterial.extensions)
+        for extension in extensions:
             extension.to_extension(blender_material, gltf2_material, export_settings)
+
+
+def register():
+    MSFSMaterial.build_dispatch()
@@ -13,12 +13,16 @@
 # limitations under the License.
 
 import os
+import time
 import uuid
 import xml.dom.minidom
 import xml.etree.ElementTree as etree
 
 import bpy
+from bpy.app.handlers import persistent
 
+from .msfs_texture_cache import MSFS_TextureCache
+from .msfs_vertex_color import MSFSVertexColor
 
 def export_blender_under_3_3(file_path, settings):
     return bpy.ops.export_scene.gltf(
@@ -271,141 +275,421 @@ class MSFS_OT_MultiExportGLTF2(bpy.types.Operator):
     bl_idname = "export_scene.multi_export_gltf"
     bl_label = "Multi-Export glTF 2.0"
 
-    
+    # progress of the running modal export, read by the panel. Reset on every exit of the modal export and on file load
+    progress = None
+
     @staticmethod
     def export(file_path):
         settings = bpy.context.scene.msfs_multi_exporter_settings
         bpy.context.scene.msfs_multi_exporter_settings.use_unique_id = settings.use_unique_id
         gltf = None
-        if (bpy.app.version < (3, 3, 0)):
-            gltf = export_blender_under_3_3(file_path, settings)
-        elif (bpy.app.version < (3, 6, 0)):
-            gltf = export_blender_3_3(file_path, settings)
-        elif (bpy.app.version < (4, 2, 0)):
-            gltf = export_blender_3_6(file_path, settings)
-        else:
-            gltf = export_blender_4_2(file_path, settings)
+        with MSFS_TextureCache.use(settings.use_texture_cache):
+            try:
+                if (bpy.app.version < (3, 3, 0)):
+                    gltf = export_blender_under_3_3(file_path, settings)
+                elif (bpy.app.version < (3, 6, 0)):
+                    gltf = export_blender_3_3(file_path, settings)
+                elif (bpy.app.version < (4, 2, 0)):
+                    gltf = export_blender_3_6(file_path, settings)
+                else:
+                    gltf = export_blender_4_2(file_path, settings)
+            finally:
+                # the color attributes converted by gather_asset_hook, if the export stopped before putting them back
+                MSFSVertexColor.restore()
             
         if gltf is None:
                 print("[ASOBO] Export failed.")
+        return gltf
 
-    def execute(self, context):
-        if context.scene.msfs_multi_exporter_current_tab == "OBJECTS":
-            from .msfs_multi_export_objects import MSFS_LODGroupUtility
-
-            lod_groups = context.scene.msfs_multi_exporter_lod_groups
-            sort_by_collection = context.scene.multi_exporter_grouped_by_collections
-
-            for lod_group in lod_groups:
-                export_folder_path = lod_group.folder_path
-                if export_folder_path == '//\\':
-                        export_folder_path = export_folder_path.rsplit('\\')[0]
-                export_folder_path = bpy.path.abspath(export_folder_path)
-                # Generate XML if needed
-                if lod_group.generate_xml:
-                    xml_path = os.path.join(export_folder_path, lod_group.group_name + ".xml")
-                    found_guid = None
-
-                    if os.path.exists(xml_path):
-                        tree = etree.parse(xml_path)
-                        found_guid = tree.getroot().attrib.get("guid")
-
-                    if lod_group.overwrite_guid or found_guid is None:
-                        root = etree.Element(
-                            "ModelInfo",
-                            guid="{" + str(uuid.uuid4()) + "}",
-                            version="1.1",
-                        )
-                    else:
-                        root = etree.Element("ModelInfo", guid=found_guid, version="1.1")
+    @staticmethod
+    def get_export_folder_path(folder_path):
+        if folder_path == '//\\':
+            folder_path = folder_path.rsplit('\\')[0]
+        return bpy.path.abspath(folder_path)
+
+    @staticmethod
+    def write_lod_group_xml(context, lod_group, export_folder_path):
+        from .msfs_multi_export_objects import MSFS_LODGroupUtility
 
-                    lods = etree.SubElement(root, "LODS")
+        xml_path = os.path.join(export_folder_path, lod_group.group_name + ".xml")
+        found_guid = None
 
-                    lod_files = {}
+        if os.path.exists(xml_path):
+            tree = etree.parse(xml_path)
+            found_guid = tree.getroot().attrib.get("guid")
 
-                    for lod in lod_group.lods:
-                        if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
-                            continue
+        if lod_group.overwrite_guid or found_guid is None:
+            root = etree.Element(
+                "ModelInfo",
+                guid="{" + str(uuid.uuid4()) + "}",
+                version="1.1",
+            )
+        else:
+            root = etree.Element("ModelInfo", guid=found_guid, version="1.1")
 
-                        if lod.enabled:
-                            lod_files[lod.file_name] = lod.lod_value
+        lods = etree.SubElement(root, "LODS")
 
-                    lod_files = sorted(lod_files.items())
-                    last_lod = list(lod_files)[-1:]
+        lod_files = {}
 
-                    for file_name, lod_value in lod_files:
-                        lod_element = etree.SubElement(lods, "LOD")
+        for lod in lod_group.lods:
+            if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
+                continue
 
-                        if file_name != last_lod[0]:
-                            lod_element.set("minSize", str(lod_value))
+            if lod.enabled:
+                lod_files[lod.file_name] = lod.lod_value
 
-                        lod_element.set("ModelFile", os.path.splitext(file_name)[0] + ".gltf")
+        lod_files = sorted(lod_files.items())
+        last_lod = list(lod_files)[-1:]
 
-                    if lod_files:
-                        # Format XML
-                        dom = xml.dom.minidom.parseString(etree.tostring(root))
-                        xml_string = dom.toprettyxml(encoding="utf-8")
+        for file_name, lod_value in lod_files:
+            lod_element = etree.SubElement(lods, "LOD")
 
-                        with open(xml_path,"wb") as f:
-                            f.write(xml_string)
-                            f.close()
+            if file_name != last_lod[0]:
+                lod_element.set("minSize", str(lod_value))
 
-                # Export glTF
-                for lod in lod_group.lods:
-                    if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
-                        continue
+            lod_element.set("ModelFile", os.path.splitext(file_name)[0] + ".gltf")
 
-                    if lod.enabled:
-                        # Use selected objects in order to specify what to export
-                        for obj in bpy.context.selected_objects:
-                            obj.select_set(False)
+        if lod_files:
+            # Format XML
+            dom = xml.dom.minidom.parseString(etree.tostring(root))
+            xml_string = dom.toprettyxml(encoding="utf-8")
 
-                        def select_recursive(obj):
-                            if obj in list(bpy.context.window.view_layer.objects):
-                                obj.select_set(True)
-                                for child in obj.children:
-                                    select_recursive(child)
+            with open(xml_path,"wb") as f:
+                f.write(xml_string)
+                f.close()
 
-                        if sort_by_collection:
-                            for obj in lod.collection.all_objects:
-                                obj.select_set(True)
-                        else:
-                            select_recursive(lod.objectLOD)
-                        
-                        if export_folder_path != "":
-                            exportPath = bpy.path.ensure_ext(os.path.join(export_folder_path, os.path.splitext(lod.file_name)[0]), ".gltf")
-                            print("Export folder path - length", exportPath, " is this long ", len(exportPath))
-                            MSFS_OT_MultiExportGLTF2.export(exportPath)
-                        else:
-                            self.report({'ERROR'}, "[EXPORT][ERROR] Object : " + lod.file_name + " does not have an export path set.")
+    @staticmethod
+    def get_lod_objects(lod, sort_by_collection, view_layer_objects):
+        """Objects of lod, view_layer_objects is the set of the view layer objects, built once per job list"""
+        if sort_by_collection:
+            return list(lod.collection.all_objects)
 
-        elif context.scene.msfs_multi_exporter_current_tab == "PRESETS":
-            presets = bpy.context.scene.msfs_multi_exporter_presets
-            for preset in presets:
-                if preset.enabled:
-                    # Clear currently selected objects
-                    for obj in bpy.context.selected_objects:
-                        obj.select_set(False)
-
-                    # Loop through all enabled layers and select all objects
-                    for layer in preset.layers:
-                        if layer.enabled:
-                            for obj in layer.collection.all_objects:
-                                if obj in list(bpy.context.window.view_layer.objects):
-                                    obj.select_set(True)
-                                    
-                    if preset.folder_path != "":
-                        export_folder_path = preset.folder_path
-                        if export_folder_path == '//\\':
-                            export_folder_path = export_folder_path.rsplit('\\')[0]
-                        export_folder_path = bpy.path.abspath(export_folder_path)
-                        exportPath = bpy.path.ensure_ext(os.path.join(export_folder_path, preset.name), ".gltf")
-                        MSFS_OT_MultiExportGLTF2.export(exportPath)
+        objects = []
+
+        def select_recursive(obj):
+            if obj in view_layer_objects:
+                objects.append(obj)
+                for child in obj.children:
+                    select_recursive(child)
+
+        select_recursive(lod.objectLOD)
+        return objects
+
+    @staticmethod
+    def get_preset_objects(preset, view_layer_objects):
+        objects = []
+        for layer in preset.layers:
+            if layer.enabled:
+                for obj in layer.collection.all_objects:
+                    if obj in view_layer_objects:
+                        objects.append(obj)
+        return objects
+
+    @staticmethod
+    def collect_lod_group_jobs(context, lod_groups):
+        """Build the export jobs (file path and object names) of the enabled LODs of lod_groups"""
+        from .msfs_multi_export_objects import MSFS_LODGroupUtility
+
+        jobs = []
+        errors = []
+        sort_by_collection = context.scene.multi_exporter_grouped_by_collections
+        view_layer_objects = set(context.view_layer.objects)
+
+        for lod_group in lod_groups:
+            export_folder_path = MSFS_OT_MultiExportGLTF2.get_export_folder_path(lod_group.folder_path)
+            # Generate XML if needed
+            if lod_group.generate_xml:
+                MSFS_OT_MultiExportGLTF2.write_lod_group_xml(context, lod_group, export_folder_path)
+
+            for lod in lod_group.lods:
+                if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
+                    continue
+
+                if lod.enabled:
+                    if export_folder_path != "":
+                        exportPath = bpy.path.ensure_ext(os.path.join(export_folder_path, os.path.splitext(lod.file_name)[0]), ".gltf")
+                        print("Export folder path - length", exportPath, " is this long ", len(exportPath))
+                        objects = MSFS_OT_MultiExportGLTF2.get_lod_objects(lod, sort_by_collection, view_layer_objects)
+                        jobs.append({
+                            "name": lod.file_name,
+                            "file_path": exportPath,
+                            "objects": [obj.name for obj in objects],
+                        })
                     else:
-                        self.report({'ERROR'}, "[EXPORT][ERROR] Preset : " + preset.name + " does not have an export path set.")
+                        errors.append("[EXPORT][ERROR] Object : " + lod.file_name + " does not have an export path set.")
+
+        return jobs, errors
+
+    @staticmethod
+    def collect_preset_jobs(context, presets):
+        """Build the export jobs (file path and object names) of presets"""
+        jobs = []
+        errors = []
+        view_layer_objects = set(context.view_layer.objects)
+
+        for preset in presets:
+            if preset.folder_path != "":
+                export_folder_path = MSFS_OT_MultiExportGLTF2.get_export_folder_path(preset.folder_path)
+                exportPath = bpy.path.ensure_ext(os.path.join(export_folder_path, preset.name), ".gltf")
+                objects = MSFS_OT_MultiExportGLTF2.get_preset_objects(preset, view_layer_objects)
+                jobs.append({
+                    "name": preset.name,
+                    "file_path": exportPath,
+                    "objects": [obj.name for obj in objects],
+                })
+            else:
+                errors.append("[EXPORT][ERROR] Preset : " + preset.name + " does not have an export path set.")
+
+        return jobs, errors
+
+    @staticmethod
+    def collect_jobs(context):
+        """Build the list of export jobs for the current tab"""
+        if context.scene.msfs_multi_exporter_current_tab == "OBJECTS":
+            return MSFS_OT_MultiExportGLTF2.collect_lod_group_jobs(context, context.scene.msfs_multi_exporter_lod_groups)
+        elif context.scene.msfs_multi_exporter_current_tab == "PRESETS":
+            presets = [preset for preset in context.scene.msfs_multi_exporter_presets if preset.enabled]
+            return MSFS_OT_MultiExportGLTF2.collect_preset_jobs(context, presets)
+        return [], []
+
+    @staticmethod
+    def export_job(context, job):
+        """Select the objects of a job and export them, returns True on success"""
+        # Use selected objects in order to specify what to export
+        for obj in context.selected_objects:
+            obj.select_set(False)
+
+        for name in job["objects"]:
+            obj = bpy.data.objects.get(name)
+            if obj is not None and obj.name in context.view_layer.objects:
+                obj.select_set(True)
+
+        try:
+            return MSFS_OT_MultiExportGLTF2.export(job["file_path"]) is not None
+        except Exception as e:
+            print("[ASOBO] Export failed.", job["name"], e)
+            return False
 
+    @staticmethod
+    def run_jobs(context, jobs):
+        """Export the jobs with the current settings, returns (results, unchanged jobs)"""
+        settings = context.scene.msfs_multi_exporter_settings
+        unchanged = []
+        if settings.use_incremental_export:
+            from .msfs_multi_export_fingerprint import MSFS_ExportFingerprint
+
+            jobs, unchanged = MSFS_ExportFingerprint.filter_unchanged_jobs(jobs, settings)
+            for job in unchanged:
+                print("[ASOBO] Skipping unchanged", job["file_path"])
+
+        if settings.use_parallel_export and len(jobs) > 1:
+            from .msfs_multi_export_parallel import MSFS_ParallelExport
+
+            results = MSFS_ParallelExport.run(jobs, settings.parallel_export_workers)
+        else:
+            results = [
+                {
+                    "name": job["name"],
+                    "file_path": job["file_path"],
+                    "success": MSFS_OT_MultiExportGLTF2.export_job(context, job),
+                }
+                for job in jobs
+            ]
+
+        if settings.use_incremental_export:
+            MSFS_ExportFingerprint.save_results(jobs, results, settings)
+
+        return results, unchanged
+
+    def report_results(self, results, unchanged):
+        failed = [result for result in results if not result["success"]]
+        for result in failed:
+            self.report({'ERROR'}, "[EXPORT][ERROR] " + result["name"] + " failed to export. " + result.get("message", ""))
+        if results or unchanged:
+            message = "[EXPORT] " + str(len(results) - len(failed)) + "/" + str(len(results)) + " files exported."
+            if unchanged:
+                message += " " + str(len(unchanged)) + " unchanged files skipped."
+            self.report({'INFO'}, message)
+
+    @classmethod
+    def poll(cls, context):
+        return MSFS_OT_MultiExportGLTF2.progress is None
+
+    def execute(self, context):
+        jobs, errors = MSFS_OT_MultiExportGLTF2.collect_jobs(context)
+        for error in errors:
+            self.report({'ERROR'}, error)
+
+        results, unchanged = MSFS_OT_MultiExportGLTF2.run_jobs(context, jobs)
+        self.report_results(results, unchanged)
+
+        return {"FINISHED"}
+
+    # Modal export, one file per timer tick so the UI stays responsive and Esc can cancel.
+    # A parallel export polls its background workers on the timer ticks instead
+    def invoke(self, context, event):
+        settings = context.scene.msfs_multi_exporter_settings
+        self.timer = None
+        self.parallel = None
+
+        jobs, errors = MSFS_OT_MultiExportGLTF2.collect_jobs(context)
+        for error in errors:
+            self.report({'ERROR'}, error)
+
+        self.unchanged = []
+        if settings.use_incremental_export:
+            from .msfs_multi_export_fingerprint import MSFS_ExportFingerprint
+
+            jobs, self.unchanged = MSFS_ExportFingerprint.filter_unchanged_jobs(jobs, settings)
+            for job in self.unchanged:
+                print("[ASOBO] Skipping unchanged", job["file_path"])
+
+        if not jobs:
+            self.report_results([], self.unchanged)
+            return {"FINISHED"}
+
+        self.jobs = jobs
+        self.results = []
+        self.durations = []
+        self.cancelled = False
+        self.start_time = time.perf_counter()
+
+        if settings.use_parallel_export and len(jobs) > 1:
+            from .msfs_multi_export_parallel import MSFS_ParallelExport
+
+            self.parallel = MSFS_ParallelExport.start(jobs, settings.parallel_export_workers)
+
+        MSFS_OT_MultiExportGLTF2.progress = {
+            "done": 0,
+            "total": len(jobs),
+            "current": jobs[0]["name"] if self.parallel is None else str(len(self.parallel["workers"])) + " background workers",
+            "eta": None,
+        }
+
+        wm = context.window_manager
+        wm.progress_begin(0, len(jobs))
+        self.timer = wm.event_timer_add(0.1, window=context.window)
+        wm.modal_handler_add(self)
+        MSFS_OT_MultiExportGLTF2.update_progress_display(context)
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        try:
+            return self.export_step(context, event)
+        except Exception as e:
+            print("[ASOBO] Export failed.", e)
+            self.cancelled = True
+            return self.finish(context)
+
+    def export_step(self, context, event):
+        if event.type == "ESC" and event.value == "PRESS":
+            self.cancelled = True
+            if self.parallel is not None:
+                self.report({'WARNING'}, "[EXPORT] Stopping the export workers...")
+            else:
+                self.report({'WARNING'}, "[EXPORT] Cancelling after the current file...")
+            return {"RUNNING_MODAL"}
+
+        if event.type != "TIMER" or event.timer != self.timer:
+            return {"PASS_THROUGH"}
+
+        if self.parallel is not None:
+            return self.parallel_step(context)
+
+        index = len(self.results)
+        if self.cancelled or index >= len(self.jobs):
+            return self.finish(context)
+
+        job = self.jobs[index]
+        start = time.perf_counter()
+        self.results.append({
+            "name": job["name"],
+            "file_path": job["file_path"],
+            "success": MSFS_OT_MultiExportGLTF2.export_job(context, job),
+        })
+        self.durations.append(time.perf_counter() - start)
+
+        done = len(self.results)
+        progress = MSFS_OT_MultiExportGLTF2.progress
+        progress["done"] = done
+        progress["current"] = self.jobs[done]["name"] if done < len(self.jobs) else ""
+        progress["eta"] = sum(self.durations) / done * (len(self.jobs) - done)
+
+        context.window_manager.progress_update(done)
+        MSFS_OT_MultiExportGLTF2.update_progress_display(context)
+        return {"RUNNING_MODAL"}
+
+    def parallel_step(self, context):
+        from .msfs_multi_export_parallel import MSFS_ParallelExport
+
+        if self.cancelled or MSFS_ParallelExport.is_finished(self.parallel):
+            return self.finish(context)
+
+        done = MSFS_ParallelExport.poll(self.parallel)
+        progress = MSFS_OT_MultiExportGLTF2.progress
+        if done != progress["done"]:
+            progress["done"] = done
+            progress["eta"] = (time.perf_counter() - self.start_time) / done * (len(self.jobs) - done) if done else None
+            context.window_manager.progress_update(done)
+            MSFS_OT_MultiExportGLTF2.update_progress_display(context)
+        return {"RUNNING_MODAL"}
+
+    def end_progress(self, context):
+        try:
+            if self.parallel is not None:
+                from .msfs_multi_export_parallel import MSFS_ParallelExport
+
+                # terminates the workers still running, their unfinished jobs get no result
+                MSFS_ParallelExport.stop(self.parallel)
+                self.results = self.parallel["results"]
+        finally:
+            MSFS_OT_MultiExportGLTF2.progress = None
+            wm = context.window_manager
+            if self.timer is not None:
+                wm.event_timer_remove(self.timer)
+                self.timer = None
+            wm.progress_end()
+            MSFS_OT_MultiExportGLTF2.update_progress_display(context)
+
+    def cancel(self, context):
+        # called by Blender when the modal export is stopped from outside, e.g. by loading a file
+        self.end_progress(context)
+
+    def finish(self, context):
+        self.end_progress(context)
+
+        settings = context.scene.msfs_multi_exporter_settings
+        if settings.use_incremental_export:
+            from .msfs_multi_export_fingerprint import MSFS_ExportFingerprint
+
+            MSFS_ExportFingerprint.save_results(self.jobs, self.results, settings)
+
+        self.report_results(self.results, self.unchanged)
+        if self.cancelled:
+            self.report({'WARNING'}, "[EXPORT] Cancelled, " + str(len(self.jobs) - len(self.results)) + " files not exported.")
+            return {"CANCELLED"}
         return {"FINISHED"}
 
+    @staticmethod
+    def get_progress_text():
+        progress = MSFS_OT_MultiExportGLTF2.progress
+        if progress is None:
+            return None
+
+        text = "Exporting " + str(progress["done"]) + "/" + str(progress["total"])
+        if progress["current"]:
+            text += " - " + progress["current"]
+        if progress["eta"] is not None:
+            text += " - ETA " + time.strftime("%H:%M:%S", time.gmtime(progress["eta"]))
+        return text + " (Esc to cancel)"
+
+    @staticmethod
+    def update_progress_display(context):
+        context.workspace.status_text_set(MSFS_OT_MultiExportGLTF2.get_progress_text())
+        for area in context.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
 class MSFS_OT_ChangeTab(bpy.types.Operator):
     bl_idname = "msfs.multi_export_change_tab"
     bl_label = "Change tab"
@@ -440,6 +724,16 @@ class MSFS_PT_MultiExporter(bpy.types.Panel):
         row.operator(MSFS_OT_ChangeTab.bl_idname, text="Presets", depress=(current_tab == "PRESETS")).current_tab = "PRESETS"
         row.operator(MSFS_OT_ChangeTab.bl_idname, text="Settings", depress=(current_tab == "SETTINGS")).current_tab = "SETTINGS"
 
+        progress = MSFS_OT_MultiExportGLTF2.progress
+        if progress is not None:
+            box = layout.box()
+            box.progress(
+                factor=progress["done"] / progress["total"],
+                type="BAR",
+                text=str(progress["done"]) + "/" + str(progress["total"]),
+            )
+            box.label(text=MSFS_OT_MultiExportGLTF2.get_progress_text(), icon="EXPORT")
+
 
 # def register_panel():
     # # Register the panel on demand, we need to be sure to only register it once
@@ -461,3 +755,19 @@ class MSFS_PT_MultiExporter(bpy.types.Panel):
         # bpy.utils.unregister_class(MSFS_PT_MultiExporter)
     # except Exception:
         # pass
+
+
+@persistent
+def multi_export_load_post(*args):
+    # a modal export doesn't survive loading a file, its progress would block the next export
+    MSFS_OT_MultiExportGLTF2.progress = None
+
+
+def register():
+    bpy.app.handlers.load_post.append(multi_export_load_post)
+
+
+def unregister():
+    if multi_export_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(multi_export_load_post)
+    MSFS_OT_MultiExportGLTF2.progress = None
@@ -0,0 +1,194 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Command line multi-export, for build machines.
+#
+#   blender -b model.blend --python <addon>/io/msfs_multi_export_cli.py -- manifest.json [result.json]
+#
+# or, with the add-on package name:
+#
+#   blender -b model.blend --python-expr "import importlib; importlib.import_module('<package>.io.msfs_multi_export_cli').main()" -- manifest.json
+#
+# Manifest:
+#
+#   {
+#       "reload_lod_groups": false,
+#       "lod_groups": ["SM_Plane", {"name": "SM_Prop", "folder_path": "//model"}],
+#       "presets": ["Exterior"],
+#       "settings": {"export_image_format": "AUTO", "use_parallel_export": true},
+#       "result": "result.json"
+#   }
+#
+# "lod_groups" and "presets" can be "*" to export all of them. The enabled state
+# of the LODs is respected, the enabled state of the presets is not.
+# The result file lists the exported, failed and skipped files, Blender exits
+# with code 1 when anything failed.
+
+import json
+import os
+import sys
+
+import bpy
+
+
+class MSFS_MultiExportCLI:
+    """Run the multi-exporter from a JSON manifest"""
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def get_arguments(argv):
+        if "--" in argv:
+            return argv[argv.index("--") + 1:]
+        return []
+
+    @staticmethod
+    def select_items(collection, entries, get_name, errors, kind):
+        """Match the manifest entries to collection items, returns (item, overrides) pairs"""
+        if entries == "*":
+            return [(item, {}) for item in collection]
+
+        items_by_name = {get_name(item): item for item in collection}
+        selected = []
+        for entry in entries or []:
+            overrides = entry if isinstance(entry, dict) else {"name": entry}
+            item = items_by_name.get(overrides.get("name"))
+            if item is None:
+                errors.append("[EXPORT][ERROR] " + kind + " : " + str(overrides.get("name")) + " not found.")
+                continue
+            selected.append((item, overrides))
+        return selected
+
+    @staticmethod
+    def apply_settings(settings, overrides, errors):
+        for key, value in overrides.items():
+            if key not in settings.bl_rna.properties:
+                errors.append("[EXPORT][ERROR] Unknown setting : " + key)
+                continue
+            try:
+                setattr(settings, key, value)
+            except (TypeError, ValueError) as e:
+                errors.append("[EXPORT][ERROR] Setting " + key + " : " + str(e))
+
+    @staticmethod
+    def run(manifest):
+        """Export what the manifest lists, returns the result dictionary"""
+        from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+        from .msfs_multi_export_objects import MSFS_OT_ReloadLODGroups
+
+        context = bpy.context
+        scene = context.scene
+        errors = []
+        jobs = []
+
+        MSFS_MultiExportCLI.apply_settings(scene.msfs_multi_exporter_settings, manifest.get("settings", {}), errors)
+
+        if manifest.get("reload_lod_groups"):
+            MSFS_OT_ReloadLODGroups.reload_lod_groups(None, context)
+
+        lod_groups = MSFS_MultiExportCLI.select_items(
+            scene.msfs_multi_exporter_lod_groups,
+            manifest.get("lod_groups"),
+            lambda lod_group: lod_group.group_name,
+            errors,
+            "LOD group",
+        )
+        for lod_group, overrides in lod_groups:
+            if "folder_path" in overrides:
+                lod_group.folder_path = overrides["folder_path"]
+        group_jobs, group_errors = MSFS_OT_MultiExportGLTF2.collect_lod_group_jobs(context, [lod_group for lod_group, _ in lod_groups])
+        jobs += group_jobs
+        errors += group_errors
+
+        presets = MSFS_MultiExportCLI.select_items(
+            scene.msfs_multi_exporter_presets,
+            manifest.get("presets"),
+            lambda preset: preset.name,
+            errors,
+            "Preset",
+        )
+        for preset, overrides in presets:
+            if "folder_path" in overrides:
+                preset.folder_path = overrides["folder_path"]
+        preset_jobs, preset_errors = MSFS_OT_MultiExportGLTF2.collect_preset_jobs(context, [preset for preset, _ in presets])
+        jobs += preset_jobs
+        errors += preset_errors
+
+        results, unchanged = MSFS_OT_MultiExportGLTF2.run_jobs(context, jobs)
+
+        return {
+            "success": not errors and all(result["success"] for result in results),
+            "blend_file": bpy.data.filepath,
+            "exported": [result["file_path"] for result in results if result["success"]],
+            "failed": [result for result in results if not result["success"]],
+            "skipped": [job["file_path"] for job in unchanged],
+            "errors": errors,
+        }
+
+    @staticmethod
+    def main(argv=None):
+        """Entry point, reads the manifest path (and optional result path) after '--'"""
+        arguments = MSFS_MultiExportCLI.get_arguments(sys.argv if argv is None else argv)
+        if not arguments:
+            print("[EXPORT][ERROR] Usage: blender -b file.blend --python-expr ... -- manifest.json [result.json]")
+            sys.exit(2)
+
+        manifest_path = os.path.abspath(arguments[0])
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print("[EXPORT][ERROR] Could not read manifest", manifest_path, e)
+            sys.exit(2)
+
+        result_path = arguments[1] if len(arguments) > 1 else manifest.get("result")
+        if result_path is None:
+            result_path = os.path.splitext(manifest_path)[0] + ".result.json"
+        elif not os.path.isabs(result_path):
+            result_path = os.path.join(os.path.dirname(manifest_path), result_path)
+
+        try:
+            result = MSFS_MultiExportCLI.run(manifest)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            result = {"success": False, "exported": [], "failed": [], "skipped": [], "errors": [repr(e)]}
+
+        with open(result_path, "w") as f:
+            json.dump(result, f, indent=4)
+
+        for error in result["errors"]:
+            print(error)
+        for failed in result["failed"]:
+            print("[EXPORT][ERROR]", failed["name"], "failed to export.", failed.get("message", ""))
+        print("[EXPORT]", len(result["exported"]), "exported,", len(result["failed"]), "failed,", len(result["skipped"]), "skipped. Result:", result_path)
+
+        if not result["success"]:
+            sys.exit(1)
+
+
+def main(argv=None):
+    MSFS_MultiExportCLI.main(argv)
+
+
+if __name__ == "__main__":
+    # started with --python, use the module of the enabled add-on so bpy types are registered
+    for module_name, module in list(sys.modules.items()):
+        if module_name.endswith(".io.msfs_multi_export_cli"):
+            module.main()
+            break
+    else:
+        print("[EXPORT][ERROR] The MSFS glTF add-on is not enabled.")
+        sys.exit(2)
@@ -0,0 +1,419 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import urllib.parse
+
+import bpy
+import numpy as np
+
+# fingerprints of the exported files are stored per export folder
+FINGERPRINT_FILE_NAME = ".msfs_multi_export.json"
+
+# attribute data type -> (foreach property, number of components, numpy type)
+ATTRIBUTE_LAYOUTS = {
+    "FLOAT": ("value", 1, np.float32),
+    "INT": ("value", 1, np.int32),
+    "FLOAT_VECTOR": ("vector", 3, np.float32),
+    "FLOAT_COLOR": ("color", 4, np.float32),
+    "BYTE_COLOR": ("color", 4, np.float32),
+    "FLOAT2": ("vector", 2, np.float32),
+    "BOOLEAN": ("value", 1, bool),
+}
+
+# properties that don't change the exported files
+IGNORED_PROPERTIES = {
+    "rna_type",
+    "is_active",
+    "show_expanded",
+    "is_override_data_editable",
+    "use_parallel_export",
+    "parallel_export_workers",
+    "use_incremental_export",
+}
+
+# node properties of the node editor layout
+IGNORED_NODE_PROPERTIES = IGNORED_PROPERTIES | {
+    "select",
+    "location",
+    "location_absolute",
+    "width",
+    "height",
+    "dimensions",
+}
+
+
+class MSFS_ExportFingerprint:
+    """Hash the inputs of a multi-export job so unchanged files can be skipped"""
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def hash_values(hasher, *values):
+        for value in values:
+            hasher.update(repr(value).encode("utf-8"))
+            hasher.update(b"\0")
+
+    @staticmethod
+    def hash_array(hasher, collection, prop, components, dtype):
+        data = np.empty(len(collection) * components, dtype=dtype)
+        collection.foreach_get(prop, data)
+        hasher.update(data.tobytes())
+
+    @staticmethod
+    def hash_rna_properties(hasher, struct, prefix=None, images=None, ignored=IGNORED_PROPERTIES):
+        """Hash the value of every property of a struct, ID pointers are hashed by name"""
+        for prop in struct.bl_rna.properties:
+            identifier = prop.identifier
+            if identifier in ignored or prop.type == "COLLECTION":
+                continue
+            if prefix is not None and not identifier.startswith(prefix):
+                continue
+
+            value = getattr(struct, identifier, None)
+            if prop.type == "POINTER":
+                if isinstance(value, bpy.types.Image) and images is not None:
+                    images.add(value)
+                value = getattr(value, "name", None)
+            elif isinstance(value, set):
+                value = tuple(sorted(value))
+            elif hasattr(value, "__len__") and not isinstance(value, str):
+                try:
+                    value = tuple(value)
+                except TypeError:
+                    pass
+            MSFS_ExportFingerprint.hash_values(hasher, identifier, value)
+
+    @staticmethod
+    def get_id_property_value(value):
+        if isinstance(value, bpy.types.ID):
+            return value.name
+        if hasattr(value, "to_dict"):
+            return sorted(value.to_dict().items())
+        if hasattr(value, "to_list"):
+            return value.to_list()
+        return value
+
+    @staticmethod
+    def hash_mesh(hasher, mesh):
+        MSFS_ExportFingerprint.hash_values(hasher, mesh.name, len(mesh.vertices), len(mesh.loops), len(mesh.polygons))
+
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.vertices, "co", 3, np.float32)
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.loops, "vertex_index", 1, np.int32)
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.polygons, "loop_start", 1, np.int32)
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.polygons, "material_index", 1, np.int32)
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.polygons, "use_smooth", 1, bool)
+
+        for uv_layer in mesh.uv_layers:
+            MSFS_ExportFingerprint.hash_values(hasher, uv_layer.name)
+            MSFS_ExportFingerprint.hash_array(hasher, uv_layer.data, "uv", 2, np.float32)
+
+        for attribute in mesh.attributes:
+            MSFS_ExportFingerprint.hash_values(hasher, attribute.name, attribute.domain, attribute.data_type)
+            layout = ATTRIBUTE_LAYOUTS.get(attribute.data_type)
+            if layout is not None:
+                MSFS_ExportFingerprint.hash_array(hasher, attribute.data, *layout)
+
+        if mesh.has_custom_normals:
+            try:
+                MSFS_ExportFingerprint.hash_array(hasher, mesh.corner_normals, "vector", 3, np.float32)
+            except AttributeError:
+                # Blender < 4.1
+                MSFS_ExportFingerprint.hash_array(hasher, mesh.loops, "normal", 3, np.float32)
+
+        if mesh.shape_keys is not None:
+            for key_block in mesh.shape_keys.key_blocks:
+                MSFS_ExportFingerprint.hash_values(
+                    hasher, key_block.name, key_block.value, key_block.relative_key.name, key_block.mute, key_block.vertex_group
+                )
+                MSFS_ExportFingerprint.hash_array(hasher, key_block.data, "co", 3, np.float32)
+            MSFS_ExportFingerprint.hash_animation_data(hasher, mesh.shape_keys.animation_data)
+
+    @staticmethod
+    def hash_vertex_weights(hasher, mesh):
+        """Hash the vertex group weights of mesh, they have no foreach_get so they are read per vertex"""
+        weights = [(vertex.index, group.group, group.weight) for vertex in mesh.vertices for group in vertex.groups]
+        MSFS_ExportFingerprint.hash_values(hasher, len(weights))
+        if weights:
+            hasher.update(np.array(weights, dtype=np.float64).tobytes())
+
+    @staticmethod
+    def hash_image(hasher, image):
+        MSFS_ExportFingerprint.hash_values(hasher, image.name, image.filepath, image.source, image.is_dirty, image.colorspace_settings.name)
+
+        if image.packed_file is not None:
+            hasher.update(hashlib.sha1(image.packed_file.data).digest())
+        else:
+            file_path = bpy.path.abspath(image.filepath, library=image.library)
+            try:
+                stat = os.stat(file_path)
+                MSFS_ExportFingerprint.hash_values(hasher, stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                MSFS_ExportFingerprint.hash_values(hasher, None)
+
+    @staticmethod
+    def hash_node_tree(hasher, node_tree, images, visited=None):
+        """Hash nodes, input values and links, images used by texture nodes are collected"""
+        if visited is None:
+            visited = set()
+        if node_tree in visited:
+            return
+        visited.add(node_tree)
+
+        for node in node_tree.nodes:
+            MSFS_ExportFingerprint.hash_values(hasher, node.name, node.bl_idname)
+            MSFS_ExportFingerprint.hash_rna_properties(hasher, node, ignored=IGNORED_NODE_PROPERTIES)
+            image = getattr(node, "image", None)
+            if image is not None:
+                images.add(image)
+            group_tree = getattr(node, "node_tree", None)
+            if group_tree is not None:
+                MSFS_ExportFingerprint.hash_node_tree(hasher, group_tree, images, visited)
+            for socket in node.inputs:
+                value = getattr(socket, "default_value", None)
+                if hasattr(value, "__len__") and not isinstance(value, str):
+                    value = tuple(value)
+                MSFS_ExportFingerprint.hash_values(hasher, socket.identifier, value)
+
+        for link in node_tree.links:
+            MSFS_ExportFingerprint.hash_values(
+                hasher,
+                link.from_node.name,
+                link.from_socket.identifier,
+                link.to_node.name,
+                link.to_socket.identifier,
+            )
+
+    @staticmethod
+    def get_fcurves(action):
+        fcurves = list(getattr(action, "fcurves", ()))
+        # layered actions, Blender 4.4+
+        for layer in getattr(action, "layers", ()):
+            for strip in layer.strips:
+                for channelbag in getattr(strip, "channelbags", ()):
+                    fcurves.extend(channelbag.fcurves)
+        return fcurves
+
+    @staticmethod
+    def hash_action(hasher, action):
+        if action is None:
+            MSFS_ExportFingerprint.hash_values(hasher, None)
+            return
+        MSFS_ExportFingerprint.hash_values(hasher, action.name, tuple(action.frame_range))
+        for fcurve in MSFS_ExportFingerprint.get_fcurves(action):
+            MSFS_ExportFingerprint.hash_values(hasher, fcurve.data_path, fcurve.array_index, fcurve.mute, fcurve.extrapolation)
+            MSFS_ExportFingerprint.hash_array(hasher, fcurve.keyframe_points, "co", 2, np.float32)
+            MSFS_ExportFingerprint.hash_array(hasher, fcurve.keyframe_points, "handle_left", 2, np.float32)
+            MSFS_ExportFingerprint.hash_array(hasher, fcurve.keyframe_points, "handle_right", 2, np.float32)
+            MSFS_ExportFingerprint.hash_values(hasher, [keyframe.interpolation for keyframe in fcurve.keyframe_points])
+
+    @staticmethod
+    def hash_animation_data(hasher, animation_data):
+        """Hash the active action and the NLA tracks"""
+        if animation_data is None:
+            MSFS_ExportFingerprint.hash_values(hasher, None)
+            return
+        MSFS_ExportFingerprint.hash_action(hasher, animation_data.action)
+        for track in animation_data.nla_tracks:
+            MSFS_ExportFingerprint.hash_values(hasher, track.name, track.mute, track.is_solo)
+            for strip in track.strips:
+                MSFS_ExportFingerprint.hash_values(
+                    hasher,
+                    strip.name,
+                    strip.mute,
+                    strip.frame_start,
+                    strip.frame_end,
+                    strip.action_frame_start,
+                    strip.action_frame_end,
+                    strip.scale,
+                    strip.repeat,
+                    strip.blend_type,
+                    strip.extrapolation,
+                )
+                MSFS_ExportFingerprint.hash_action(hasher, strip.action)
+
+    @staticmethod
+    def compute(objects, settings):
+        """Fingerprint of a job: objects, their data, materials, images and the export settings"""
+        hasher = hashlib.sha1()
+        materials = set()
+        meshes = set()
+        weighted_meshes = set()
+        images = set()
+
+        MSFS_ExportFingerprint.hash_rna_properties(hasher, settings)
+
+        for obj in sorted(objects, key=lambda o: o.name):
+            MSFS_ExportFingerprint.hash_values(
+                hasher,
+                obj.name,
+                obj.type,
+                obj.parent.name if obj.parent is not None else None,
+                obj.parent_bone,
+                [tuple(row) for row in obj.matrix_world],
+                obj.data.name if obj.data is not None else None,
+            )
+            MSFS_ExportFingerprint.hash_rna_properties(hasher, obj, prefix="msfs_")
+
+            MSFS_ExportFingerprint.hash_values(hasher, [(group.name, group.index) for group in obj.vertex_groups])
+            if obj.type == "MESH" and len(obj.vertex_groups) > 0:
+                weighted_meshes.add(obj.data)
+
+            for modifier in obj.modifiers:
+                MSFS_ExportFingerprint.hash_rna_properties(hasher, modifier)
+                if modifier.type == "NODES":
+                    # the inputs of the geometry nodes group are ID properties of the modifier
+                    for key in sorted(modifier.keys()):
+                        MSFS_ExportFingerprint.hash_values(hasher, key, MSFS_ExportFingerprint.get_id_property_value(modifier[key]))
+                    if modifier.node_group is not None:
+                        MSFS_ExportFingerprint.hash_node_tree(hasher, modifier.node_group, images)
+
+            MSFS_ExportFingerprint.hash_animation_data(hasher, obj.animation_data)
+
+            for slot in obj.material_slots:
+                MSFS_ExportFingerprint.hash_values(hasher, slot.link, slot.material.name if slot.material else None)
+                if slot.material is not None:
+                    materials.add(slot.material)
+
+            if obj.type == "MESH":
+                meshes.add(obj.data)
+            elif obj.type == "ARMATURE":
+                for bone in obj.data.bones:
+                    MSFS_ExportFingerprint.hash_values(
+                        hasher,
+                        bone.name,
+                        bone.parent.name if bone.parent is not None else None,
+                        tuple(bone.head_local),
+                        tuple(bone.tail_local),
+                        [tuple(row) for row in bone.matrix_local],
+                    )
+                    MSFS_ExportFingerprint.hash_rna_properties(hasher, bone, prefix="msfs_")
+            elif obj.data is not None:
+                MSFS_ExportFingerprint.hash_rna_properties(hasher, obj.data)
+            if obj.data is not None and obj.type != "MESH":
+                MSFS_ExportFingerprint.hash_animation_data(hasher, getattr(obj.data, "animation_data", None))
+
+        for mesh in sorted(meshes, key=lambda m: m.name):
+            MSFS_ExportFingerprint.hash_mesh(hasher, mesh)
+            if mesh in weighted_meshes:
+                MSFS_ExportFingerprint.hash_vertex_weights(hasher, mesh)
+
+        for material in sorted(materials, key=lambda m: m.name):
+            MSFS_ExportFingerprint.hash_values(hasher, material.name)
+            MSFS_ExportFingerprint.hash_rna_properties(hasher, material, prefix="msfs_", images=images)
+            if material.node_tree is not None:
+                MSFS_ExportFingerprint.hash_node_tree(hasher, material.node_tree, images)
+                MSFS_ExportFingerprint.hash_animation_data(hasher, material.node_tree.animation_data)
+            MSFS_ExportFingerprint.hash_animation_data(hasher, material.animation_data)
+
+        for image in sorted(images, key=lambda i: i.name):
+            MSFS_ExportFingerprint.hash_image(hasher, image)
+
+        return hasher.hexdigest()
+
+    @staticmethod
+    def get_store_path(file_path):
+        return os.path.join(os.path.dirname(file_path), FINGERPRINT_FILE_NAME)
+
+    @staticmethod
+    def load(file_path):
+        try:
+            with open(MSFS_ExportFingerprint.get_store_path(file_path)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def get_output_files(file_path, texture_dir):
+        """
+        {path: [size, mtime]} of the glTF and of the buffers and images it references,
+        None when one of them is missing or the glTF can't be read
+        """
+        folder = os.path.dirname(file_path)
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                gltf = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        paths = [file_path]
+        for item in gltf.get("buffers", []) + gltf.get("images", []):
+            uri = item.get("uri")
+            if not uri or uri.startswith("data:"):
+                continue
+            uri = urllib.parse.unquote(uri)
+            # the MSFS extension keeps only the file name of the images, they are in the texture folder
+            candidates = (os.path.join(folder, uri), os.path.join(folder, texture_dir, os.path.basename(uri)))
+            path = next((candidate for candidate in candidates if os.path.isfile(candidate)), None)
+            if path is None:
+                return None
+            paths.append(path)
+
+        files = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            files[os.path.normpath(path)] = [stat.st_size, stat.st_mtime_ns]
+        return files
+
+    @staticmethod
+    def is_up_to_date(file_path, fingerprint, texture_dir):
+        """True when the inputs are unchanged and every output file is still the one written by the last export"""
+        stored = MSFS_ExportFingerprint.load(file_path).get(os.path.basename(file_path))
+        if not isinstance(stored, dict) or stored.get("fingerprint") != fingerprint:
+            return False
+        files = MSFS_ExportFingerprint.get_output_files(file_path, texture_dir)
+        return files is not None and files == stored.get("files")
+
+    @staticmethod
+    def save(file_path, fingerprint, texture_dir):
+        files = MSFS_ExportFingerprint.get_output_files(file_path, texture_dir)
+        if files is None:
+            # incomplete export, it is done again next time
+            return
+        stored = MSFS_ExportFingerprint.load(file_path)
+        stored[os.path.basename(file_path)] = {"fingerprint": fingerprint, "files": files}
+        try:
+            with open(MSFS_ExportFingerprint.get_store_path(file_path), "w") as f:
+                json.dump(stored, f, indent=4, sort_keys=True)
+        except OSError as e:
+            print("*** MSFS WARNING *** could not save export fingerprint", file_path, e)
+
+    @staticmethod
+    def filter_unchanged_jobs(jobs, settings):
+        """Fingerprint the jobs and split them in (jobs to export, unchanged jobs)"""
+        changed = []
+        unchanged = []
+        for job in jobs:
+            objects = [bpy.data.objects[name] for name in job["objects"] if name in bpy.data.objects]
+            job["fingerprint"] = MSFS_ExportFingerprint.compute(objects, settings)
+            if MSFS_ExportFingerprint.is_up_to_date(job["file_path"], job["fingerprint"], settings.export_texture_dir):
+                unchanged.append(job)
+            else:
+                changed.append(job)
+        return changed, unchanged
+
+    @staticmethod
+    def save_results(jobs, results, settings):
+        """Store the fingerprint and the output files of every successfully exported job"""
+        fingerprints = {job["file_path"]: job.get("fingerprint") for job in jobs}
+        for result in results:
+            fingerprint = fingerprints.get(result["file_path"])
+            if result["success"] and fingerprint is not None:
+                MSFS_ExportFingerprint.save(result["file_path"], fingerprint, settings.export_texture_dir)
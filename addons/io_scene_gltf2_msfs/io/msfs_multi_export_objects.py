@@ -15,6 +15,7 @@
 import re
 
 import bpy
+from bpy.app.handlers import persistent
 
 from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
 
@@ -43,40 +44,114 @@ class MultiExporterLODGroup(bpy.types.PropertyGroup):
 
 
 class MSFS_LODGroupUtility:
+    # view layer pointer -> visibility data, cleared on depsgraph updates, layer collection changes and file load
+    visibility_cache = {}
+    msgbus_owner = object()
+
+    @staticmethod
+    def invalidate(*args):
+        MSFS_LODGroupUtility.visibility_cache.clear()
+
+    @staticmethod
+    def get_view_layer_data(context):
+        view_layer = context.view_layer
+        data = MSFS_LODGroupUtility.visibility_cache.get(view_layer.as_pointer())
+        if data is None:
+            # Checking visibility from the collection itself won't work, so map every (nested) collection to the visibility of its LayerCollection
+            collection_visible = {}
+
+            def map_layer_collections(layer_collection):
+                for child in layer_collection.children:
+                    collection_visible[child.collection.as_pointer()] = child.visible_get()
+                    map_layer_collections(child)
+
+            map_layer_collections(view_layer.layer_collection)
+
+            data = {
+                "collection_visible": collection_visible,
+                "collections": {collection.as_pointer() for collection in bpy.data.collections},
+                "objects": {obj.as_pointer() for obj in view_layer.objects},
+                "lods": {},
+            }
+            MSFS_LODGroupUtility.visibility_cache[view_layer.as_pointer()] = data
+        return data
+
     @staticmethod
     def lod_is_visible(context, lod):
         sort_by_collection = context.scene.multi_exporter_grouped_by_collections
+        show_hidden_objects = context.scene.multi_exporter_show_hidden_objects
+
+        source = lod.collection if sort_by_collection else lod.objectLOD
+        if source is None:
+            return False
+
+        data = MSFS_LODGroupUtility.get_view_layer_data(context)
+        key = (source.as_pointer(), sort_by_collection, show_hidden_objects)
+        visible = data["lods"].get(key)
+        if visible is not None:
+            return visible
 
         if sort_by_collection:
-            # Checking visibility from the collection itself won't work, so we have to find the LayerCollection that contains our collection.
-            collection_hidden = False
-            for layer_collection in bpy.context.window.view_layer.layer_collection.children:
-                if layer_collection.collection == lod.collection:
-                    collection_hidden = not layer_collection.visible_get()
-
-            if (
-                (not context.scene.multi_exporter_show_hidden_objects and collection_hidden) or 
-                (lod.collection is None or lod.collection not in list(bpy.data.collections))
-            ):
-                return False
+            collection_hidden = not data["collection_visible"].get(key[0], True)
+            visible = not (
+                (not show_hidden_objects and collection_hidden) or
+                key[0] not in data["collections"]
+            )
         else:
-            if (
-                (not context.scene.multi_exporter_show_hidden_objects and lod.objectLOD.hide_get()) or 
-                (lod.objectLOD is None or lod.objectLOD not in list(bpy.context.window.view_layer.objects))
-            ):
-                return False
+            visible = not (
+                key[0] not in data["objects"] or
+                (not show_hidden_objects and source.hide_get(view_layer=context.view_layer))
+            )
+
+        data["lods"][key] = visible
+        return visible
+
+    @staticmethod
+    def subscribe():
+        for prop in ("hide_viewport", "exclude"):
+            bpy.msgbus.subscribe_rna(
+                key=(bpy.types.LayerCollection, prop),
+                owner=MSFS_LODGroupUtility.msgbus_owner,
+                args=(),
+                notify=MSFS_LODGroupUtility.invalidate,
+            )
+
 
-        return True
+@persistent
+def lod_visibility_depsgraph_update(scene, depsgraph):
+    MSFS_LODGroupUtility.invalidate()
+
+
+@persistent
+def lod_visibility_load_post(*args):
+    # msgbus subscriptions are cleared when a file is loaded
+    MSFS_LODGroupUtility.invalidate()
+    MSFS_LODGroupUtility.subscribe()
+
+
+@persistent
+def lod_snapshot_reset(*args):
+    # the snapshots are keyed by pointers, which another file or an undo step can reuse
+    MSFS_OT_ReloadLODGroups.source_snapshots.clear()
 
 
 class MSFS_OT_ReloadLODGroups(bpy.types.Operator):
     bl_idname = "msfs.reload_lod_groups"
     bl_label = "Reload LOD groups"
 
+    incremental: bpy.props.BoolProperty(
+        name="Incremental",
+        description="Only process the objects or collections added, removed or renamed since the last reload",
+        default=True
+    )
+
+    # (scene, grouped by collections) -> {pointer: name} of the LOD members seen at the last reload
+    source_snapshots = {}
+
     @staticmethod
     def update_grouped_by(self, context):
         context.scene.msfs_multi_exporter_lod_groups.clear()
-        MSFS_OT_ReloadLODGroups.reload_lod_groups(self, context)
+        MSFS_OT_ReloadLODGroups.reload_lod_groups(self, context, incremental=False)
 
     @staticmethod
     def get_group_from_name(name):
@@ -96,71 +171,103 @@ class MSFS_OT_ReloadLODGroups(bpy.types.Operator):
         return [lod_group.group_name for lod_group in lod_groups]
 
     @staticmethod
-    def reload_lod_groups(self, context):
+    def get_lod_members(context, sort_by_collection):
+        """Collections, or scene objects, an existing LOD can keep pointing to - by pointer"""
+        if sort_by_collection:
+            return {collection.as_pointer(): collection for collection in bpy.data.collections}
+        return {obj.as_pointer(): obj for obj in context.scene.objects}
+
+    @staticmethod
+    def get_lod_sources(members, sort_by_collection):
+        """Members new LODs are made from: every collection, or only the root objects"""
+        if sort_by_collection:
+            return members
+        return {pointer: obj for pointer, obj in members.items() if obj.parent is None}
+
+    @staticmethod
+    def reload_lod_groups(self, context, incremental=False):
         lod_groups = context.scene.msfs_multi_exporter_lod_groups
         sort_by_collection = context.scene.multi_exporter_grouped_by_collections
 
-        # Remove deleted LODs
+        members = MSFS_OT_ReloadLODGroups.get_lod_members(context, sort_by_collection)
+        sources = MSFS_OT_ReloadLODGroups.get_lod_sources(members, sort_by_collection)
+        source_names = {pointer: member.name for pointer, member in members.items()}
+
+        # Members added, renamed or removed since the last reload
+        snapshot_key = (context.scene.as_pointer(), sort_by_collection)
+        previous_names = MSFS_OT_ReloadLODGroups.source_snapshots.get(snapshot_key)
+        MSFS_OT_ReloadLODGroups.source_snapshots[snapshot_key] = source_names
+        if incremental and previous_names is not None:
+            changed = {pointer for pointer, name in source_names.items() if previous_names.get(pointer) != name}
+            changed.update(previous_names.keys() - source_names.keys())
+        else:
+            changed = None
+
+        # Remove deleted LODs - collect first, then remove from the end so indices stay valid
+        existing = set()
+        empty_groups = []
         for i, lod_group in enumerate(lod_groups):
+            removed_lods = []
             for j, lod in enumerate(lod_group.lods):
-                if sort_by_collection:
-                    if (
-                        not lod.collection in list(bpy.data.collections)
-                        or not MSFS_OT_ReloadLODGroups.get_group_from_name(lod.collection.name) == lod_group.group_name
-                    ):
-                        lod_groups[i].lods.remove(j)
-                        continue
-                else:
-                    if (
-                        not lod.objectLOD in list(context.scene.objects)
-                        or not MSFS_OT_ReloadLODGroups.get_group_from_name(lod.objectLOD.name) == lod_group.group_name
-                    ):
-                        lod_groups[i].lods.remove(j)
-                        continue
+                source = lod.collection if sort_by_collection else lod.objectLOD
+                if source is None:
+                    removed_lods.append(j)
+                    continue
+
+                pointer = source.as_pointer()
+                if changed is not None and pointer not in changed:
+                    existing.add(pointer)
+                    continue
+
+                # a LOD is kept while its object is in the scene, even if it got a parent
+                if (
+                    pointer not in members
+                    or not MSFS_OT_ReloadLODGroups.get_group_from_name(source.name) == lod_group.group_name
+                ):
+                    removed_lods.append(j)
+                    continue
+
+                existing.add(pointer)
+
+            for j in reversed(removed_lods):
+                lod_group.lods.remove(j)
 
             if len(lod_group.lods) == 0:
-                lod_groups.remove(i)
+                empty_groups.append(i)
+
+        for i in reversed(empty_groups):
+            lod_groups.remove(i)
+
+        # Search for new groups, only sources that aren't in a LOD yet
+        candidates = sources.keys() - existing
 
-        # Search for new groups
         found_lod_groups = {}
-        if sort_by_collection:
-            for collection in bpy.data.collections:
-                lod_group = MSFS_OT_ReloadLODGroups.get_group_from_name(collection.name)
-                if lod_group not in found_lod_groups:
-                    found_lod_groups[lod_group] = []
-                found_lod_groups[lod_group].append(collection)
-        else:
-            for object in context.scene.objects:
-                if object.parent is None:
-                    lod_group = MSFS_OT_ReloadLODGroups.get_group_from_name(object.name)
-                    if lod_group not in found_lod_groups:
-                        found_lod_groups[lod_group] = []
-                    found_lod_groups[lod_group].append(object)
+        for pointer, source in sources.items():
+            if pointer in candidates:
+                lod_group = MSFS_OT_ReloadLODGroups.get_group_from_name(source.name)
+                found_lod_groups.setdefault(lod_group, []).append(source)
 
         # Add to object groups
-        for lod_group in found_lod_groups:
-            if lod_group not in MSFS_OT_ReloadLODGroups.get_lod_group_names(lod_groups):
+        group_indices = {lod_group.group_name: i for i, lod_group in enumerate(lod_groups)}
+        for lod_group, group_sources in found_lod_groups.items():
+            lod_group_index = group_indices.get(lod_group)
+            if lod_group_index is None:
                 # Create LOD group
                 created_lod_group = lod_groups.add()
                 created_lod_group.group_name = lod_group
+                lod_group_index = len(lod_groups) - 1
+                group_indices[lod_group] = lod_group_index
 
-            lod_group_index = MSFS_OT_ReloadLODGroups.get_lod_group_names(lod_groups).index(lod_group)
-
-            if sort_by_collection:
-                for collection in found_lod_groups[lod_group]:
-                    if collection not in [lod.collection for lod in lod_groups[lod_group_index].lods]:
-                        lod = lod_groups[lod_group_index].lods.add()
-                        lod.collection = collection
-                        lod.file_name = collection.name
-            else:
-                for obj in found_lod_groups[lod_group]:
-                    if obj not in [lod.objectLOD for lod in lod_groups[lod_group_index].lods]:
-                        lod = lod_groups[lod_group_index].lods.add()
-                        lod.objectLOD = obj
-                        lod.file_name = obj.name
+            for source in group_sources:
+                lod = lod_groups[lod_group_index].lods.add()
+                if sort_by_collection:
+                    lod.collection = source
+                else:
+                    lod.objectLOD = source
+                lod.file_name = source.name
 
     def execute(self, context):
-        MSFS_OT_ReloadLODGroups.reload_lod_groups(self, context)
+        MSFS_OT_ReloadLODGroups.reload_lod_groups(self, context, incremental=self.incremental)
         return {"FINISHED"}
 
 
@@ -249,3 +356,22 @@ def register():
         default=False,
         update=MSFS_OT_ReloadLODGroups.update_grouped_by
     )
+
+    bpy.app.handlers.depsgraph_update_post.append(lod_visibility_depsgraph_update)
+    bpy.app.handlers.load_post.append(lod_visibility_load_post)
+    bpy.app.handlers.load_post.append(lod_snapshot_reset)
+    bpy.app.handlers.undo_post.append(lod_snapshot_reset)
+    bpy.app.handlers.redo_post.append(lod_snapshot_reset)
+    MSFS_LODGroupUtility.subscribe()
+
+
+def unregister():
+    if lod_visibility_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(lod_visibility_depsgraph_update)
+    if lod_visibility_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(lod_visibility_load_post)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if lod_snapshot_reset in handlers:
+            handlers.remove(lod_snapshot_reset)
+    bpy.msgbus.clear_by_owner(MSFS_LODGroupUtility.msgbus_owner)
+    MSFS_LODGroupUtility.invalidate()
@@ -0,0 +1,220 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import bpy
+
+# name of the add-on package, needed to enable it in the background workers
+ADDON_PACKAGE = __package__.rpartition(".")[0]
+
+# seconds between two checks of the workers in run()
+POLL_INTERVAL = 0.2
+
+
+class MSFS_ParallelExport:
+    """Spread multi-export jobs over background Blender processes"""
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def split_jobs(jobs, worker_count):
+        """Round robin the jobs over at most worker_count workers"""
+        worker_count = max(1, min(worker_count, len(jobs)))
+        return [jobs[i::worker_count] for i in range(worker_count)]
+
+    @staticmethod
+    def save_snapshot(directory):
+        """Save a copy of the current file for the workers, the open file is left untouched"""
+        snapshot_path = os.path.join(directory, "snapshot.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=snapshot_path, copy=True)
+        return snapshot_path
+
+    @staticmethod
+    def get_worker_command(snapshot_path, jobs_path, results_path):
+        expression = (
+            "import addon_utils, importlib; "
+            "addon_utils.enable({package!r}, default_set=False); "
+            "importlib.import_module({module!r}).MSFS_ParallelExport.run_worker({jobs!r}, {results!r})"
+        ).format(package=ADDON_PACKAGE, module=__name__, jobs=jobs_path, results=results_path)
+
+        return [
+            bpy.app.binary_path,
+            "-b",
+            snapshot_path,
+            "--python-exit-code",
+            "1",
+            "--python-expr",
+            expression,
+        ]
+
+    @staticmethod
+    def start(jobs, worker_count):
+        """Start the background workers of jobs, returns the export state poll() and stop() take"""
+        export = {
+            "temp_dir": tempfile.mkdtemp(prefix="msfs_multi_export_"),
+            "workers": [],
+            "results": [],
+            "stopped": False,
+        }
+        try:
+            snapshot_path = MSFS_ParallelExport.save_snapshot(export["temp_dir"])
+
+            for index, worker_jobs in enumerate(MSFS_ParallelExport.split_jobs(jobs, worker_count)):
+                jobs_path = os.path.join(export["temp_dir"], "jobs_%d.json" % index)
+                results_path = os.path.join(export["temp_dir"], "results_%d.json" % index)
+                log_path = os.path.join(export["temp_dir"], "worker_%d.log" % index)
+
+                with open(jobs_path, "w") as f:
+                    json.dump(worker_jobs, f)
+
+                log_file = open(log_path, "w")
+                try:
+                    process = subprocess.Popen(
+                        MSFS_ParallelExport.get_worker_command(snapshot_path, jobs_path, results_path),
+                        stdout=log_file,
+                        stderr=subprocess.STDOUT,
+                    )
+                except Exception:
+                    log_file.close()
+                    raise
+                export["workers"].append({
+                    "process": process,
+                    "log_file": log_file,
+                    "log_path": log_path,
+                    "jobs": worker_jobs,
+                    "results_path": results_path,
+                    "done": False,
+                })
+                print("[ASOBO] Started export worker", index, "with", len(worker_jobs), "jobs")
+        except Exception:
+            # the workers already started would keep running on deleted files
+            MSFS_ParallelExport.stop(export)
+            raise
+        return export
+
+    @staticmethod
+    def read_results(results_path):
+        """Results a worker wrote so far, by file path"""
+        try:
+            with open(results_path) as f:
+                return {result["file_path"]: result for result in json.load(f)}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def collect(export, worker, return_code, terminated=False):
+        """Add the results of a worker that exited, the jobs of a terminated worker it didn't finish get none"""
+        worker["done"] = True
+        worker["log_file"].close()
+        worker_results = MSFS_ParallelExport.read_results(worker["results_path"])
+
+        if not terminated and (return_code != 0 or not all(result["success"] for result in worker_results.values())):
+            print("*** MSFS WARNING *** export worker exited with code", return_code)
+            try:
+                with open(worker["log_path"]) as f:
+                    print(f.read()[-4000:])
+            except OSError:
+                pass
+
+        for job in worker["jobs"]:
+            result = worker_results.get(job["file_path"])
+            if result is None:
+                if terminated:
+                    continue
+                result = {
+                    "name": job["name"],
+                    "file_path": job["file_path"],
+                    "success": False,
+                    "message": "Export worker exited with code " + str(return_code),
+                }
+            export["results"].append(result)
+
+    @staticmethod
+    def poll(export):
+        """Collect the workers that exited without waiting, returns the number of finished jobs"""
+        done = 0
+        for worker in export["workers"]:
+            if not worker["done"]:
+                return_code = worker["process"].poll()
+                if return_code is None:
+                    done += len(MSFS_ParallelExport.read_results(worker["results_path"]))
+                    continue
+                MSFS_ParallelExport.collect(export, worker, return_code)
+            done += len(worker["jobs"])
+        return done
+
+    @staticmethod
+    def is_finished(export):
+        return all(worker["done"] for worker in export["workers"])
+
+    @staticmethod
+    def stop(export):
+        """Terminate the workers still running and remove the temporary files, can be called more than once"""
+        if export["stopped"]:
+            return
+        export["stopped"] = True
+        try:
+            running = [worker for worker in export["workers"] if not worker["done"]]
+            for worker in running:
+                worker["process"].terminate()
+            for worker in running:
+                MSFS_ParallelExport.collect(export, worker, worker["process"].wait(), terminated=True)
+        finally:
+            shutil.rmtree(export["temp_dir"], ignore_errors=True)
+
+    @staticmethod
+    def run(jobs, worker_count):
+        """Export the jobs in worker_count background Blender processes and return one result per job, blocking"""
+        export = MSFS_ParallelExport.start(jobs, worker_count)
+        try:
+            while True:
+                MSFS_ParallelExport.poll(export)
+                if MSFS_ParallelExport.is_finished(export):
+                    break
+                time.sleep(POLL_INTERVAL)
+        finally:
+            MSFS_ParallelExport.stop(export)
+
+        return export["results"]
+
+    @staticmethod
+    def run_worker(jobs_path, results_path):
+        """Entry point of a background worker, exports every job of jobs_path"""
+        from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+
+        with open(jobs_path) as f:
+            jobs = json.load(f)
+
+        results = []
+        for job in jobs:
+            success = MSFS_OT_MultiExportGLTF2.export_job(bpy.context, job)
+            results.append({
+                "name": job["name"],
+                "file_path": job["file_path"],
+                "success": success,
+                "message": "" if success else "Export failed in background worker.",
+            })
+
+            # write after each job so a crash still reports the finished ones, replaced at once as poll() reads it
+            temp_path = results_path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(results, f)
+            os.replace(temp_path, results_path)
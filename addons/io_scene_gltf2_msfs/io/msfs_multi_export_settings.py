@@ -63,6 +63,44 @@ class MSFS_MultiExporterSettings(bpy.types.PropertyGroup):
         default=False
     )
 
+    ## Parallel export
+    use_parallel_export: bpy.props.BoolProperty(
+        name="Parallel Export",
+        description=(
+            "Export the LODs and presets in background Blender processes. "
+            "A copy of the current file is saved and shared by the workers"
+        ),
+        default=False
+    )
+
+    ## Texture cache
+    use_texture_cache: bpy.props.BoolProperty(
+        name="Texture Cache",
+        description=(
+            "Keep encoded textures in a cache shared by all exports and sessions, "
+            "textures with the same pixels and image settings are only encoded once"
+        ),
+        default=True
+    )
+
+    ## Incremental export
+    use_incremental_export: bpy.props.BoolProperty(
+        name="Only Export Changes",
+        description=(
+            "Skip the files whose objects, meshes, materials, textures and export settings "
+            "did not change since the last export"
+        ),
+        default=False
+    )
+
+    parallel_export_workers: bpy.props.IntProperty(
+        name="Workers",
+        description="Number of background Blender processes used for parallel export",
+        default=4,
+        min=1,
+        max=32
+    )
+
     # ## Vertex Color Project
     # export_vertexcolor_project: bpy.props.BoolProperty(
         # name="Vertex color Project Settings",
@@ -790,6 +828,13 @@ class MSFS_PT_export_main(bpy.types.Panel):
 
         layout.prop(settings, "export_copyright")
         layout.prop(settings, "will_save_settings")
+        layout.prop(settings, "use_texture_cache")
+        if settings.use_texture_cache:
+            layout.operator("msfs.multi_export_clear_texture_cache")
+        layout.prop(settings, "use_incremental_export")
+        layout.prop(settings, "use_parallel_export")
+        if settings.use_parallel_export:
+            layout.prop(settings, "parallel_export_workers")
         
 
 class MSFS_PT_MSFSExporterExtensionPanel(bpy.types.Panel):
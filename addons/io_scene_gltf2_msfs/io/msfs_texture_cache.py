@@ -0,0 +1,274 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+
+import bpy
+
+# the Khronos image encoder moved a few times between Blender versions
+EXPORT_IMAGE_MODULES = [
+    "io_scene_gltf2.blender.exp.material.encode_image",
+    "io_scene_gltf2.blender.exp.material.extensions.gltf2_blender_image",
+    "io_scene_gltf2.blender.exp.gltf2_blender_image",
+]
+
+# export settings that change the encoded bytes
+ENCODE_SETTINGS = [
+    "gltf_image_format",
+    "gltf_jpeg_quality",
+    "gltf_image_quality",
+]
+
+# the least recently used textures are removed past this size, in bytes
+MAX_CACHE_SIZE = 2 * 1024 ** 3
+
+
+class MSFS_TextureCache:
+    """On disk cache of encoded textures, keyed by pixel hash and encode settings"""
+
+    # image pointer -> (image version, pixel hash)
+    pixel_hashes = {}
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def get_cache_dir():
+        try:
+            return bpy.utils.extension_path_user(__package__.rpartition(".")[0], path="texture_cache", create=True)
+        except Exception:
+            cache_dir = os.path.join(tempfile.gettempdir(), "msfs_texture_cache")
+            os.makedirs(cache_dir, exist_ok=True)
+            return cache_dir
+
+    @staticmethod
+    def get_export_image_class():
+        for module_name in EXPORT_IMAGE_MODULES:
+            try:
+                return importlib.import_module(module_name).ExportImage
+            except (ImportError, AttributeError):
+                continue
+        return None
+
+    @staticmethod
+    def get_image_version(image):
+        """Cheap value that changes when the pixels of the image can have changed"""
+        if image.is_dirty or image.source != "FILE":
+            return None
+        if image.packed_file is not None:
+            return ("PACKED", image.packed_file.size)
+        try:
+            stat = os.stat(bpy.path.abspath(image.filepath, library=image.library))
+        except OSError:
+            return None
+        return (image.filepath, stat.st_size, stat.st_mtime_ns)
+
+    @staticmethod
+    def get_pixel_hash(image):
+        version = MSFS_TextureCache.get_image_version(image)
+        cached = MSFS_TextureCache.pixel_hashes.get(image.as_pointer())
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        import numpy as np
+
+        width, height = image.size
+        pixels = np.empty(width * height * image.channels, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+
+        hasher = hashlib.sha1(pixels.tobytes())
+        hasher.update(repr((width, height, image.channels, image.colorspace_settings.name, image.alpha_mode)).encode("utf-8"))
+        pixel_hash = hasher.hexdigest()
+
+        MSFS_TextureCache.pixel_hashes[image.as_pointer()] = (version, pixel_hash)
+        return pixel_hash
+
+    @staticmethod
+    def get_key_value(value):
+        if isinstance(value, bpy.types.Image):
+            return MSFS_TextureCache.get_pixel_hash(value)
+        import numpy as np
+
+        if isinstance(value, np.ndarray):
+            return hashlib.sha1(value.tobytes()).hexdigest()
+        if callable(value):
+            return getattr(value, "__qualname__", repr(type(value)))
+        if isinstance(value, dict):
+            return sorted((repr(k), MSFS_TextureCache.get_key_value(v)) for k, v in value.items())
+        if isinstance(value, (list, tuple)):
+            return [MSFS_TextureCache.get_key_value(v) for v in value]
+        if hasattr(value, "__dict__"):
+            return [type(value).__name__, MSFS_TextureCache.get_key_value(vars(value))]
+        return repr(value)
+
+    @staticmethod
+    def get_key(export_image, mime_type, export_settings):
+        key = [
+            mime_type,
+            [export_settings.get(setting) for setting in ENCODE_SETTINGS],
+            MSFS_TextureCache.get_key_value(vars(export_image)),
+        ]
+        return hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_paths(key):
+        cache_dir = MSFS_TextureCache.get_cache_dir()
+        return os.path.join(cache_dir, key + ".bin"), os.path.join(cache_dir, key + ".json")
+
+    @staticmethod
+    def remove(key):
+        for path in MSFS_TextureCache.get_paths(key):
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+    @staticmethod
+    def load(key):
+        data_path, info_path = MSFS_TextureCache.get_paths(key)
+        try:
+            with open(info_path) as f:
+                info = json.load(f)
+            with open(data_path, "rb") as f:
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+
+        # a partial or foreign file is encoded again
+        if len(data) != info.get("size") or hashlib.sha1(data).hexdigest() != info.get("sha1"):
+            print("*** MSFS WARNING *** discarding corrupted texture cache entry", key)
+            MSFS_TextureCache.remove(key)
+            return None
+
+        # the eviction removes the least recently used entries first
+        with contextlib.suppress(OSError):
+            os.utime(info_path)
+
+        if info.get("is_tuple"):
+            return (data, *info.get("extra", []))
+        return data
+
+    @staticmethod
+    def write_file(path, data):
+        """Write data next to path and move it in place, so readers only ever see complete files"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def save(key, result):
+        if isinstance(result, tuple):
+            data, extra = result[0], list(result[1:])
+        else:
+            data, extra = result, []
+
+        data_path, info_path = MSFS_TextureCache.get_paths(key)
+        try:
+            info = json.dumps({
+                "is_tuple": isinstance(result, tuple),
+                "extra": extra,
+                "size": len(data),
+                "sha1": hashlib.sha1(data).hexdigest(),
+            })
+            # the info is the entry marker, it is only written once the data is complete
+            MSFS_TextureCache.write_file(data_path, data)
+            MSFS_TextureCache.write_file(info_path, info.encode("utf-8"))
+        except (OSError, TypeError) as e:
+            print("*** MSFS WARNING *** could not write texture cache", key, e)
+
+    @staticmethod
+    def evict(max_size=MAX_CACHE_SIZE):
+        """Remove the least recently used entries until the cache holds at most max_size bytes"""
+        cache_dir = MSFS_TextureCache.get_cache_dir()
+        entries = []
+        total_size = 0
+        try:
+            with os.scandir(cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    key = entry.name[:-len(".json")]
+                    try:
+                        size = entry.stat().st_size + os.stat(os.path.join(cache_dir, key + ".bin")).st_size
+                        entries.append((entry.stat().st_mtime_ns, key, size))
+                    except OSError:
+                        continue
+                    total_size += size
+        except OSError:
+            return
+
+        entries.sort()
+        for _, key, size in entries:
+            if total_size <= max_size:
+                break
+            MSFS_TextureCache.remove(key)
+            total_size -= size
+
+    @staticmethod
+    def clear():
+        shutil.rmtree(MSFS_TextureCache.get_cache_dir(), ignore_errors=True)
+        MSFS_TextureCache.pixel_hashes.clear()
+
+    @staticmethod
+    @contextlib.contextmanager
+    def use(enabled=True):
+        """Serve ExportImage.encode from the cache while the context is active"""
+        export_image_class = MSFS_TextureCache.get_export_image_class() if enabled else None
+        if export_image_class is None:
+            yield
+            return
+
+        original_encode = export_image_class.encode
+
+        def cached_encode(self, mime_type, export_settings, *args, **kwargs):
+            try:
+                key = MSFS_TextureCache.get_key(self, mime_type, export_settings)
+            except Exception as e:
+                print("*** MSFS WARNING *** texture cache key failed", e)
+                return original_encode(self, mime_type, export_settings, *args, **kwargs)
+
+            result = MSFS_TextureCache.load(key)
+            if result is None:
+                result = original_encode(self, mime_type, export_settings, *args, **kwargs)
+                MSFS_TextureCache.save(key, result)
+            return result
+
+        export_image_class.encode = cached_encode
+        try:
+            yield
+        finally:
+            export_image_class.encode = original_encode
+            MSFS_TextureCache.evict()
+
+
+class MSFS_OT_ClearTextureCache(bpy.types.Operator):
+    """Delete every texture stored in the multi-export texture cache"""
+
+    bl_idname = "msfs.multi_export_clear_texture_cache"
+    bl_label = "Clear Texture Cache"
+
+    def execute(self, context):
+        MSFS_TextureCache.clear()
+        self.report({'INFO'}, "Texture cache cleared.")
+        return {"FINISHED"}
@@ -0,0 +1,131 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bpy
+
+
+class MSFSVertexColor:
+    """Convert color attributes to FLOAT_COLOR on CORNER for export, and put them back after"""
+
+    # (mesh name, original attributes) of the meshes converted for the running export
+    pending = []
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def needs_conversion(color_attribute):
+        return color_attribute.data_type != "FLOAT_COLOR" or color_attribute.domain != "CORNER"
+
+    @staticmethod
+    def read(color_attribute, prop="color"):
+        import numpy as np
+
+        data = np.empty(len(color_attribute.data) * 4, dtype=np.float32)
+        color_attribute.data.foreach_get(prop, data)
+        return data
+
+    @staticmethod
+    def rebuild(mesh, attributes):
+        """
+        Replace all the color attributes of mesh by attributes, a list of (name, data type, domain, data, prop).
+        Blender orders color attributes by domain and type, so they are all recreated in order to keep
+        their order (the COLOR_n of the export), the active and default ones are restored by name
+        """
+        color_attributes = mesh.color_attributes
+        active_color_name = color_attributes.active_color_name
+        default_color_name = color_attributes.default_color_name
+
+        for name in [color_attribute.name for color_attribute in color_attributes]:
+            color_attributes.remove(color_attributes[name])
+        for name, data_type, domain, data, prop in attributes:
+            color_attribute = color_attributes.new(name, data_type, domain)
+            color_attribute.data.foreach_set(prop, data)
+
+        if active_color_name:
+            color_attributes.active_color_name = active_color_name
+        if default_color_name:
+            color_attributes.default_color_name = default_color_name
+
+    @staticmethod
+    def convert_mesh(mesh):
+        """Make all the color attributes of mesh FLOAT_COLOR on CORNER, returns the original attributes"""
+        import numpy as np
+
+        original = []
+        converted = []
+        loop_vertex_indices = None
+        for color_attribute in mesh.color_attributes:
+            name = color_attribute.name
+            data_type = color_attribute.data_type
+            domain = color_attribute.domain
+
+            # keep the exact stored values to be able to restore them
+            original_prop = "color_srgb" if data_type == "BYTE_COLOR" else "color"
+            original_data = MSFSVertexColor.read(color_attribute, original_prop)
+            original.append((name, data_type, domain, original_data, original_prop))
+
+            colors = original_data if original_prop == "color" else MSFSVertexColor.read(color_attribute)
+            if domain == "POINT":
+                if loop_vertex_indices is None:
+                    loop_vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+                    mesh.loops.foreach_get("vertex_index", loop_vertex_indices)
+                colors = colors.reshape(-1, 4)[loop_vertex_indices].ravel()
+            converted.append((name, "FLOAT_COLOR", "CORNER", colors, "color"))
+
+        try:
+            MSFSVertexColor.rebuild(mesh, converted)
+        except Exception:
+            # put back what was already removed
+            MSFSVertexColor.rebuild(mesh, original)
+            raise
+        return original
+
+    @staticmethod
+    def convert_meshes(meshes):
+        """Convert the color attributes of meshes in bulk, restore() puts them back. True if a mesh changed"""
+        # left over by an export that failed before restoring them
+        MSFSVertexColor.restore()
+
+        for mesh in meshes:
+            if mesh.library is not None:
+                continue
+            if not any(MSFSVertexColor.needs_conversion(ca) for ca in mesh.color_attributes):
+                continue
+
+            try:
+                MSFSVertexColor.pending.append((mesh.name, MSFSVertexColor.convert_mesh(mesh)))
+            except Exception as e:
+                print("*** MSFS WARNING *** - Error attribute convert to FLOAT COLOR", mesh, e)
+        return bool(MSFSVertexColor.pending)
+
+    @staticmethod
+    def restore():
+        """Put back the color attributes of the converted meshes"""
+        pending = MSFSVertexColor.pending
+        MSFSVertexColor.pending = []
+        for mesh_name, original in reversed(pending):
+            mesh = bpy.data.meshes.get(mesh_name)
+            if mesh is None:
+                continue
+            try:
+                MSFSVertexColor.rebuild(mesh, original)
+            except Exception as e:
+                print("*** MSFS WARNING *** - Error restoring color attributes", mesh_name, e)
+
+    @staticmethod
+    def restore_after_operator():
+        """Restore from a timer too, it runs once the export operator returns, even if it failed"""
+        if not bpy.app.timers.is_registered(MSFSVertexColor.restore):
+            bpy.app.timers.register(MSFSVertexColor.restore, first_interval=0)
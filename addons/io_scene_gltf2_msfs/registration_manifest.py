@@ -0,0 +1,122 @@
+# Copyright 2021-2022 The glTF-Blender-IO-MSFS authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Generated by generate_manifest.py, do not edit.
+
+# modules imported on register, the others are imported on first use
+MODULES = (
+    '.blender.gizmo',
+    '.blender.li_properties',
+    '.blender.msfs_material_legacy_state',
+    '.blender.msfs_material_panel',
+    '.blender.msfs_material_prop_update',
+    '.blender.msfs_material_relink',
+    '.blender.msfs_material_users',
+    '.blender.msfs_node_group_library',
+    '.blender.ui_properties',
+    '.com.msfs_material_props',
+    '.io.msfs_material',
+    '.io.msfs_multi_export',
+    '.io.msfs_multi_export_objects',
+    '.io.msfs_multi_export_presets',
+    '.io.msfs_multi_export_settings',
+    '.io.msfs_texture_cache',
+)
+
+# (module, classes) in registration order
+CLASSES = (
+    ('.blender.gizmo', (
+        'AddGizmo',
+        'FitGizmos',
+        'MSFSCollisionGizmo',
+        'MSFSCollisionGizmoGroup',
+        'MSFSCollisionAddMenu',
+    )),
+    ('.blender.li_properties', (
+        'MSFS_attached_behavior',
+    )),
+    ('.blender.msfs_material_panel', (
+        'MSFS_OT_vertex_color_white_Data',
+        'MSFS_OT_glTfSettingsMaterialData',
+        'MSFS_OT_MigrateColorFixData',
+        'MSFS_OT_MigrateMaterialData',
+        'MSFS_OT_MigrateAllMaterialData',
+        'MSFS_PT_Material',
+    )),
+    ('.blender.msfs_node_group_library', (
+        'MSFS_OT_CollapseNodeGroupDuplicates',
+    )),
+    ('.blender.ui_properties', (
+        'MSFS_PT_BoneProperties',
+        'MSFS_PT_ObjectProperties',
+    )),
+    ('.io.msfs_multi_export', (
+        'MSFS_OT_MultiExportGLTF2',
+        'MSFS_OT_ChangeTab',
+        'MSFS_PT_MultiExporter',
+    )),
+    ('.io.msfs_multi_export_objects', (
+        'MultiExporterLOD',
+        'MultiExporterLODGroup',
+        'MSFS_OT_ReloadLODGroups',
+        'MSFS_PT_MultiExporterObjectsView',
+    )),
+    ('.io.msfs_multi_export_presets', (
+        'MultiExporterPresetLayer',
+        'MultiExporterPreset',
+        'MSFS_OT_AddPreset',
+        'MSFS_OT_RemovePreset',
+        'MSFS_OT_EditLayers',
+        'MSFS_PT_MultiExporterPresetsView',
+    )),
+    ('.io.msfs_multi_export_settings', (
+        'MSFS_MultiExporterSettings',
+        'MSFS_PT_export_main',
+        'MSFS_PT_MSFSExporterExtensionPanel',
+        'MSFS_PT_export_include',
+        'MSFS_PT_export_transform',
+        'MSFS_PT_export_scene_graph',
+        'MSFS_PT_export_geometry',
+        'MSFS_PT_export_material',
+        'MSFS_PT_export_shapekeys',
+        'MSFS_PT_export_armature',
+        'MSFS_PT_export_skinning',
+        'MSFS_PT_export_Lighting',
+        'MSFS_PT_export_geometry_compression',
+        'MSFS_PT_export_animation',
+        'MSFS_PT_export_animation_notes',
+        'MSFS_PT_export_animation_ranges',
+        'MSFS_PT_export_animation_armature',
+        'MSFS_PT_export_animation_shapekeys',
+        'MSFS_PT_export_animation_sampling',
+        'MSFS_PT_export_animation_optimize',
+    )),
+    ('.io.msfs_texture_cache', (
+        'MSFS_OT_ClearTextureCache',
+    )),
+)
+
+# modules with a register() or unregister() function
+HOOKS = (
+    '.blender.gizmo',
+    '.blender.msfs_material_legacy_state',
+    '.blender.msfs_material_prop_update',
+    '.blender.msfs_material_relink',
+    '.blender.msfs_material_users',
+    '.io.msfs_material',
+    '.io.msfs_multi_export',
+    '.io.msfs_multi_export_objects',
+    '.io.msfs_multi_export_presets',
+    '.io.msfs_multi_export_settings',
+)